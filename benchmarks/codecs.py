@@ -0,0 +1,47 @@
+import timeit
+import typing
+import argparse
+
+from rednest import Codec, ReprCodec, JSONCodec, PickleCodec, TaggedCodec
+
+# Sample values - typical hash keys and scalar values
+SAMPLES: typing.List[typing.Any] = ["name", "User 1234", 42, -7, 3.14159, None, True, "Hello World" * 4, 10**12]
+
+# All benchmarked codecs
+CODECS: typing.Dict[str, Codec] = {
+    "repr": ReprCodec(),
+    "json": JSONCodec(),
+    "pickle": PickleCodec(),
+    "tagged": TaggedCodec(),
+}
+
+
+def measure(function: typing.Callable[[], typing.Any], rounds: int) -> float:
+    # Measure the best of a few repeats and return operations per second
+    return len(SAMPLES) * rounds / min(timeit.repeat(function, number=rounds, repeat=5))
+
+
+def main() -> None:
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description="Compare the encode/decode throughput of the value codecs")
+    parser.add_argument("--rounds", type=int, default=10000, help="rounds of encoding all of the samples")
+    arguments = parser.parse_args()
+
+    # Print the table header
+    print(f"{'codec':<10}{'encode ops/s':>16}{'decode ops/s':>16}")
+
+    # Loop over all codecs
+    for name, codec in CODECS.items():
+        # Encode the samples once for the decode benchmark
+        encoded = [codec.encode(sample) for sample in SAMPLES]
+
+        # Measure both directions
+        encode_rate = measure(lambda: [codec.encode(sample) for sample in SAMPLES], arguments.rounds)  # pylint: disable=cell-var-from-loop
+        decode_rate = measure(lambda: [codec.decode(value) for value in encoded], arguments.rounds)  # pylint: disable=cell-var-from-loop
+
+        # Print the results
+        print(f"{name:<10}{encode_rate:>16,.0f}{decode_rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import os
+import sys
+import json
+import time
+import typing
+import argparse
+import tracemalloc
+import importlib.metadata
+
+import redis
+
+from rednest import Nested, List, Dictionary, explain
+
+# Number of items written per call while populating large containers
+CHUNK_SIZE = 10000
+
+# Type of benchmarked operations, which receive the container, its size and the iteration number
+Operation = typing.Callable[[typing.Any, int, int], typing.Any]
+
+# Operations which must be prepared before every call, by an untimed setup operation
+SETUPS: typing.Dict[str, Operation] = {
+    "Dictionary.delete": lambda container, size, iteration: container.__setitem__(f"new{iteration}", iteration),
+    "List.delete": lambda container, size, iteration: container.insert(size // 2, iteration),
+}
+
+# Benchmarked dictionary operations - written keys are recycled, and deleted keys are written by the setup
+DICTIONARY_OPERATIONS: typing.Dict[str, Operation] = {
+    "get": lambda container, size, iteration: container[f"key{iteration % size}"],
+    "set": lambda container, size, iteration: container.__setitem__(f"key{iteration % size}", iteration),
+    "update": lambda container, size, iteration: container.update({f"key{(iteration + offset) % size}": iteration for offset in range(10)}),
+    "copy": lambda container, size, iteration: container.copy(),
+    "iterate": lambda container, size, iteration: [value for value in container.values()],
+    "insert": lambda container, size, iteration: container.__setitem__(f"new{iteration}", iteration),
+    "delete": lambda container, size, iteration: container.pop(f"new{iteration}", None),
+}
+
+# Benchmarked list operations
+LIST_OPERATIONS: typing.Dict[str, Operation] = {
+    "get": lambda container, size, iteration: container[iteration % size],
+    "set": lambda container, size, iteration: container.__setitem__(iteration % size, iteration),
+    "update": lambda container, size, iteration: container.__setitem__(slice(0, 10), list(range(10))),
+    "copy": lambda container, size, iteration: container.copy(),
+    "iterate": lambda container, size, iteration: [value for value in container],
+    "insert": lambda container, size, iteration: container.insert(size // 2, iteration),
+    "delete": lambda container, size, iteration: container.__delitem__(size // 2),
+    "slice": lambda container, size, iteration: container[size // 4:size // 4 + 100],
+}
+
+
+def populate(connection: redis.Redis, name: str, container_type: typing.Type[Nested], size: int, depth: int) -> Nested:
+    # Shallow containers are the master itself
+    if depth == 1:
+        container: typing.Any = container_type(connection, name)
+    else:
+        # Wrap an empty container in the nesting path, then fetch it
+        value: typing.Any = [] if container_type is List else {}
+        for _ in range(depth - 2):
+            value = {"n": value}
+        Dictionary(connection, name)["n"] = value
+        container = navigate(Dictionary(connection, name), depth)
+
+    # Write the items in chunks, so that large containers are not sent in a single pipeline
+    for start in range(0, size, CHUNK_SIZE):
+        if isinstance(container, List):
+            container.extend(range(start, min(size, start + CHUNK_SIZE)))
+        else:
+            container.update({f"key{index}": index for index in range(start, min(size, start + CHUNK_SIZE))})
+
+    # Return the master
+    return container_type(connection, name) if depth == 1 else Dictionary(connection, name)
+
+
+def navigate(master: typing.Any, depth: int) -> typing.Any:
+    # Walk the nesting path from the master on every call, so that the cost of nesting is measured
+    for _ in range(depth - 1):
+        master = master["n"]
+
+    # Return the container
+    return master
+
+
+def measure(master: typing.Any, operation: Operation, setup: typing.Optional[Operation], size: int, depth: int, duration: float) -> typing.Dict[str, float]:
+
+    def call(iteration: int) -> float:
+        # Prepare the call without timing it
+        if setup is not None:
+            setup(navigate(master, depth), size, iteration)
+
+        # Time the call, including the navigation
+        start = time.perf_counter()
+        operation(navigate(master, depth), size, iteration)
+        return time.perf_counter() - start
+
+    # Warm up the connection and the caches
+    call(0)
+
+    # Count the round trips of a single call
+    if setup is not None:
+        setup(navigate(master, depth), size, 1)
+    with explain() as plan:
+        operation(navigate(master, depth), size, 1)
+
+    # Measure the peak of the allocations of a single call
+    if setup is not None:
+        setup(navigate(master, depth), size, 2)
+    tracemalloc.start()
+    try:
+        operation(navigate(master, depth), size, 2)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Run the operation until the duration elapses, at least once
+    calls, elapsed, deadline = 0, 0.0, time.perf_counter() + duration
+    while not calls or time.perf_counter() < deadline:
+        elapsed += call(calls + 3)
+        calls += 1
+
+    # Return the results
+    return {"ops": calls / elapsed, "round_trips": plan.round_trips, "commands": plan.commands, "peak_bytes": peak}
+
+
+def compare(results: typing.Dict[str, typing.Dict[str, float]], baseline: typing.Dict[str, typing.Any], tolerance: float) -> int:
+    # Print the comparison header
+    print(f"\ncompared to {baseline['version']}")
+    print(f"{'benchmark':<60}{'ops/s':>12}{'ratio':>8}{'round trips':>14}")
+
+    # Compare the benchmarks which exist in both runs
+    regressions = 0
+    for name, result in results.items():
+        # Skip new benchmarks
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+
+        # Slower operations and additional round trips are regressions
+        ratio = result["ops"] / previous["ops"]
+        regressed = ratio < 1 - tolerance or result["round_trips"] > previous["round_trips"]
+        regressions += regressed
+
+        # Print the comparison
+        print(f"{name:<60}{result['ops']:>12,.1f}{ratio:>8.2f}{previous['round_trips']:>6} -> {result['round_trips']:<6}{'REGRESSION' if regressed else ''}")
+
+    # Return the number of regressions
+    return regressions
+
+
+def main() -> None:
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description="Measure the throughput, round trips and allocations of the Dictionary and List operations")
+    parser.add_argument("--host", default="localhost", help="redis server host")
+    parser.add_argument("--port", type=int, default=6379, help="redis server port")
+    parser.add_argument("--sizes", default="10,1000,100000", help="comma separated container sizes, up to 1000000")
+    parser.add_argument("--depths", default="1,3", help="comma separated nesting depths")
+    parser.add_argument("--operations", default="", help="comma separated operation names, all of them by default")
+    parser.add_argument("--duration", type=float, default=0.5, help="seconds to run every operation")
+    parser.add_argument("--save", help="path of a JSON baseline to write")
+    parser.add_argument("--compare", help="path of a JSON baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput decrease before reporting a regression")
+    arguments = parser.parse_args()
+
+    # Parse the benchmark matrix
+    sizes = [int(size) for size in arguments.sizes.split(",")]
+    depths = [int(depth) for depth in arguments.depths.split(",")]
+    selected = set(filter(None, arguments.operations.split(",")))
+
+    # Print the table header
+    print(f"{'benchmark':<60}{'ops/s':>12}{'round trips':>14}{'commands':>10}{'peak KiB':>10}")
+
+    # Loop over the whole matrix
+    results: typing.Dict[str, typing.Dict[str, float]] = {}
+    for decode_responses in (False, True):
+        connection = redis.Redis(host=arguments.host, port=arguments.port, decode_responses=decode_responses)
+        for container_type, operations in ((Dictionary, DICTIONARY_OPERATIONS), (List, LIST_OPERATIONS)):
+            for size in sizes:
+                for depth in depths:
+                    # Create a fresh tree for every combination
+                    name = f"benchmark:{os.urandom(4).hex()}"
+                    master = populate(connection, name, container_type, size, depth)
+
+                    try:
+                        for operation_name, operation in operations.items():
+                            # Skip operations which were not selected
+                            if selected and operation_name not in selected:
+                                continue
+
+                            # Measure the operation and print the results
+                            qualified_name = f"{container_type.__name__}.{operation_name}"
+                            benchmark = f"{qualified_name}/size={size}/depth={depth}/decode={decode_responses}"
+                            result = results[benchmark] = measure(master, operation, SETUPS.get(qualified_name), size, depth, arguments.duration)
+                            print(f"{benchmark:<60}{result['ops']:>12,.1f}{result['round_trips']:>14}{result['commands']:>10}{result['peak_bytes'] / 1024:>10,.1f}")
+                    finally:
+                        # Delete the tree
+                        master.clear()
+
+    # Store the results as a baseline
+    if arguments.save:
+        with open(arguments.save, "w") as file:
+            json.dump({"version": version(), "results": results}, file, indent=2)
+
+    # Compare the results to a previous baseline, failing on regressions
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            regressions = compare(results, json.load(file), arguments.tolerance)
+        sys.exit(1 if regressions else 0)
+
+
+def version() -> str:
+    # Fetch the version of the installed package, if installed
+    try:
+        return importlib.metadata.version("rednest")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,37 @@
 # Import redis encoder
 from rednest.encoder import Encoder
 
+# Import value codecs
+from rednest.codec import Codec, ReprCodec, JSONCodec, PickleCodec, TaggedCodec
+
+# Import the near cache
+from rednest.cache import NearCache
+
+# Import write batching
+from rednest.batching import Batch, batch, Transaction, TransactionStats, TRANSACTION_STATS, transaction
+
+# Import operation instrumentation
+from rednest.instrumentation import LATENCY_BUCKETS, OperationSample, OperationStats, enable_instrumentation, disable_instrumentation, stats, reset_stats, add_exporter, remove_exporter
+
+# Import explain mode
+from rednest.explain import PlanCommand, PlanNode, Finding, Plan, explain
+
 # Import nested objects
 from rednest.list import List
+from rednest.counter import Counter
 from rednest.dictionary import Dictionary
 
+# Import sharded dictionaries
+from rednest.sharded import ShardedDictionary
+
+# Import streaming transfer functions
+from rednest.transfer import TransferStats, walk, dump, load
+
+# Import asyncio nested objects
+from rednest.asynchronous import AsyncNested, AsyncList, AsyncCounter, AsyncDictionary, ASYNC_NESTED_TYPES
+
 # Import base objects for extendability
-from rednest.nested import Nested, NestedType, NESTED_TYPES
+from rednest.nested import NestedBase, Nested, NestedType, NestedTypeRegistry, NESTED_TYPES
 
 # Set exported names
-__all__ = ["Encoder", "List", "Dictionary", "Nested", "NestedType", "NESTED_TYPES"]
+__all__ = ["Encoder", "Codec", "ReprCodec", "JSONCodec", "PickleCodec", "TaggedCodec", "NearCache", "Batch", "batch", "Transaction", "TransactionStats", "TRANSACTION_STATS", "transaction", "LATENCY_BUCKETS", "OperationSample", "OperationStats", "enable_instrumentation", "disable_instrumentation", "stats", "reset_stats", "add_exporter", "remove_exporter", "PlanCommand", "PlanNode", "Finding", "Plan", "explain", "TransferStats", "walk", "dump", "load", "List", "Counter", "Dictionary", "ShardedDictionary", "AsyncList", "AsyncCounter", "AsyncDictionary", "AsyncNested", "ASYNC_NESTED_TYPES", "NestedBase", "Nested", "NestedType", "NestedTypeRegistry", "NESTED_TYPES"]
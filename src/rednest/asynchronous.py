@@ -0,0 +1,721 @@
+import abc
+import copy
+import typing
+import asyncio
+import contextlib
+import collections
+
+import redis
+import redis.asyncio
+
+# Import abstract types
+from collections.abc import Iterable, Mapping
+
+# Import extension objects
+from rednest.nested import NestedBase, NestedType, NestedTypeRegistry
+
+# Import operation instrumentation
+from rednest.instrumentation import instrument_class
+
+# Import the synchronous objects, whose write planners are shared
+from rednest.list import List
+from rednest.counter import Count, Counter
+from rednest.dictionary import Dictionary, DEFAULT
+
+# Import lua scripts
+from rednest.scripts import DELETE_SCRIPT, MATERIALIZE_SCRIPT, INDEX_SCRIPT, SPLICE_SCRIPT, REPLACE_FIELDS_SCRIPT
+
+
+class AsyncNested(NestedBase):
+
+    # Instance redis connection
+    _client: redis.asyncio.Redis = None  # type: ignore
+
+    def __init_subclass__(cls, **kwargs: typing.Any) -> None:
+        # Initialize the subclass
+        super().__init_subclass__(**kwargs)
+
+        # Measure the operations of the nested type while instrumentation is used
+        instrument_class(cls)
+
+    def _nested_types(self) -> NestedTypeRegistry:
+        # Return the registry of the asynchronous nested types
+        return ASYNC_NESTED_TYPES
+
+    @abc.abstractmethod
+    async def initialize(self, value: typing.Any) -> None:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def deinitialize(self) -> None:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    async def copy(self) -> typing.Any:
+        raise NotImplementedError()
+
+    async def _execute_script(self, script: str, keys: typing.Sequence[str] = (), args: typing.Sequence[typing.Any] = (), client: typing.Optional[redis.asyncio.client.Pipeline] = None) -> typing.Any:
+        # Pipelines send the script as is - cached scripts cost a SCRIPT EXISTS round trip before every pipeline
+        if client is not None:
+            return client.execute_command("EVAL", script, len(keys), *keys, *args)
+
+        # Register the script on the connection and execute it
+        return await self._connection.register_script(script)(keys=keys, args=args)
+
+    async def _delete_by_identifier(self, identifier: typing.Union[str, bytes]) -> None:
+        # Delete the nested tree of the identifier
+        await self._delete_tree(identifiers=[identifier])
+
+    async def _delete_tree(self, keys: typing.Iterable[str] = (), identifiers: typing.Iterable[typing.Union[str, bytes]] = (), chunk_size: typing.Optional[int] = None) -> None:
+        # Use the default chunk size if needed
+        if chunk_size is None:
+            chunk_size = self._DELETE_CHUNK_SIZE
+
+        # Filter out scalar identifiers, which have nothing to delete
+        keys, identifiers = list(keys), [identifier for identifier in identifiers if identifier[:1] not in (":", b":")]
+
+        # Loop until there is nothing left to delete
+        while keys or identifiers:
+            # Delete the next chunk of the trees
+            response = await self._execute_script(DELETE_SCRIPT, keys=[self._key], args=[chunk_size, len(keys), *keys, *identifiers])
+
+            # Make sure the response is a list
+            if not isinstance(response, list):
+                raise TypeError(response)
+
+            # Split the response to the remaining work and the unknown identifiers
+            keys, identifiers, unknown_identifiers = response
+
+            # Deinitialize nested types the script does not know about, concurrently
+            await asyncio.gather(*(self._deinitialize_by_identifier(identifier) for identifier in unknown_identifiers))
+
+    async def _deinitialize_by_identifier(self, identifier: typing.Union[str, bytes]) -> None:
+        # Fetch the nested object
+        nested_item = self._fetch_by_identifier(identifier)
+
+        # If the item is nested, deconstruct it
+        if not isinstance(nested_item, AsyncNested):
+            return
+
+        # Deinitialize the nested item
+        await nested_item.deinitialize()
+
+    @contextlib.asynccontextmanager
+    async def _create_identifiers_from_values(self, values: typing.Iterable[typing.Any]) -> typing.AsyncIterator[typing.List[str]]:
+        # Copy nested values, since planning cannot wait for them
+        values = await asyncio.gather(*(self._snapshot(value) for value in values))
+
+        # Create a pipeline to hold all of the nested writes
+        pipeline = self._connection.pipeline()
+
+        # Plan the identifiers and execute all of the nested writes at once
+        identifiers = [self._plan_identifier(pipeline, value) for value in values]
+        await pipeline.execute()
+
+        try:
+            # Yield the identifiers
+            yield identifiers
+        except:
+            # If there was a failure to insert the identifiers, delete the nested items
+            await self._delete_tree(identifiers=identifiers)
+
+            # Re-raise the exception
+            raise
+
+    async def _snapshot(self, value: typing.Any) -> typing.Any:
+        # Copy asynchronous nested values
+        if isinstance(value, AsyncNested):
+            return await value.copy()
+
+        # Only dictionaries and lists may contain asynchronous nested values
+        if not isinstance(value, (dict, list)):
+            return value
+
+        # Find the items which may contain asynchronous nested values
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        containers = [(key, item) for key, item in items if isinstance(item, (AsyncNested, dict, list))]
+
+        # If there are no such items, the value can be planned as is
+        if not containers:
+            return value
+
+        # Copy all of the items concurrently into a shallow copy of the value
+        value = copy.copy(value)
+        for (key, _), item in zip(containers, await asyncio.gather(*(self._snapshot(item) for _, item in containers))):
+            value[key] = item
+
+        # Return the copied value
+        return value
+
+    async def _materialize(self) -> typing.List[typing.Any]:
+        # Fetch the entire nested tree in a single call
+        contents = await self._execute_script(MATERIALIZE_SCRIPT, keys=[self._key])
+
+        # Make sure the contents are a list
+        if not isinstance(contents, list):
+            raise TypeError(contents)
+
+        # Return the materialized contents
+        return contents
+
+    async def _copy_from_contents(self, contents: typing.List[typing.Any]) -> typing.Any:
+        # By default, ignore the materialized contents and copy the nested value directly
+        return await self.copy()
+
+    async def _copy_from_materialized(self, value: typing.Any) -> typing.Any:
+        # Check whether the value was materialized as an identifier and contents pair
+        if isinstance(value, list):
+            # Split the pair to the identifier and the contents
+            identifier, contents = value
+
+            # Create the nested instance and copy it from the contents
+            return await self._fetch_by_identifier(identifier)._copy_from_contents(contents)
+
+        # Fetch the value from the identifier
+        value = self._fetch_by_identifier(value)
+
+        # Copy nested types which were not materialized
+        if isinstance(value, AsyncNested):
+            value = await value.copy()
+
+        # Return the copied value
+        return value
+
+    async def _copy_all(self, values: typing.List[typing.Any]) -> typing.List[typing.Any]:
+        # Decode scalars directly
+        output = [value if isinstance(value, list) or value[:1] not in (":", b":") else self._fetch_by_identifier(value) for value in values]
+
+        # Copy all of the nested values concurrently
+        positions = [position for position, value in enumerate(values) if isinstance(value, list) or value[:1] not in (":", b":")]
+        for position, value in zip(positions, await asyncio.gather(*(self._copy_from_materialized(values[position]) for position in positions))):
+            output[position] = value
+
+        # Return the copied values
+        return output
+
+
+class AsyncDictionary(AsyncNested):
+
+    # Copy type - the type used when calling copy
+    _COPY_TYPE: typing.Type[typing.MutableMapping[typing.Any, typing.Any]] = dict
+
+    # Share the write planner with the synchronous dictionary
+    _plan_initialize = Dictionary._plan_initialize  # type: ignore[assignment]
+
+    async def initialize(self, value: typing.Dict[typing.Any, typing.Any]) -> None:
+        # De-initialize before initializing
+        await self.deinitialize()
+
+        # Update the dictionary
+        await self.update(value)
+
+    async def deinitialize(self) -> None:
+        # Clear the dictionary
+        await self.clear()
+
+    async def _identifier_from_key(self, key: typing.Any) -> typing.Union[str, bytes]:
+        # Fetch the identifier from the hash
+        identifier = await self._connection.hget(self._key, self._encode(key))
+
+        # If the response is empty, item does not exist
+        if identifier is None:
+            raise KeyError(key)
+
+        # Return the identifier
+        return identifier  # type: ignore[no-any-return]
+
+    async def __getitem__(self, key: typing.Any) -> typing.Any:
+        # Fetch the identifier, then return the value
+        return self._fetch_by_identifier(await self._identifier_from_key(key))
+
+    async def get(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        try:
+            # Try fetching the value
+            return await self[key]
+        except KeyError:
+            # Return the default
+            return default
+
+    async def set(self, key: typing.Any, value: typing.Any) -> None:
+        # Use the update method to update the item
+        await self.update({key: value})
+
+    async def delete(self, key: typing.Any) -> None:
+        # Fetch the identifier
+        identifier = await self._identifier_from_key(key)
+
+        # Delete the key from hash
+        await self._connection.hdel(self._key, self._encode(key))
+
+        # Delete the nested value
+        await self._delete_by_identifier(identifier)
+
+    async def contains(self, key: typing.Any) -> bool:
+        # Make sure key exists in database
+        return bool(await self._connection.hexists(self._key, self._encode(key)))
+
+    async def length(self) -> int:
+        # Fetch the hash length
+        return int(await self._connection.hlen(self._key))
+
+    async def _scan(self, count: typing.Optional[int] = None) -> typing.AsyncIterator[typing.Tuple[typing.Union[str, bytes], typing.Union[str, bytes]]]:
+        # Start scanning from the beginning
+        cursor = 0
+
+        # Loop until the cursor wraps around
+        while True:
+            # Fetch the next page of the hash
+            cursor, raw_mapping = await self._connection.hscan(self._key, cursor, count=count or self._CHUNK_SIZE)
+
+            # Yield the raw items of the page
+            for item in raw_mapping.items():
+                yield item
+
+            # Check whether the scan is done
+            if not cursor:
+                return
+
+    async def keys(self, count: typing.Optional[int] = None) -> typing.AsyncIterator[typing.Any]:
+        # Stream the decoded keys
+        async for encoded_key, _ in self._scan(count):
+            yield self._decode_key(encoded_key)
+
+    async def values(self, count: typing.Optional[int] = None) -> typing.AsyncIterator[typing.Any]:
+        # Stream the fetched values
+        async for _, identifier in self._scan(count):
+            yield self._fetch_by_identifier(identifier)
+
+    async def items(self, count: typing.Optional[int] = None) -> typing.AsyncIterator[typing.Tuple[typing.Any, typing.Any]]:
+        # Stream the decoded keys and the fetched values
+        async for encoded_key, identifier in self._scan(count):
+            yield self._decode_key(encoded_key), self._fetch_by_identifier(identifier)
+
+    def __aiter__(self) -> typing.AsyncIterator[typing.Any]:
+        # Iterate over the keys
+        return self.keys()
+
+    async def pop(self, key: typing.Any, default: typing.Any = DEFAULT) -> typing.Any:
+        try:
+            # Fetch the original value
+            value = await self[key]
+
+            # Try copying the value
+            if isinstance(value, AsyncNested):
+                value = await value.copy()
+
+            # Delete the item
+            await self.delete(key)
+
+            # Return the value
+            return value
+        except KeyError:
+            # Check if a default is defined
+            if default is not DEFAULT:
+                return default
+
+            # Reraise exception
+            raise
+
+    async def clear(self) -> None:
+        # Delete the hash and all of the nested values
+        await self._delete_tree(keys=[self._key])
+
+    async def update(self, other: typing.Any = (), /, **kwargs: typing.Any) -> None:
+        # Add values from "other" to "kwargs", since kwargs is a dictionary
+        if other:
+            kwargs.update(other)
+
+        # If there is nothing to update, return
+        if not kwargs:
+            return
+
+        # Copy nested values, since planning cannot wait for them
+        values = await asyncio.gather(*(self._snapshot(value) for value in kwargs.values()))
+
+        # Create a pipeline to hold all of the writes
+        pipeline = self._connection.pipeline()
+
+        # Create dictionary to hold nested identifiers
+        mapping = {
+            # Encoded key: Nested value identifier
+            self._encode(key): self._plan_identifier(pipeline, value)
+            # For each item in the dictionary
+            for key, value in zip(kwargs, values)
+        }
+
+        # Swap all of the identifiers atomically, fetching the originals for future deletion - concurrent writers cannot leak each other's values
+        await self._execute_script(REPLACE_FIELDS_SCRIPT, keys=[self._key], args=[argument for item in mapping.items() for argument in item], client=pipeline)
+
+        # Execute all of the nested writes and the hash update at once
+        original_identifiers = (await pipeline.execute())[-1]
+
+        # Make sure original identifiers is iterable
+        if not isinstance(original_identifiers, Iterable):
+            raise TypeError(original_identifiers)
+
+        # Delete all of the original values at once
+        await self._delete_tree(identifiers=[original_identifier for original_identifier in original_identifiers if original_identifier is not None])
+
+    async def setdefault(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        try:
+            # If the key already exists, return it
+            return await self[key]
+        except KeyError:
+            # Create the nested item
+            async with self._create_identifiers_from_values([default]) as (identifier,):
+                # Try inserting the nested identifier atomically
+                if await self._connection.hsetnx(self._key, self._encode(key), identifier):
+                    # Value was inserted, return it
+                    return default
+
+                # Delete the identifier
+                await self._delete_by_identifier(identifier)
+
+            # Since our first check (of getting self[key]), the value was added.
+            return await self[key]
+
+    async def copy(self) -> typing.Mapping[typing.Any, typing.Any]:
+        # Materialize the entire tree in a single call and copy it
+        return await self._copy_from_contents(await self._materialize())
+
+    async def _copy_from_contents(self, contents: typing.List[typing.Any]) -> typing.Mapping[typing.Any, typing.Any]:
+        # Copy all of the values, fanning out the nested values
+        return self._COPY_TYPE(zip(map(self._decode_key, contents[::2]), await self._copy_all(contents[1::2])))
+
+
+class AsyncList(AsyncNested):
+
+    # Copy type - the type used when calling copy
+    _COPY_TYPE: typing.Type[typing.MutableSequence[typing.Any]] = list
+
+    # Share the write planners with the synchronous list
+    _plan_initialize = List._plan_initialize  # type: ignore[assignment]
+    _plan_extend = List._plan_extend
+
+    async def initialize(self, value: typing.List[typing.Any]) -> None:
+        # If the value is nested, copy it before de-initializing
+        if isinstance(value, AsyncNested):
+            value = await value.copy()
+
+        # De-initialize before initializing
+        await self.deinitialize()
+
+        # Update the list
+        await self.extend(value)
+
+    async def deinitialize(self) -> None:
+        # Clear the list
+        await self.clear()
+
+    async def __getitem__(self, index: typing.Union[int, slice]) -> typing.Any:
+        # If a slice is provided, return a list of items
+        if isinstance(index, slice):
+            # Fetch the identifiers and decode them in bulk
+            return [self._fetch_by_identifier(identifier) for identifier in await self._identifiers_from_slice(index)]
+
+        # Request the item at the index - negative indexes are supported natively
+        identifier = await self._connection.lindex(self._key, index)
+
+        # If the response is empty, item does not exist
+        if identifier is None:
+            raise IndexError(index)
+
+        # Return the nested value
+        return self._fetch_by_identifier(identifier)
+
+    async def _identifiers_from_slice(self, index: slice) -> typing.List[typing.Union[str, bytes]]:
+        # Fetch the slice indices
+        indices = range(*index.indices(await self.length()))
+
+        # If the slice is empty, nothing to fetch
+        if not indices:
+            return []
+
+        # Request the entire span of the slice, reversing it for negative steps
+        if indices.step > 0:
+            identifiers = await self._connection.lrange(self._key, indices[0], indices[-1])
+        else:
+            identifiers = (await self._connection.lrange(self._key, indices[-1], indices[0]))[::-1]
+
+        # Apply the step to the span
+        return identifiers[::abs(indices.step)]  # type: ignore[no-any-return]
+
+    async def set(self, index: typing.Union[int, slice], value: typing.Any) -> None:
+        # If a slice is provided, splice the list
+        if isinstance(index, slice):
+            # Create all of the new identifiers at once
+            async with self._create_identifiers_from_values(await self._snapshot(list(value))) as identifiers:
+                # Splice the list atomically
+                original_identifiers = await self._splice(index, identifiers)
+
+            # Delete the original nested values
+            await self._delete_tree(identifiers=original_identifiers)
+
+            # Nothing more to do
+            return
+
+        # Generate the item value and set it atomically
+        async with self._create_identifiers_from_values([value]) as (identifier,):
+            original_identifier = await self._execute_index_script("set", index, identifier)
+
+        # Delete the original nested value
+        await self._delete_by_identifier(original_identifier)
+
+    async def delete(self, index: typing.Union[int, slice]) -> None:
+        # If a slice is provided, delete the slice atomically and delete the original nested values
+        if isinstance(index, slice):
+            await self._delete_tree(identifiers=await self._splice(index))
+            return
+
+        # Delete the item atomically and delete the original nested object
+        await self._delete_by_identifier(await self._execute_index_script("delete", index))
+
+    async def _execute_index_script(self, operation: str, index: int, identifier: str = "") -> typing.Union[str, bytes]:
+        try:
+            # Execute the operation on the index
+            return await self._execute_script(INDEX_SCRIPT, keys=[self._key], args=[operation, index, identifier])  # type: ignore[no-any-return]
+        except redis.ResponseError as exception:
+            # Check whether the index was out of range
+            if not str(exception).startswith("INDEX"):
+                raise
+
+            # Raise an index error instead
+            raise IndexError(index) from None
+
+    async def _splice(self, index: slice, identifiers: typing.Optional[typing.List[str]] = None) -> typing.List[typing.Union[str, bytes]]:
+        # Convert the slice to script arguments
+        arguments = ["" if argument is None else argument for argument in (index.start, index.stop, index.step)]
+
+        # Make sure the step is valid
+        if index.step == 0:
+            raise ValueError("slice step cannot be zero")
+
+        try:
+            # Assign or delete the slice
+            if identifiers is not None:
+                return await self._execute_script(SPLICE_SCRIPT, keys=[self._key], args=[*arguments, "assign", *identifiers])  # type: ignore[no-any-return]
+
+            return await self._execute_script(SPLICE_SCRIPT, keys=[self._key], args=[*arguments, "delete"])  # type: ignore[no-any-return]
+        except redis.ResponseError as exception:
+            # Check whether the extended slice size did not match
+            if not str(exception).startswith("SIZE"):
+                raise
+
+            # Raise a value error instead
+            raise ValueError(f"Attempted to assign sequence of incompatible size {len(identifiers or ())}") from None
+
+    async def length(self) -> int:
+        # Fetch the list length
+        return int(await self._connection.llen(self._key))
+
+    async def iter_chunks(self, size: typing.Optional[int] = None) -> typing.AsyncIterator[typing.List[typing.Any]]:
+        # Start from the beginning of the list
+        start, size = 0, size or self._CHUNK_SIZE
+
+        # Loop until the end of the list
+        while True:
+            # Fetch the next window of identifiers
+            identifiers = await self._connection.lrange(self._key, start, start + size - 1)
+
+            # If the window is empty, the list has ended
+            if not identifiers:
+                return
+
+            # Yield the values of the window
+            yield [self._fetch_by_identifier(identifier) for identifier in identifiers]
+
+            # If the window is partial, the list has ended
+            if len(identifiers) < size:
+                return
+
+            # Move to the next window
+            start += size
+
+    async def __aiter__(self) -> typing.AsyncIterator[typing.Any]:
+        # Stream the list chunk by chunk
+        async for chunk in self.iter_chunks():
+            for item in chunk:
+                yield item
+
+    async def append(self, value: typing.Any) -> None:
+        # Extend the list with a single value
+        await self.extend([value])
+
+    async def extend(self, values: typing.Iterable[typing.Any]) -> None:
+        # Copy nested values, since planning cannot wait for them
+        values = await self._snapshot(await values.copy() if isinstance(values, AsyncNested) else list(values))
+
+        # Create a pipeline to hold all of the writes
+        pipeline = self._connection.pipeline()
+
+        # Plan the nested writes and the pushes, then execute them at once
+        self._plan_extend(pipeline, values)
+        await pipeline.execute()
+
+    async def insert(self, index: int, value: typing.Any) -> None:
+        # Generate the item value and insert it atomically
+        async with self._create_identifiers_from_values([value]) as (identifier,):
+            await self._execute_index_script("insert", index, identifier)
+
+    async def pop(self, index: int = -1) -> typing.Any:
+        # Remove the item atomically
+        identifier = await self._execute_index_script("delete", index)
+
+        # Fetch the original value
+        value = self._fetch_by_identifier(identifier)
+
+        # Try copying the value
+        if isinstance(value, AsyncNested):
+            value = await value.copy()
+
+        # Delete the original nested object
+        await self._delete_by_identifier(identifier)
+
+        # Return the value
+        return value
+
+    async def clear(self) -> None:
+        # Delete the list and all of the nested values
+        await self._delete_tree(keys=[self._key])
+
+    async def copy(self) -> typing.Sequence[typing.Any]:
+        # Materialize the entire tree in a single call and copy it
+        return await self._copy_from_contents(await self._materialize())
+
+    async def _copy_from_contents(self, contents: typing.List[typing.Any]) -> typing.Sequence[typing.Any]:
+        # Copy all of the values, fanning out the nested values
+        return self._COPY_TYPE(await self._copy_all(contents))
+
+
+class AsyncCounter(AsyncNested):
+
+    # Copy type - the type used when calling copy
+    _COPY_TYPE: typing.Type[typing.MutableMapping[typing.Any, Count]] = collections.Counter
+
+    # Share the write planner and the score decoder with the synchronous counter
+    _plan_initialize = Counter._plan_initialize  # type: ignore[assignment]
+    _decode_count = Counter._decode_count
+
+    async def initialize(self, value: typing.Any) -> None:
+        # Copy nested values before de-initializing
+        value = await self._snapshot(value)
+
+        # De-initialize before initializing
+        await self.deinitialize()
+
+        # Set all of the counts at once
+        pipeline = self._connection.pipeline()
+        self._plan_initialize(pipeline, value)
+        await pipeline.execute()
+
+    async def deinitialize(self) -> None:
+        # Clear the counter
+        await self.clear()
+
+    async def __getitem__(self, key: typing.Any) -> Count:
+        # Fetch the count, missing elements are counted as zero
+        return await self.get(key, 0)  # type: ignore[no-any-return]
+
+    async def get(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        # Fetch the score of the element
+        score = await self._connection.zscore(self._key, self._encode(key))
+
+        # If the element is missing, return the default
+        if score is None:
+            return default
+
+        # Return the count
+        return self._decode_count(score)
+
+    async def set(self, key: typing.Any, value: Count) -> None:
+        # Set the count of the element
+        await self._connection.zadd(self._key, {self._encode(key): value})
+
+    async def delete(self, key: typing.Any) -> None:
+        # Remove the element - like collections.Counter, missing elements are ignored
+        await self._connection.zrem(self._key, self._encode(key))
+
+    async def contains(self, key: typing.Any) -> bool:
+        # Check whether the element has a score
+        return await self._connection.zscore(self._key, self._encode(key)) is not None
+
+    async def length(self) -> int:
+        # Fetch the number of elements
+        return await self._connection.zcard(self._key)  # type: ignore[no-any-return]
+
+    async def keys(self, count: typing.Optional[int] = None) -> typing.AsyncIterator[typing.Any]:
+        # Stream the elements - elements modified during the scan might be returned more than once
+        async for encoded_key, _ in self._connection.zscan_iter(self._key, count=count or self._CHUNK_SIZE):
+            yield self._decode_key(encoded_key)
+
+    def __aiter__(self) -> typing.AsyncIterator[typing.Any]:
+        # Iterate over the elements
+        return self.keys()
+
+    async def increment(self, key: typing.Any, amount: Count = 1) -> Count:
+        # Increment the count atomically and return the new count
+        return self._decode_count(await self._connection.zincrby(self._key, amount, self._encode(key)))
+
+    async def update(self, other: typing.Any = (), /, **kwargs: typing.Any) -> None:
+        # Add the counts of the elements
+        await self._add(other, kwargs, 1)
+
+    async def subtract(self, other: typing.Any = (), /, **kwargs: typing.Any) -> None:
+        # Subtract the counts of the elements
+        await self._add(other, kwargs, -1)
+
+    async def _add(self, other: typing.Any, kwargs: typing.Dict[str, typing.Any], sign: int) -> None:
+        # Count the elements locally first, so that every element is sent once
+        counts: typing.Counter[typing.Any] = collections.Counter()
+
+        # Add the counts of mappings, or count iterables of elements
+        other = await self._snapshot(other)
+        if isinstance(other, Mapping):
+            for key, count in other.items():
+                counts[key] += count
+        else:
+            counts.update(other)
+
+        # Add the keyword counts
+        for key, count in kwargs.items():
+            counts[key] += count
+
+        # If there is nothing to add, return
+        if not counts:
+            return
+
+        # Increment all of the counts in a single round trip
+        pipeline = self._connection.pipeline(transaction=False)
+        for key, count in counts.items():
+            pipeline.zincrby(self._key, sign * count, self._encode(key))
+        await pipeline.execute()
+
+    async def most_common(self, n: typing.Optional[int] = None) -> typing.List[typing.Tuple[typing.Any, Count]]:
+        # Fetch the highest counts only - equal counts are ordered by their encoded elements, not by insertion
+        if n is not None and n <= 0:
+            return []
+
+        # Fetch the elements with their scores, highest first
+        entries = await self._connection.zrange(self._key, 0, -1 if n is None else n - 1, desc=True, withscores=True)
+
+        # Decode all of the entries
+        return [(self._decode_key(encoded_key), self._decode_count(score)) for encoded_key, score in entries]
+
+    async def total(self) -> Count:
+        # Sum all of the counts
+        return sum(count for _, count in await self.most_common())
+
+    async def clear(self) -> None:
+        # Delete the sorted set
+        await self._connection.delete(self._key)
+
+    async def copy(self) -> typing.MutableMapping[typing.Any, Count]:
+        # Create a counter from all of the entries
+        return self._COPY_TYPE(dict(await self.most_common()))
+
+
+# Registry of all supported asynchronous nested types - storage compatible with the synchronous types
+ASYNC_NESTED_TYPES: NestedTypeRegistry = NestedTypeRegistry()
+ASYNC_NESTED_TYPES.register(NestedType("hash", AsyncDictionary, dict))
+ASYNC_NESTED_TYPES.register(NestedType("list", AsyncList, list))
+ASYNC_NESTED_TYPES.register(NestedType("zset", AsyncCounter, collections.Counter))
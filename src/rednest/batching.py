@@ -0,0 +1,231 @@
+import typing
+import threading
+import contextlib
+import dataclasses
+
+import redis
+import redis.cluster
+
+# Import nested objects for type checking only, since nested objects import this module
+if typing.TYPE_CHECKING:
+    from rednest.nested import Nested
+
+# Create deletion marker so that None can be buffered as a value
+DELETED = object()
+
+# Type of the callbacks which process the results of a flushed handle - returning the identifiers to delete and the errors to raise
+Finisher = typing.Callable[[typing.List[typing.Any]], typing.Tuple[typing.List[typing.Any], typing.List[Exception]]]
+
+
+class Batch:
+
+    def __init__(self) -> None:
+        # Whether writes are currently buffered
+        self.active = True
+
+        # Buffered writes by connection and key, along with the handle which flushes them
+        self._writes: typing.Dict[typing.Tuple[int, str], typing.Tuple["Nested", typing.Any]] = {}
+
+    def writes(self, handle: "Nested", factory: typing.Callable[[], typing.Any]) -> typing.Any:
+        # Fetch the buffered writes of the handle key
+        entry = self._writes.get((id(handle._client), handle._key))
+
+        # Create the buffered writes if needed
+        if entry is None:
+            entry = self._writes[(id(handle._client), handle._key)] = (handle, factory())
+
+        # Return the buffered writes
+        return entry[1]
+
+    def join(self, handle: "Nested") -> None:
+        # Make sure the handle can take part in batches - otherwise its writes would silently bypass the batch
+        if not handle._BATCHABLE:
+            raise TypeError(f"{type(handle).__name__} does not support batching")
+
+        # Buffer the writes of the handle
+        handle._batch = self
+
+    def flush(self) -> None:
+        # Group the buffered writes by connection - cluster transactions are also limited to a single hash slot
+        groups: typing.Dict[typing.Tuple[int, typing.Optional[str]], typing.List[typing.Tuple["Nested", typing.Any]]] = {}
+        for (connection_id, _), (handle, writes) in self._writes.items():
+            slot = handle._slot_prefix(handle._master) if isinstance(handle._connection, redis.cluster.RedisCluster) else None
+            groups.setdefault((connection_id, slot), []).append((handle, writes))
+
+        # Clear the buffered writes, so that failures do not flush them again
+        self._writes.clear()
+
+        # Collect the errors of all of the connections
+        errors: typing.List[Exception] = []
+
+        # Flush every group in a single transaction
+        for entries in groups.values():
+            errors.extend(self._execute(entries[0][0]._connection.pipeline(transaction=True), entries))
+
+        # Raise the first error
+        if errors:
+            raise errors[0]
+
+    def _execute(self, pipeline: typing.Any, entries: typing.List[typing.Tuple["Nested", typing.Any]]) -> typing.List[Exception]:
+        # Plan the writes of all of the handles
+        finishers = [handle._plan_batch(pipeline, writes) for handle, writes in entries]
+
+        # Execute all of the writes at once
+        results = pipeline.execute(raise_on_error=False)
+
+        # Process the results of all of the handles
+        identifiers: typing.List[typing.Any] = []
+        errors: typing.List[Exception] = []
+        for finisher in finishers:
+            finished_identifiers, finished_errors = finisher(results)
+            identifiers.extend(finished_identifiers)
+            errors.extend(finished_errors)
+
+        # Delete all of the replaced nested values at once
+        if entries:
+            entries[0][0]._delete_tree(identifiers=identifiers)
+
+        # Invalidate the cached values of all of the handles
+        for handle, _ in entries:
+            handle._invalidate()
+
+        # Return the errors of the handles and of the transaction itself
+        return errors + [result for result in results if isinstance(result, Exception)]
+
+
+@dataclasses.dataclass
+class TransactionStats:
+
+    # Number of committed transactions
+    commits: int = 0
+
+    # Number of attempts which were retried because of conflicts
+    retries: int = 0
+
+    # Number of transactions which were not committed
+    aborts: int = 0
+
+    # Lock protecting the counters
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, counter: str) -> None:
+        # Increment the counter safely across threads
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+# Counters of all of the transactions
+TRANSACTION_STATS = TransactionStats()
+
+
+class Transaction(Batch):
+
+    def __init__(self, pipeline: typing.Any) -> None:
+        # Initialize the buffered writes
+        super().__init__()
+
+        # Store the pipeline which watches the keys
+        self._pipeline = pipeline
+
+    def watch(self, *keys: str) -> None:
+        # Watch the keys, so that concurrent changes abort the commit
+        if keys:
+            self._pipeline.watch(*keys)
+
+    def join(self, handle: "Nested") -> None:
+        # Buffer the writes of the handle
+        super().join(handle)
+
+        # Watch the key of the handle before it is read
+        self.watch(handle._key)
+
+    def flush(self) -> None:
+        # Flushing in the middle of a transaction would break its isolation
+        if self.active:
+            raise RuntimeError("Writes which cannot be buffered are not supported inside transactions")
+
+    def commit(self) -> None:
+        # Stop buffering writes
+        self.active = False
+
+        # Fetch and clear the buffered writes
+        entries = list(self._writes.values())
+        self._writes.clear()
+
+        # Execute all of the writes in a single transaction - raises WatchError when a watched key changed
+        self._pipeline.multi()
+        errors = self._execute(self._pipeline, entries)
+
+        # Raise the first error
+        if errors:
+            raise errors[0]
+
+
+@contextlib.contextmanager
+def batch(*handles: "Nested") -> typing.Iterator[Batch]:
+    # Create a new batch
+    writes = Batch()
+
+    # Buffer the writes of all of the handles which are not already batched - nested batches join the outer batch
+    handles = tuple(handle for handle in handles if handle._batching() is None)
+    for handle in handles:
+        writes.join(handle)
+
+    try:
+        # Yield the batch
+        yield writes
+    except:
+        # Discard the buffered writes
+        writes.active = False
+
+        # Re-raise the exception
+        raise
+    finally:
+        # Stop buffering the writes of the handles
+        for handle in handles:
+            handle._batch = None
+
+    # Flush all of the buffered writes
+    writes.active = False
+    writes.flush()
+
+
+def transaction(handle: "Nested", function: typing.Callable[["Nested"], typing.Any], retries: int = 10) -> typing.Any:
+    # Transactions cannot join other batches, since their writes must be committed together with the watches
+    if handle._batching() is not None:
+        raise RuntimeError("Transactions cannot be used inside batches or other transactions")
+
+    # Attempt the transaction until it commits without conflicts
+    for attempt in range(retries + 1):
+        with handle._connection.pipeline(transaction=True) as pipeline:
+            # Create a new transaction and watch the handle
+            writes = Transaction(pipeline)
+            writes.join(handle)
+
+            try:
+                # Run the function against the buffered handle, then commit its writes
+                result = function(handle)
+                writes.commit()
+            except redis.WatchError:
+                # A watched key changed, retry unless this was the last attempt
+                if attempt < retries:
+                    TRANSACTION_STATS.record("retries")
+                continue
+            except:
+                # Discard the buffered writes
+                TRANSACTION_STATS.record("aborts")
+
+                # Re-raise the exception
+                raise
+            finally:
+                # Stop buffering the writes of the handle
+                writes.active = False
+                handle._batch = None
+
+        # The transaction was committed
+        TRANSACTION_STATS.record("commits")
+        return result
+
+    # The transaction kept conflicting
+    TRANSACTION_STATS.record("aborts")
+    raise redis.WatchError(f"Transaction was aborted after {retries} retries")
@@ -0,0 +1,207 @@
+import typing
+import threading
+import collections
+
+import redis
+
+# Channel used for invalidation messages when tracking is redirected
+INVALIDATION_CHANNEL = "__redis__:invalidate"
+
+
+class NearCache:
+
+    # Interval for checking whether the cache was closed while waiting for invalidations
+    _POLL_INTERVAL: float = 1.0
+
+    def __init__(self, connection: redis.Redis, max_size: int = 10000, prefixes: typing.Sequence[str] = ()) -> None:
+        # Store the cache configuration
+        self._max_size = max_size
+
+        # Cached values by redis key and field, in least recently used order
+        self._lock = threading.Lock()
+        self._entries: typing.OrderedDict[typing.Tuple[str, typing.Any], typing.Any] = collections.OrderedDict()
+        self._fields: typing.Dict[str, typing.Set[typing.Any]] = {}
+
+        # Invalidation epochs - values loaded before an invalidation of their key are not stored
+        self._epoch = 0
+        self._flush_epoch = 0
+        self._loading = 0
+        self._invalidations: typing.Dict[str, int] = {}
+
+        # Cache statistics
+        self.hits = 0
+        self.misses = 0
+
+        # Make sure the connection is a single node connection
+        if not isinstance(connection, redis.Redis):
+            raise TypeError(f"Near caching is not supported for {type(connection).__name__} connections")
+
+        # Create a dedicated connection for receiving invalidations
+        self._connection = connection.connection_pool.make_connection()
+        self._connection.connect()
+
+        # Check whether invalidations are received as RESP3 push messages
+        self._resp3 = str(getattr(self._connection, "protocol", 2)) == "3"
+
+        # Enable tracking for all keys with the prefixes
+        self._enable_tracking(prefixes)
+
+        # Start listening for invalidations
+        self._connected = True
+        self._thread = threading.Thread(target=self._listen, daemon=True)
+        self._thread.start()
+
+    def _enable_tracking(self, prefixes: typing.Sequence[str]) -> None:
+        # Create the prefix arguments
+        arguments = [argument for prefix in prefixes for argument in ("PREFIX", prefix)]
+
+        # RESP3 connections receive invalidations as push messages
+        if self._resp3:
+            # Make sure invalidation messages are returned by the parser
+            if hasattr(self._connection._parser, "set_invalidation_push_handler"):
+                self._connection._parser.set_invalidation_push_handler(lambda message: message)
+
+            # Enable broadcast tracking
+            self._connection.send_command("CLIENT", "TRACKING", "ON", "BCAST", *arguments)
+            self._connection.read_response()
+            return
+
+        # Fetch the client ID of the connection
+        self._connection.send_command("CLIENT", "ID")
+        client_id = self._connection.read_response()
+
+        # Enable broadcast tracking and redirect the invalidations to the connection itself
+        self._connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *arguments)
+        self._connection.read_response()
+
+        # Subscribe to the invalidation channel
+        self._connection.send_command("SUBSCRIBE", INVALIDATION_CHANNEL)
+        self._connection.read_response()
+
+    def _listen(self) -> None:
+        try:
+            # Loop until the cache is closed
+            while self._connected:
+                # Wait for the next invalidation message
+                if not self._connection.can_read(timeout=self._POLL_INTERVAL):
+                    continue
+
+                # Read the invalidation message
+                if self._resp3:
+                    message = self._connection.read_response(push_request=True)
+                else:
+                    message = self._connection.read_response()
+
+                # Handle the invalidation message
+                self._handle_message(message)
+        except (redis.RedisError, OSError, ValueError):
+            # The connection was lost or closed, invalidations can no longer be trusted
+            pass
+        finally:
+            # Stop caching
+            self.close()
+
+    def _handle_message(self, message: typing.Any) -> None:
+        # Make sure the message is an invalidation message
+        if not isinstance(message, list) or not message or message[0] not in ("invalidate", b"invalidate", "message", b"message"):
+            return
+
+        # Fetch the invalidated keys
+        keys = message[-1]
+
+        # If no keys are specified, the entire database was flushed
+        if keys is None:
+            self.clear()
+            return
+
+        # Invalidate all of the keys
+        for key in keys:
+            self.invalidate(key.decode() if isinstance(key, bytes) else key)
+
+    def get(self, key: str, field: typing.Any, loader: typing.Callable[[], typing.Any]) -> typing.Any:
+        with self._lock:
+            try:
+                # Try fetching the cached value
+                value = self._entries[(key, field)]
+            except KeyError:
+                # Count the miss and remember the current epoch
+                self.misses += 1
+                self._loading += 1
+                epoch = self._epoch
+            else:
+                # Count the hit and mark the value as recently used
+                self.hits += 1
+                self._entries.move_to_end((key, field))
+                return value
+
+        try:
+            # Load the value from the database
+            value = loader()
+
+            with self._lock:
+                # Store the value only if it was loaded and the key was not invalidated while loading
+                if self._connected and self._flush_epoch <= epoch and self._invalidations.get(key, 0) <= epoch:
+                    self._store(key, field, value)
+        finally:
+            with self._lock:
+                # When nothing is loading, old invalidations are no longer needed
+                self._loading -= 1
+                if not self._loading:
+                    self._invalidations.clear()
+
+        # Return the loaded value
+        return value
+
+    def _store(self, key: str, field: typing.Any, value: typing.Any) -> None:
+        # Store the value
+        self._entries[(key, field)] = value
+        self._fields.setdefault(key, set()).add(field)
+
+        # Evict the least recently used values
+        while len(self._entries) > self._max_size:
+            (evicted_key, evicted_field), _ = self._entries.popitem(last=False)
+            self._discard_field(evicted_key, evicted_field)
+
+    def _discard_field(self, key: str, field: typing.Any) -> None:
+        # Remove the field from the key fields
+        fields = self._fields.get(key)
+        if fields is None:
+            return
+
+        # Remove the key once it has no fields
+        fields.discard(field)
+        if not fields:
+            del self._fields[key]
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            # Advance the epoch and mark the key as invalidated
+            self._epoch += 1
+            if self._loading:
+                self._invalidations[key] = self._epoch
+
+            # Remove all of the cached fields of the key
+            for field in self._fields.pop(key, ()):
+                del self._entries[(key, field)]
+
+    def clear(self) -> None:
+        with self._lock:
+            # Advance the epoch and mark everything as invalidated
+            self._epoch += 1
+            self._flush_epoch = self._epoch
+
+            # Remove all of the cached values
+            self._entries.clear()
+            self._fields.clear()
+
+    def close(self) -> None:
+        # Stop caching and listening for invalidations
+        self._connected = False
+        self.clear()
+
+        # Close the invalidation connection
+        self._connection.disconnect()
+
+    def __len__(self) -> int:
+        # Return the number of cached values
+        return len(self._entries)
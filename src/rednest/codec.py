@@ -0,0 +1,281 @@
+import re
+import abc
+import ast
+import json
+import math
+import base64
+import pickle
+import typing
+import functools
+
+
+class Codec(abc.ABC):
+
+    # Prefixes of encoded integers and floats, used for atomic increments - None when numbers cannot be incremented server-side
+    numeric_tags: typing.Optional[typing.Tuple[str, str]] = None
+
+    @abc.abstractmethod
+    def encode(self, value: typing.Any) -> str:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def decode(self, value: str) -> typing.Any:
+        raise NotImplementedError()
+
+    def decode_key(self, value: str) -> typing.Any:
+        # By default, keys are decoded like any other value
+        return self.decode(value)
+
+
+class ReprCodec(Codec):
+
+    # Numbers are represented without prefixes
+    numeric_tags = ("", "")
+
+    # Representations of constants
+    _CONSTANTS: typing.Dict[str, typing.Any] = {
+        "None": None,
+        "True": True,
+        "False": False,
+        "inf": math.inf,
+        "-inf": -math.inf,
+        "nan": math.nan,
+    }
+
+    # Names which may appear in representations, at any depth
+    _NAMES: typing.Dict[str, typing.Any] = {
+        "inf": math.inf,
+        "nan": math.nan,
+        "Ellipsis": Ellipsis,
+    }
+
+    # Constructors which may appear in representations of non-literal values, at any depth
+    _CONSTRUCTORS: typing.Dict[str, typing.Callable[..., typing.Any]] = {
+        "set": set,
+        "frozenset": frozenset,
+        "bytearray": bytearray,
+        "range": range,
+    }
+
+    # Operators which may appear in representations of negative and complex numbers
+    _OPERATORS: typing.Dict[type, typing.Callable[..., typing.Any]] = {
+        ast.USub: lambda operand: -operand,
+        ast.UAdd: lambda operand: +operand,
+        ast.Add: lambda left, right: left + right,
+        ast.Sub: lambda left, right: left - right,
+    }
+
+    # Patterns of simple representations
+    _INTEGER = re.compile(r"-?\d+")
+    _FLOAT = re.compile(r"-?\d+(?:\.\d+)?(?:e[-+]\d+)?")
+    _TOKEN = re.compile(r"""b?'[^'\\]*'|b?"[^"\\]*"|[^,'"()\s]+""")
+
+    def __init__(self, key_cache_size: int = 4096) -> None:
+        # Cache decoded keys, since hash field names repeat heavily
+        self.decode_key = functools.lru_cache(maxsize=key_cache_size)(self.decode)  # type: ignore[method-assign]
+
+    def encode(self, value: typing.Any) -> str:
+        # Return the representation of the object
+        return repr(value)
+
+    def decode(self, value: str) -> typing.Any:
+        # Try parsing the common literal shapes directly
+        try:
+            return self._decode_simple(value)
+        except ValueError:
+            pass
+
+        # Try parsing tuples of simple values directly
+        if value[:1] == "(" and value[-1:] == ")":
+            try:
+                return self._decode_tuple(value[1:-1])
+            except ValueError:
+                pass
+
+        # Fall back to the safe literal parser
+        return self._decode_literal(value)
+
+    def _decode_simple(self, value: str) -> typing.Any:
+        # Check whether the value is a simple string or bytes - without any escape sequences
+        if value[-1:] in ("'", '"') and "\\" not in value:
+            # Check for strings
+            if value[0] == value[-1] and len(value) > 1 and value[-1] not in value[1:-1]:
+                return value[1:-1]
+
+            # Check for bytes
+            if value[0] == "b" and value[1:2] == value[-1] and len(value) > 2 and value[-1] not in value[2:-1]:
+                return value[2:-1].encode("latin-1")
+
+        # Check for constants
+        if value in self._CONSTANTS:
+            return self._CONSTANTS[value]
+
+        # Check for integers
+        if self._INTEGER.fullmatch(value):
+            return int(value)
+
+        # Check for floats
+        if self._FLOAT.fullmatch(value):
+            return float(value)
+
+        # The value is not simple
+        raise ValueError(value)
+
+    def _decode_tuple(self, value: str) -> typing.Tuple[typing.Any, ...]:
+        # Create the output items
+        items = []
+
+        # Parse all of the tokens of the tuple
+        position = 0
+        while position < len(value):
+            # Match the next token
+            match = self._TOKEN.match(value, position)
+            if not match:
+                raise ValueError(value)
+
+            # Parse the token as a simple value
+            items.append(self._decode_simple(match.group()))
+
+            # Skip the separator
+            position = match.end()
+            if value.startswith(", ", position):
+                position += 2
+            elif value[position:] == ",":
+                position += 1
+            elif position < len(value):
+                raise ValueError(value)
+
+        # Single item tuples must have a trailing separator
+        if len(items) == 1 and not value.endswith(","):
+            raise ValueError(value)
+
+        # Return the parsed tuple
+        return tuple(items)
+
+    def _decode_literal(self, value: str) -> typing.Any:
+        # Parse the representation without evaluating it, then evaluate the safe subset of nodes
+        return self._evaluate(ast.parse(value.strip(), mode="eval").body)
+
+    def _evaluate(self, node: ast.AST) -> typing.Any:
+        # Evaluate literals
+        if isinstance(node, ast.Constant):
+            return node.value
+
+        # Evaluate containers recursively
+        if isinstance(node, ast.Tuple):
+            return tuple(self._evaluate(item) for item in node.elts)
+        if isinstance(node, ast.List):
+            return [self._evaluate(item) for item in node.elts]
+        if isinstance(node, ast.Set):
+            return {self._evaluate(item) for item in node.elts}
+        if isinstance(node, ast.Dict) and None not in node.keys:
+            return {self._evaluate(key): self._evaluate(item) for key, item in zip(node.keys, node.values)}  # type: ignore[arg-type]
+
+        # Evaluate known names, like inf and Ellipsis
+        if isinstance(node, ast.Name) and node.id in self._NAMES:
+            return self._NAMES[node.id]
+
+        # Evaluate numeric operators, like negative and complex numbers
+        if isinstance(node, ast.UnaryOp) and type(node.op) in self._OPERATORS:
+            return self._OPERATORS[type(node.op)](self._number(self._evaluate(node.operand)))
+        if isinstance(node, ast.BinOp) and type(node.op) in self._OPERATORS:
+            return self._OPERATORS[type(node.op)](self._number(self._evaluate(node.left)), self._number(self._evaluate(node.right)))
+
+        # Evaluate known constructors with positional arguments only
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in self._CONSTRUCTORS and not node.keywords:
+            return self._CONSTRUCTORS[node.func.id](*(self._evaluate(argument) for argument in node.args))
+
+        # Anything else is not a representation of a value
+        raise ValueError(f"Unsupported representation {ast.dump(node)}")
+
+    def _number(self, value: typing.Any) -> typing.Any:
+        # Make sure operators are only applied to numbers
+        if isinstance(value, bool) or not isinstance(value, (int, float, complex)):
+            raise ValueError(f"Unsupported operand {value!r}")
+
+        # Return the number
+        return value
+
+
+class JSONCodec(Codec):
+
+    # Numbers are encoded without prefixes
+    numeric_tags = ("", "")
+
+    def __init__(self) -> None:
+        # Create the encoder and decoder once
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        self._decoder = json.JSONDecoder()
+
+    def encode(self, value: typing.Any) -> str:
+        # Encode the value as JSON
+        return self._encoder.encode(value)
+
+    def decode(self, value: str) -> typing.Any:
+        # Decode the value from JSON
+        return self._decoder.decode(value)
+
+
+class PickleCodec(Codec):
+
+    def __init__(self, protocol: int = pickle.HIGHEST_PROTOCOL) -> None:
+        # Store the pickle protocol
+        self._protocol = protocol
+
+    def encode(self, value: typing.Any) -> str:
+        # Pickle the value and encode it as base64 so that it is safe for all connections
+        return base64.b64encode(pickle.dumps(value, protocol=self._protocol)).decode()
+
+    def decode(self, value: str) -> typing.Any:
+        # Decode the base64 and unpickle the value
+        return pickle.loads(base64.b64decode(value))
+
+
+class TaggedCodec(Codec):
+
+    # Numbers are tagged by their type
+    numeric_tags = ("i", "f")
+
+    def __init__(self) -> None:
+        # Create the decoders for all of the tags
+        self._decoders: typing.Dict[str, typing.Callable[[str], typing.Any]] = {
+            "N": lambda payload: None,
+            "T": lambda payload: True,
+            "F": lambda payload: False,
+            "i": int,
+            "f": float,
+            "s": str,
+            "b": base64.b64decode,
+            "a": lambda payload: bytearray(base64.b64decode(payload)),
+            "t": lambda payload: tuple(map(self.decode, json.loads(payload))),
+        }
+
+    def encode(self, value: typing.Any) -> str:
+        # Check for constants first, since booleans are integers
+        if value is None:
+            return "N"
+        if value is True:
+            return "T"
+        if value is False:
+            return "F"
+
+        # Tag the value by its type
+        if isinstance(value, int):
+            return f"i{value}"
+        if isinstance(value, float):
+            return f"f{value!r}"
+        if isinstance(value, str):
+            return f"s{value}"
+        if isinstance(value, bytes):
+            return f"b{base64.b64encode(value).decode()}"
+        if isinstance(value, bytearray):
+            return f"a{base64.b64encode(value).decode()}"
+        if isinstance(value, tuple):
+            return f"t{json.dumps([self.encode(item) for item in value], separators=(',', ':'))}"
+
+        # The type is not supported
+        raise TypeError(f"Object of type {type(value).__name__} is not supported by the tagged codec")
+
+    def decode(self, value: str) -> typing.Any:
+        # Decode the payload by the tag
+        return self._decoders[value[:1]](value[1:])
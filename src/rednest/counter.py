@@ -0,0 +1,256 @@
+import typing
+import collections
+
+import redis
+
+# Import abstract types
+from collections.abc import Mapping
+
+# Import extension objects
+from rednest.nested import Nested, NestedType, NESTED_TYPES
+
+# Import the missing default marker
+from rednest.dictionary import DEFAULT
+
+# Type of counts, which are stored as sorted set scores
+Count = typing.Union[int, float]
+
+
+class Counter(typing.MutableMapping[typing.Any, Count], Nested):
+
+    # Copy type - the type used when calling copy
+    _COPY_TYPE: typing.Type[typing.MutableMapping[typing.Any, Count]] = collections.Counter
+
+    def initialize(self, value: typing.Any) -> None:
+        # If the value is nested, copy it before de-initializing
+        if isinstance(value, Nested):
+            value = value.copy()
+
+        # De-initialize before initializing
+        self.deinitialize()
+
+        # Set all of the counts at once
+        pipeline = self._connection.pipeline(transaction=False)
+        self._plan_initialize(pipeline, value)
+        pipeline.execute()  # type: ignore[no-untyped-call]
+
+    def deinitialize(self) -> None:
+        # Clear the counter
+        self.clear()
+
+    def _plan_initialize(self, pipeline: redis.client.Pipeline, value: typing.Any) -> None:
+        # If the value is nested, copy it in a single call
+        if isinstance(value, Nested):
+            value = value.copy()
+
+        # Count iterables of elements
+        if not isinstance(value, Mapping):
+            value = collections.Counter(value)
+
+        # Set all of the counts - sorted sets cannot be empty
+        if value:
+            pipeline.zadd(self._key, {self._encode(key): count for key, count in value.items()})
+
+    def _decode_count(self, score: typing.Any) -> Count:
+        # Make sure the score is a float
+        score = float(score)
+
+        # Integral scores are returned as integers
+        if score.is_integer():
+            return int(score)
+
+        # Return the fractional score
+        return score
+
+    def __repr__(self) -> str:
+        # Represent a copy of the counter
+        return repr(self.copy())
+
+    def __getitem__(self, key: typing.Any) -> Count:
+        # Fetch the count, missing elements are counted as zero
+        return self.get(key, 0)
+
+    def get(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        # Fetch the score of the element
+        score = self._connection.zscore(self._key, self._encode(key))
+
+        # If the element is missing, return the default
+        if score is None:
+            return default
+
+        # Return the count
+        return self._decode_count(score)
+
+    def __setitem__(self, key: typing.Any, value: Count) -> None:
+        # Counter writes are not buffered, flush the batch first
+        self._flush_batch()
+
+        # Set the count of the element
+        self._connection.zadd(self._key, {self._encode(key): value})
+
+    def __delitem__(self, key: typing.Any) -> None:
+        # Counter writes are not buffered, flush the batch first
+        self._flush_batch()
+
+        # Remove the element - like collections.Counter, missing elements are ignored
+        self._connection.zrem(self._key, self._encode(key))
+
+    def pop(self, key: typing.Any, default: typing.Any = DEFAULT) -> typing.Any:
+        # Counter writes are not buffered, flush the batch first
+        self._flush_batch()
+
+        # Fetch and remove the score atomically - missing elements are not counted as zero here
+        pipeline = self._connection.pipeline(transaction=True)
+        pipeline.zscore(self._key, self._encode(key))
+        pipeline.zrem(self._key, self._encode(key))
+        score, _ = pipeline.execute()  # type: ignore[no-untyped-call]
+
+        # If the element is missing, return the default or raise
+        if score is None:
+            if default is DEFAULT:
+                raise KeyError(key)
+            return default
+
+        # Return the removed count
+        return self._decode_count(score)
+
+    def popitem(self) -> typing.Tuple[typing.Any, Count]:
+        # Counter writes are not buffered, flush the batch first
+        self._flush_batch()
+
+        # Remove the element with the highest count atomically
+        entries = self._connection.zpopmax(self._key)
+
+        # Make sure the entries are a list
+        if not isinstance(entries, list):
+            raise TypeError(entries)
+
+        # If the counter is empty, raise
+        if not entries:
+            raise KeyError("popitem(): counter is empty")
+
+        # Return the removed element and its count
+        encoded_key, score = entries[0]
+        return self._decode_key(encoded_key), self._decode_count(score)
+
+    def setdefault(self, key: typing.Any, default: Count = 0) -> Count:  # type: ignore[override]
+        # Counter writes are not buffered, flush the batch first
+        self._flush_batch()
+
+        # Set the count only if the element is missing, then fetch the count atomically
+        pipeline = self._connection.pipeline(transaction=True)
+        pipeline.zadd(self._key, {self._encode(key): default}, nx=True)
+        pipeline.zscore(self._key, self._encode(key))
+        _, score = pipeline.execute()  # type: ignore[no-untyped-call]
+
+        # Return the count
+        return self._decode_count(score)
+
+    def __contains__(self, key: typing.Any) -> bool:
+        # Check whether the element has a score
+        return self._connection.zscore(self._key, self._encode(key)) is not None
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        # Stream the elements - elements modified during the scan might be returned more than once
+        for encoded_key, _ in self._connection.zscan_iter(self._key, count=self._CHUNK_SIZE):
+            yield self._decode_key(encoded_key)
+
+    def __len__(self) -> int:
+        # Fetch the number of elements
+        length = self._connection.zcard(self._key)
+
+        # Make sure the length is an integer
+        if not isinstance(length, int):
+            raise TypeError(length)
+
+        # Return the number of elements
+        return length
+
+    def __eq__(self, other: typing.Any) -> bool:
+        # Make sure the other object is a mapping
+        if not isinstance(other, Mapping):
+            return False
+
+        # Compare a copy of the counter
+        return self.copy() == (other.copy() if isinstance(other, Nested) else other)
+
+    def increment(self, key: typing.Any, amount: Count = 1) -> Count:
+        # Counter writes are not buffered, flush the batch first
+        self._flush_batch()
+
+        # Increment the count atomically and return the new count
+        return self._decode_count(self._connection.zincrby(self._key, amount, self._encode(key)))
+
+    def update(self, other: typing.Any = (), /, **kwargs: typing.Any) -> None:  # type: ignore[override]
+        # Add the counts of the elements
+        self._add(other, kwargs, 1)
+
+    def subtract(self, other: typing.Any = (), /, **kwargs: typing.Any) -> None:
+        # Subtract the counts of the elements
+        self._add(other, kwargs, -1)
+
+    def _add(self, other: typing.Any, kwargs: typing.Dict[str, typing.Any], sign: int) -> None:
+        # Count the elements locally first, so that every element is sent once
+        counts: typing.Counter[typing.Any] = collections.Counter()
+
+        # Add the counts of mappings, or count iterables of elements
+        if isinstance(other, Mapping):
+            for key, count in (other.copy() if isinstance(other, Nested) else other).items():
+                counts[key] += count
+        else:
+            counts.update(other)
+
+        # Add the keyword counts
+        for key, count in kwargs.items():
+            counts[key] += count
+
+        # If there is nothing to add, return
+        if not counts:
+            return
+
+        # Counter writes are not buffered, flush the batch first
+        self._flush_batch()
+
+        # Increment all of the counts in a single round trip
+        pipeline = self._connection.pipeline(transaction=False)
+        for key, count in counts.items():
+            pipeline.zincrby(self._key, sign * count, self._encode(key))
+        pipeline.execute()  # type: ignore[no-untyped-call]
+
+    def most_common(self, n: typing.Optional[int] = None) -> typing.List[typing.Tuple[typing.Any, Count]]:
+        # Fetch the highest counts only - equal counts are ordered by their encoded elements, not by insertion
+        if n is not None and n <= 0:
+            return []
+
+        # Fetch the elements with their scores, highest first
+        entries = self._connection.zrange(self._key, 0, -1 if n is None else n - 1, desc=True, withscores=True)
+
+        # Make sure the entries are a list
+        if not isinstance(entries, list):
+            raise TypeError(entries)
+
+        # Decode all of the entries
+        return [(self._decode_key(encoded_key), self._decode_count(score)) for encoded_key, score in entries]
+
+    def total(self) -> Count:
+        # Sum all of the counts
+        return sum(count for _, count in self.most_common())
+
+    def elements(self) -> typing.Iterator[typing.Any]:
+        # Repeat every element as many times as its count
+        return self.copy().elements()  # type: ignore[attr-defined,no-any-return]
+
+    def clear(self) -> None:
+        # Counter writes are not buffered, flush the batch first
+        self._flush_batch()
+
+        # Delete the sorted set
+        self._connection.delete(self._key)
+
+    def copy(self) -> typing.MutableMapping[typing.Any, Count]:
+        # Create a counter from all of the entries
+        return self._COPY_TYPE(dict(self.most_common()))
+
+
+# Register nested object - counters used to be stored as hashes, which still read back as dictionaries
+NESTED_TYPES.register(NestedType("zset", Counter, collections.Counter))
@@ -1,5 +1,10 @@
+import math
 import typing
+import itertools
 import contextlib
+import dataclasses
+
+import redis
 
 # Import abstract types
 from collections.abc import Mapping, Iterable
@@ -7,15 +12,37 @@ from collections.abc import Mapping, Iterable
 # Import extension objects
 from rednest.nested import Nested, NestedType, NESTED_TYPES
 
+# Import write batching
+from rednest.batching import DELETED, Finisher
+
+# Import lua scripts
+from rednest.scripts import INCREMENT_SCRIPT, REPLACE_FIELDS_SCRIPT
+
 # Create default object so that None can be used as default value
 DEFAULT = object()
 
 
+@dataclasses.dataclass
+class DictionaryWrites:
+
+    # Whether the dictionary was cleared
+    cleared: bool = False
+
+    # Buffered values by encoded keys - deleted keys are marked
+    fields: typing.Dict[str, typing.Any] = dataclasses.field(default_factory=dict)
+
+    # Deleted keys which must exist when flushing, by encoded keys
+    checked: typing.Dict[str, typing.Any] = dataclasses.field(default_factory=dict)
+
+
 class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
 
     # Copy type - the type used when calling copy, setdefaults and getdefaults
     _COPY_TYPE: typing.Type[typing.MutableMapping[typing.Any, typing.Any]] = dict
 
+    # Hashes with more fields than the threshold are iterated using HSCAN
+    _SCAN_THRESHOLD: int = 10000
+
     def initialize(self, value: typing.Dict[typing.Any, typing.Any]) -> None:
         # De-initialize before initializing
         self.deinitialize()
@@ -27,9 +54,32 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
         # Clear the dictionary
         self.clear()
 
+    def _plan_initialize(self, pipeline: redis.client.Pipeline, value: typing.Any) -> None:
+        # If the value is nested, copy it in a single call
+        if isinstance(value, Nested):
+            value = value.copy()
+
+        # Create the mapping of encoded keys to planned identifiers
+        mapping = {
+            # Encoded key: Nested value identifier
+            self._encode(key): self._plan_identifier(pipeline, item)
+            # For each item in the dictionary
+            for key, item in value.items()
+        }
+
+        # Create an iterator over the mapping items
+        iterator = iter(mapping.items())
+
+        # Set all of the identifiers in chunks
+        while chunk := dict(itertools.islice(iterator, self._CHUNK_SIZE)):
+            pipeline.hset(self._key, mapping=chunk)
+
     def _identifier_from_key(self, key: typing.Any) -> typing.Union[str, bytes]:
-        # Fetch the identifier from the hash
-        identifier = self._connection.hget(self._key, self._encode(key))
+        # Encode the key
+        encoded_key = self._encode(key)
+
+        # Fetch the identifier from the hash, possibly from the near cache
+        identifier = self._cached(encoded_key, lambda: self._connection.hget(self._key, encoded_key))
 
         # If the response is empty, item does not exist
         if identifier is None:
@@ -55,22 +105,57 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
         self.update({key: value})
 
     def __delitem__(self, key: typing.Any) -> None:
+        # Buffer the deletion when batching
+        if (batch := self._batching()) is not None:
+            writes = batch.writes(self, DictionaryWrites)
+            encoded_key = self._encode(key)
+
+            # Check the key against the buffered state - unknown keys are checked when flushing
+            if encoded_key in writes.fields:
+                if writes.fields[encoded_key] is DELETED:
+                    raise KeyError(key)
+            elif writes.cleared:
+                raise KeyError(key)
+            else:
+                writes.checked[encoded_key] = key
+
+            # Mark the key as deleted
+            writes.fields[encoded_key] = DELETED
+            return
+
         # Fetch the identifier
         identifier = self._identifier_from_key(key)
 
         # Delete the key from hash
         self._connection.hdel(self._key, self._encode(key))
+        self._invalidate()
 
         # Delete the nested value
         self._delete_by_identifier(identifier)
 
     def __contains__(self, key: typing.Any) -> bool:
+        # Check the near cache, which also caches missing keys
+        if self._cache is not None:
+            encoded_key = self._encode(key)
+            return self._cached(encoded_key, lambda: self._connection.hget(self._key, encoded_key)) is not None
+
         # Make sure key exists in database
         return bool(self._connection.hexists(self._key, self._encode(key)))
 
     def __iter__(self) -> typing.Iterator[typing.Any]:
-        # Fetch all hash keys
-        encoded_keys = self._connection.hkeys(self._key)
+        # Fetch the first page - small hashes fit in it entirely, so their length is not fetched
+        cursor, raw_mapping = self._first_page()
+
+        # Use the first page, or fetch all hash keys when the hash is below the threshold, so that no key is returned twice
+        if not cursor:
+            encoded_keys = list(raw_mapping)
+        elif len(self) <= self._SCAN_THRESHOLD:
+            encoded_keys = self._connection.hkeys(self._key)
+        else:
+            # Stream the keys of large hashes, continuing the scan
+            for encoded_key, _ in itertools.chain(raw_mapping.items(), self._scan(cursor=cursor)):
+                yield self._decode_key(encoded_key)
+            return
 
         # Make sure encoded keys is iterable
         if not isinstance(encoded_keys, Iterable):
@@ -83,7 +168,50 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
                 raise TypeError(encoded_key)
 
             # Yield the decoded key
-            yield self._decode(encoded_key)
+            yield self._decode_key(encoded_key)
+
+    def _first_page(self) -> typing.Tuple[int, typing.Mapping[typing.Union[str, bytes], typing.Union[str, bytes]]]:
+        # Scan up to the threshold - a complete scan is a single command, so it is a snapshot of the hash
+        cursor, raw_mapping = self._connection.hscan(self._key, 0, count=self._SCAN_THRESHOLD)
+
+        # Make sure the raw mapping is a mapping
+        if not isinstance(raw_mapping, Mapping):
+            raise TypeError(raw_mapping)
+
+        # Return the cursor, which is zero when the scan is complete, and the fields
+        return cursor, raw_mapping
+
+    def _scan(self, count: typing.Optional[int] = None, cursor: int = 0) -> typing.Iterator[typing.Tuple[typing.Union[str, bytes], typing.Union[str, bytes]]]:
+        # Loop until the scan is complete - scans start from the beginning of the hash unless continued
+        while True:
+            # Fetch the next batch of fields
+            cursor, raw_mapping = self._connection.hscan(self._key, cursor, count=count or self._CHUNK_SIZE)
+
+            # Make sure the raw mapping is a mapping
+            if not isinstance(raw_mapping, Mapping):
+                raise TypeError(raw_mapping)
+
+            # Yield the encoded keys and identifiers
+            yield from raw_mapping.items()
+
+            # Check whether the scan is complete
+            if not cursor:
+                return
+
+    def iterkeys(self, count: typing.Optional[int] = None) -> typing.Iterator[typing.Any]:
+        # Stream the decoded keys - keys modified during the scan might be returned more than once
+        for encoded_key, _ in self._scan(count):
+            yield self._decode_key(encoded_key)
+
+    def itervalues(self, count: typing.Optional[int] = None) -> typing.Iterator[typing.Any]:
+        # Stream the values - values modified during the scan might be returned more than once
+        for _, identifier in self._scan(count):
+            yield self._fetch_by_identifier(identifier)
+
+    def iteritems(self, count: typing.Optional[int] = None) -> typing.Iterator[typing.Tuple[typing.Any, typing.Any]]:
+        # Stream the items - items modified during the scan might be returned more than once
+        for encoded_key, identifier in self._scan(count):
+            yield self._decode_key(encoded_key), self._fetch_by_identifier(identifier)
 
     def __len__(self) -> int:
         # Fetch the length of the hash
@@ -101,19 +229,66 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
         if not isinstance(other, Mapping):
             return False
 
-        # Make sure all keys exist
-        if set(self.keys()) != set(other.keys()):
+        # If the other object is nested, copy it in a single call
+        if isinstance(other, Nested):
+            other = other.copy()
+
+        # Make sure the lengths are the same
+        length = len(self)
+        if length != len(other):
             return False
 
-        # Loop over all keys
-        for key in self:
+        # Loop over all items in batches
+        for key, value in self._iter_items(length):
+            # Make sure the key exists
+            if key not in other:
+                return False
+
             # Check whether the value equals
-            if self[key] != other[key]:
+            if value != other[key]:
                 return False
 
         # Comparison succeeded
         return True
 
+    def items(self) -> "DictionaryItemsView":  # type: ignore[override]
+        # Create a batched items view
+        return DictionaryItemsView(self)
+
+    def values(self) -> "DictionaryValuesView":  # type: ignore[override]
+        # Create a batched values view
+        return DictionaryValuesView(self)
+
+    def _iter_items(self, length: typing.Optional[int] = None) -> typing.Iterator[typing.Tuple[typing.Any, typing.Any]]:
+        # When the length is unknown, fetch the first page - small hashes fit in it entirely, so their length is not fetched
+        if length is None:
+            cursor, raw_mapping = self._first_page()
+            if not cursor:
+                yield from [(self._decode_key(encoded_key), self._fetch_by_identifier(identifier)) for encoded_key, identifier in raw_mapping.items()]
+                return
+
+            # Stream the items of large hashes, continuing the scan
+            length = len(self)
+            if length > self._SCAN_THRESHOLD:
+                for encoded_key, identifier in itertools.chain(raw_mapping.items(), self._scan(cursor=cursor)):
+                    yield self._decode_key(encoded_key), self._fetch_by_identifier(identifier)
+                return
+
+        # Stream the items of large hashes
+        if length > self._SCAN_THRESHOLD:
+            yield from self.iteritems()
+            return
+
+        # Fetch all of the items at once
+        raw_mapping = self._connection.hgetall(self._key)
+
+        # Make sure raw values are a mapping
+        if not isinstance(raw_mapping, Mapping):
+            raise TypeError(raw_mapping)
+
+        # Decode all of the items in bulk
+        yield from [(self._decode_key(encoded_key), self._fetch_by_identifier(identifier)) for encoded_key, identifier in raw_mapping.items()]
+
     def pop(self, key: typing.Any, default: typing.Any = DEFAULT) -> typing.Any:
         try:
             # Fetch the original value
@@ -151,20 +326,16 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
         return key, self.pop(key)
 
     def clear(self) -> None:
-        # Fetch raw values
-        raw_values = self._connection.hvals(self._key)
-
-        # Make sure raw values is iterable
-        if not isinstance(raw_values, Iterable):
-            raise TypeError(raw_values)
-
-        # Loop over identifiers
-        for identifier in raw_values:
-            # Delete the nested identifier
-            self._delete_by_identifier(identifier)
+        # Buffer the clearing when batching, dropping all of the buffered values
+        if (batch := self._batching()) is not None:
+            writes = batch.writes(self, DictionaryWrites)
+            writes.cleared = True
+            writes.fields.clear()
+            return
 
-        # Delete the hash
-        self._connection.delete(self._key)
+        # Delete the hash and all of the nested values
+        self._delete_tree(keys=[self._key])
+        self._invalidate()
 
     def update(self, other: typing.Any = (), /, **kwargs: typing.Any) -> None:
         # Add values from "other" to "kwargs", since kwargs is a dictionary
@@ -175,40 +346,47 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
         if not kwargs:
             return
 
-        # Fetch the original identifiers - used for future deletion
-        original_identifiers = self._connection.hmget(self._key, [self._encode(key) for key in kwargs])
+        # Buffer the values when batching - the last value of every key wins
+        if (batch := self._batching()) is not None:
+            # Fetch the buffered writes
+            writes = batch.writes(self, DictionaryWrites)
+
+            # Buffer all of the values, copying nested values so that later changes are not flushed
+            for key, value in kwargs.items():
+                writes.fields[self._encode(key)] = value.copy() if isinstance(value, Nested) else value
+
+            # Nothing more to do
+            return
+
+        # Create a pipeline to hold all of the writes
+        pipeline = self._connection.pipeline()
+
+        # Create dictionary to hold nested identifiers
+        mapping = {
+            # Encoded key: Nested value identifier
+            self._encode(key): self._plan_identifier(pipeline, value)
+            # For each item in the dictionary
+            for key, value in kwargs.items()
+        }
 
-        # Create new identifiers for all values
-        with contextlib.ExitStack() as exit_stack:
-            # Create dictionary to hold nested identifiers
-            mapping = {
-                # Encoded key: Nested value identifier
-                self._encode(key): exit_stack.enter_context(self._create_identifier_from_value(value))
-                # For each item in the dictionary
-                for key, value in kwargs.items()
-            }
+        # Swap all of the identifiers atomically, fetching the originals for future deletion - concurrent writers cannot leak each other's values, and the script is sent along with the writes
+        self._execute_script(REPLACE_FIELDS_SCRIPT, keys=[self._key], args=[argument for item in mapping.items() for argument in item], client=pipeline)
 
-        # Now set all of the new identifiers in one go using hset with a mapping
-        self._connection.hset(self._key, mapping=mapping)
+        # Execute all of the nested writes and the hash update at once
+        original_identifiers = pipeline.execute()[-1]  # type: ignore[no-untyped-call]
+        self._invalidate()
 
         # Make sure original identifiers is iterable
         if not isinstance(original_identifiers, Iterable):
             raise TypeError(original_identifiers)
 
-        # Loop over original identifiers and delete them
-        for original_identifier in original_identifiers:
-            # Check if the original identifier was even defined
-            if original_identifier is None:
-                continue
-
-            # Make sure the original identifier is a string or bytes
-            if not isinstance(original_identifier, (str, bytes)):
-                raise TypeError(original_identifier)
-
-            # Delete the value by the identifier
-            self._delete_by_identifier(original_identifier)
+        # Delete all of the original values at once
+        self._delete_tree(identifiers=[original_identifier for original_identifier in original_identifiers if original_identifier is not None])
 
     def setdefault(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        # Conditional writes cannot be buffered, flush the batch first
+        self._flush_batch()
+
         try:
             # If the key already exists, return it
             return self[key]
@@ -218,6 +396,7 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
                 # Try inserting the nested identifier atomically
                 if self._connection.hsetnx(self._key, self._encode(key), identifier):
                     # Value was inserted, return it
+                    self._invalidate()
                     return default
 
                 # Delete the identifier
@@ -226,30 +405,117 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
             # Since our first check (of getting self[key]), the value was added.
             return self[key]
 
-    # Utility functions
+    def increment(self, key: typing.Any, amount: int = 1) -> typing.Any:
+        # Make sure the amount is an integer - booleans are integers, but cannot be sent as numbers
+        if not isinstance(amount, int) or isinstance(amount, bool):
+            raise TypeError(f"Increment amount must be an integer, not {type(amount).__name__}")
+
+        # Increment the value atomically
+        return self._increment(key, amount, "int")
+
+    def increment_float(self, key: typing.Any, amount: float = 1.0) -> float:
+        # Increment the value atomically
+        return self._increment(key, float(amount), "float")  # type: ignore[no-any-return]
+
+    def _increment(self, key: typing.Any, amount: typing.Union[int, float], kind: str) -> typing.Any:
+        # Increments cannot be buffered, flush the batch first
+        self._flush_batch()
+
+        # Encode the key
+        encoded_key = self._encode(key)
+
+        # Increment the value in a single call when the codec encodes numbers plainly
+        if self._codec.numeric_tags is not None and math.isfinite(amount):
+            # Run the increment script
+            encoded_value = self._execute_script(INCREMENT_SCRIPT, keys=[self._key], args=[encoded_key, kind, repr(amount), *self._codec.numeric_tags])
+
+            # The script returns nothing when the stored value must be incremented by the client
+            if encoded_value is not None:
+                self._invalidate()
+                return self._decode(encoded_value)
+
+        # Increment the value optimistically, retrying when the hash changes meanwhile
+        with self._connection.pipeline(transaction=True) as pipeline:
+            while True:
+                try:
+                    # Watch the hash and fetch the current value, which defaults to zero
+                    pipeline.watch(self._key)
+                    identifier = pipeline.hget(self._key, encoded_key)
+                    value = (0 if identifier is None else self._fetch_by_identifier(identifier)) + amount
+
+                    # Store the incremented value
+                    pipeline.multi()
+                    pipeline.hset(self._key, encoded_key, f":{self._encode(value)}")
+                    pipeline.execute()  # type: ignore[no-untyped-call]
+
+                    # Return the incremented value
+                    self._invalidate()
+                    return value
+                except redis.WatchError:
+                    # The hash was changed meanwhile, retry
+                    continue
+
+    def _plan_batch(self, pipeline: redis.client.Pipeline, writes: DictionaryWrites) -> Finisher:
+        # Plan the buffered values first
+        mapping = {encoded_key: self._plan_identifier(pipeline, value) for encoded_key, value in writes.fields.items() if value is not DELETED}
+
+        # Fetch the original identifiers of the checked keys, before the hash is cleared
+        checking = len(pipeline)
+        if writes.cleared and writes.checked:
+            pipeline.hmget(self._key, list(writes.checked))
+
+        # Fetch the original identifiers as part of the transaction - used for future deletion
+        position = len(pipeline)
+        if writes.cleared:
+            # Fetch and delete the entire hash
+            pipeline.hvals(self._key)
+            pipeline.delete(self._key)
+        else:
+            # Fetch the original identifiers of the written keys
+            pipeline.hmget(self._key, list(writes.fields))
 
-    def copy(self) -> typing.Mapping[typing.Any, typing.Any]:
-        # Create output mapping
-        output = self._COPY_TYPE()
+            # Delete the deleted keys
+            if deleted_keys := [encoded_key for encoded_key, value in writes.fields.items() if value is DELETED]:
+                pipeline.hdel(self._key, *deleted_keys)
 
-        # Fetch the raw values
-        raw_mapping = self._connection.hgetall(self._key)
+        # Create an iterator over the mapping items
+        iterator = iter(mapping.items())
 
-        # Make sure raw values are a mapping
-        if not isinstance(raw_mapping, Mapping):
-            raise TypeError(raw_mapping)
+        # Set all of the identifiers in chunks
+        while chunk := dict(itertools.islice(iterator, self._CHUNK_SIZE)):
+            pipeline.hset(self._key, mapping=chunk)
 
-        # Loop over keys
-        for encoded_key, identifier in raw_mapping.items():
-            # Fetch nested object from identifier
-            value = self._fetch_by_identifier(identifier)
+        def finish(results: typing.List[typing.Any]) -> typing.Tuple[typing.List[typing.Any], typing.List[Exception]]:
+            # Failed fetches are reported by the transaction
+            if isinstance(results[position], Exception) or isinstance(results[checking], Exception):
+                return [], []
 
-            # Try copying the value
-            with contextlib.suppress(AttributeError):
-                value = value.copy()
+            # Find the original identifiers of the checked keys
+            originals = dict(zip(writes.checked if writes.cleared else writes.fields, results[checking]))
+
+            # Raise a key error for every deleted key which did not exist
+            errors: typing.List[Exception] = [KeyError(key) for encoded_key, key in writes.checked.items() if originals[encoded_key] is None]
+
+            # Return the original identifiers for deletion
+            return [identifier for identifier in results[position] if identifier is not None], errors
+
+        # Return the result processing callback
+        return finish
 
-            # Update the bunch
-            output[self._decode(encoded_key)] = value
+    # Utility functions
+
+    def copy(self) -> typing.Mapping[typing.Any, typing.Any]:
+        # Materialize the entire tree in a single call and copy it
+        return self._copy_from_contents(self._materialize())
+
+    def _copy_from_contents(self, contents: typing.List[typing.Any]) -> typing.Mapping[typing.Any, typing.Any]:
+        # Create output mapping
+        output = self._COPY_TYPE()
+
+        # Loop over encoded keys and materialized values
+        for encoded_key, value in zip(contents[::2], contents[1::2]):
+            # Update the bunch with the copied value
+            output[self._decode_key(encoded_key)] = self._copy_from_materialized(value)
 
         # Return the created output
         return output
@@ -347,5 +613,43 @@ class Dictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
             object.__delattr__(self, key)
 
 
+class DictionaryItemsView(typing.ItemsView[typing.Any, typing.Any]):
+
+    # The viewed dictionary
+    _mapping: Dictionary
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[typing.Any, typing.Any]]:
+        # Fetch the items in batches
+        return self._mapping._iter_items()
+
+    def __contains__(self, item: object) -> bool:
+        # Make sure the item is a pair
+        if not isinstance(item, tuple) or len(item) != 2:
+            return False
+
+        # Split the item to the key and the value
+        key, value = item
+
+        try:
+            # Fetch the stored value
+            stored_value = self._mapping[key]
+        except KeyError:
+            return False
+
+        # Compare the values
+        return bool(stored_value is value or stored_value == value)
+
+
+class DictionaryValuesView(typing.ValuesView[typing.Any]):
+
+    # The viewed dictionary
+    _mapping: Dictionary
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        # Fetch the values in batches
+        for _, value in self._mapping._iter_items():
+            yield value
+
+
 # Register nested object
-NESTED_TYPES.append(NestedType("hash", Dictionary, dict))
+NESTED_TYPES.register(NestedType("hash", Dictionary, dict))
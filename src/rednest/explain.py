@@ -0,0 +1,163 @@
+import typing
+import contextlib
+import dataclasses
+
+# Import the instrumentation patches
+from rednest.instrumentation import Observer, observe
+
+# Default number of repeated single commands which is reported as an N+1 pattern
+THRESHOLD = 10
+
+
+@dataclasses.dataclass
+class PlanCommand:
+
+    # Name of the command, or PIPELINE for pipelines
+    name: str
+
+    # Arguments of the command, or the command names of the pipeline
+    arguments: typing.Tuple[typing.Any, ...] = ()
+
+    # Number of commands in the pipeline, zero for single commands
+    size: int = 0
+
+    def __str__(self) -> str:
+        # Pipelines are represented by their size
+        if self.size:
+            return f"{self.name} ({self.size} commands)"
+
+        # Commands are represented by their first argument, which is usually the key
+        return f"{self.name} {self.arguments[0]!r}" if self.arguments else self.name
+
+
+@dataclasses.dataclass
+class PlanNode:
+
+    # Name of the operation - the class name and the method name
+    name: str
+
+    # Nested operations and commands, in the order they were issued
+    entries: typing.List[typing.Union["PlanNode", PlanCommand]] = dataclasses.field(default_factory=list)
+
+    def commands(self) -> typing.Iterator[PlanCommand]:
+        # Yield all of the commands of the node and its children
+        for entry in self.entries:
+            if isinstance(entry, PlanNode):
+                yield from entry.commands()
+            else:
+                yield entry
+
+    def render(self, depth: int = 0) -> typing.Iterator[str]:
+        # Yield the lines of the node and its entries, indented by depth
+        yield "  " * depth + self.name
+        for entry in self.entries:
+            if isinstance(entry, PlanNode):
+                yield from entry.render(depth + 1)
+            else:
+                yield "  " * (depth + 1) + f"-> {entry}"
+
+
+@dataclasses.dataclass
+class Finding:
+
+    # Name of the operation which issued the commands
+    operation: str
+
+    # Name of the repeated command
+    command: str
+
+    # Number of single commands issued and number of calls of the operation
+    count: int
+    calls: int
+
+    def __str__(self) -> str:
+        # Describe the repeated command
+        return f"{self.operation} issued {self.count} single {self.command} commands in {self.calls} call(s)"
+
+
+class Plan(Observer):
+
+    def __init__(self, threshold: int = THRESHOLD) -> None:
+        # Initialize the threshold of the findings
+        self.threshold = threshold
+
+        # Initialize the root node, which holds the public calls
+        self._root = PlanNode("explain")
+
+        # Initialize the stack of running operations and the tokens of their children
+        self._stack: typing.List[typing.Tuple[PlanNode, typing.Dict[int, PlanNode]]] = [(self._root, {})]
+
+        # Initialize the tokens of the recorded calls, which are kept so that their identities are not reused
+        self._tokens: typing.List[typing.Any] = []
+
+    @property
+    def calls(self) -> typing.List[PlanNode]:
+        # Return the public calls, made outside of other operations
+        return [entry for entry in self._root.entries if isinstance(entry, PlanNode)]
+
+    @property
+    def commands(self) -> int:
+        # Count all of the commands, including the commands of pipelines
+        return sum(command.size or 1 for command in self._root.commands())
+
+    @property
+    def round_trips(self) -> int:
+        # Every single command and every pipeline is a round trip
+        return sum(1 for _ in self._root.commands())
+
+    @property
+    def findings(self) -> typing.List[Finding]:
+        # Count the single commands issued by every public operation, including repeated calls of the operation
+        counts: typing.Dict[typing.Tuple[str, str], int] = {}
+        calls: typing.Dict[str, int] = {}
+        for node in self.calls:
+            calls[node.name] = calls.get(node.name, 0) + 1
+            for command in node.commands():
+                if not command.size:
+                    counts[(node.name, command.name)] = counts.get((node.name, command.name), 0) + 1
+
+        # Report the commands which were repeated at least as many times as the threshold
+        return [Finding(operation, command, count, calls[operation]) for (operation, command), count in counts.items() if count >= self.threshold]
+
+    def enter(self, name: str, token: typing.Any) -> None:
+        # Resumed generators continue their existing node
+        parent, children = self._stack[-1]
+        node = children.get(id(token))
+
+        # Create a new node for new calls
+        if node is None:
+            node = children[id(token)] = PlanNode(name)
+            parent.entries.append(node)
+            self._tokens.append(token)
+
+        # Push the node
+        self._stack.append((node, {}))
+
+    def exit(self) -> None:
+        # Pop the node
+        self._stack.pop()
+
+    def command(self, name: str, arguments: typing.Tuple[typing.Any, ...], size: int) -> None:
+        # Add the command to the running operation
+        self._stack[-1][0].entries.append(PlanCommand(name, arguments, size))
+
+    def render(self) -> str:
+        # Render the summary, the calls and the findings
+        lines = [f"{self.round_trips} round trip(s), {self.commands} command(s)"]
+        for entry in self._root.entries:
+            lines.extend(entry.render() if isinstance(entry, PlanNode) else [f"-> {entry}"])
+        lines.extend(f"N+1: {finding}" for finding in self.findings)
+
+        # Join all of the lines
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        # Render the plan
+        return self.render()
+
+
+@contextlib.contextmanager
+def explain(threshold: int = THRESHOLD) -> typing.Iterator[Plan]:
+    # Record the commands of the current thread into a new plan
+    with observe(Plan(threshold)) as plan:
+        yield typing.cast(Plan, plan)
@@ -0,0 +1,604 @@
+import time
+import math
+import typing
+import inspect
+import functools
+import contextlib
+import threading
+import contextvars
+import dataclasses
+
+import redis
+import redis.client
+import redis.asyncio.client
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS: typing.Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, math.inf)
+
+# Special methods which are public operations
+OPERATIONS = ("__getitem__", "__setitem__", "__delitem__", "__contains__", "__iter__", "__len__", "__eq__", "__repr__")
+
+# Public methods which only wrap other operations
+EXCLUDED = ("batch", "transaction")
+
+
+@dataclasses.dataclass
+class OperationSample:
+
+    # Name of the operation - the class name and the method name
+    name: str
+
+    # Duration of the operation in seconds
+    seconds: float = 0.0
+
+    # Number of network round trips - a pipeline is a single round trip
+    round_trips: int = 0
+
+    # Number of redis commands
+    commands: int = 0
+
+    # Approximate payload sizes, without the protocol overhead
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+
+@dataclasses.dataclass
+class OperationStats:
+
+    # Number of calls of the operation
+    calls: int = 0
+
+    # Totals of all of the calls
+    seconds: float = 0.0
+    round_trips: int = 0
+    commands: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+    # Number of calls per latency bucket, matching LATENCY_BUCKETS
+    histogram: typing.List[int] = dataclasses.field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+
+    def record(self, sample: OperationSample) -> None:
+        # Add the sample to the totals
+        self.calls += 1
+        self.seconds += sample.seconds
+        self.round_trips += sample.round_trips
+        self.commands += sample.commands
+        self.bytes_sent += sample.bytes_sent
+        self.bytes_received += sample.bytes_received
+
+        # Add the sample to the first bucket which bounds its latency
+        self.histogram[next(index for index, bound in enumerate(LATENCY_BUCKETS) if sample.seconds <= bound)] += 1
+
+
+class Observer:
+
+    def enter(self, name: str, token: typing.Any) -> None:
+        # Called when an operation starts or resumes - the token identifies the call
+        pass
+
+    def exit(self) -> None:
+        # Called when an operation finishes or suspends
+        pass
+
+    def command(self, name: str, arguments: typing.Tuple[typing.Any, ...], size: int) -> None:
+        # Called for every round trip - single commands have no size, pipelines have the number of their commands
+        pass
+
+
+# Type of exporter callbacks, which receive every finished operation
+Exporter = typing.Callable[[OperationSample], None]
+
+# Lock protecting the statistics, the exporters and the instrumented connections
+_LOCK = threading.RLock()
+
+# Statistics by operation name
+_STATS: typing.Dict[str, OperationStats] = {}
+
+# Registered exporter callbacks
+_EXPORTERS: typing.List[Exporter] = []
+
+# Whether the statistics are collected
+_ENABLED = False
+
+# Number of users of the instrumentation - nothing is measured while there are none
+_USERS = 0
+
+# Instrumented copies by the identities of their connections, and the connections by the identities of their copies
+_CONNECTIONS: typing.Dict[int, typing.Tuple[typing.Any, typing.Any]] = {}
+_COPIES: typing.Dict[int, typing.Any] = {}
+
+# Instrumented connection classes by their original classes
+_CONNECTION_TYPES: typing.Dict[type, type] = {}
+
+# The sample of the running operation - context local, so that concurrent tasks are measured separately
+_SAMPLE: contextvars.ContextVar[typing.Optional[OperationSample]] = contextvars.ContextVar("sample", default=None)
+
+# The observers of every thread
+_STATE = threading.local()
+
+
+def _size(value: typing.Any) -> int:
+    # Measure strings and bytes directly
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return len(value)
+
+    # Measure containers recursively
+    if isinstance(value, (list, tuple, set)):
+        return sum(_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_size(key) + _size(item) for key, item in value.items())
+
+    # Nothing was transferred
+    if value is None:
+        return 0
+
+    # Measure other values by their representation
+    return len(str(value))
+
+
+def _sample() -> typing.Optional[OperationSample]:
+    # Return the sample of the running operation, if any
+    return _SAMPLE.get()
+
+
+def _observers() -> typing.List[Observer]:
+    # Return the observers of the thread, creating them if needed
+    try:
+        return _STATE.observers  # type: ignore[no-any-return]
+    except AttributeError:
+        _STATE.observers = []
+        return _STATE.observers  # type: ignore[no-any-return]
+
+
+def _record(sample: OperationSample) -> None:
+    with _LOCK:
+        # Statistics are not collected while only observers use the instrumentation
+        if not _ENABLED:
+            return
+
+        # Add the sample to the statistics of the operation
+        _STATS.setdefault(sample.name, OperationStats()).record(sample)
+
+        # Copy the exporters, so that they run without the lock
+        exporters = list(_EXPORTERS)
+
+    # Export the sample
+    for exporter in exporters:
+        exporter(sample)
+
+
+def _measure_generator(name: str, generator: typing.Iterator[typing.Any]) -> typing.Iterator[typing.Any]:
+    # Generators are measured while they run, so that the code consuming them is not measured - they are sampled only if they are not resumed by another operation at first
+    sample = None if _sample() is not None else OperationSample(name)
+
+    try:
+        while True:
+            # Resume the generator as the running operation
+            for observer in _observers():
+                observer.enter(name, generator)
+            previous, start = _sample(), time.perf_counter()
+            if sample is not None:
+                _SAMPLE.set(sample)
+
+            try:
+                value = next(generator)
+            except StopIteration:
+                return
+            finally:
+                # Suspend the operation
+                if sample is not None:
+                    sample.seconds += time.perf_counter() - start
+                    _SAMPLE.set(previous)
+                for observer in _observers():
+                    observer.exit()
+
+            # Yield the value outside of the operation
+            yield value
+    finally:
+        # Close the generator and record the sample, even if it was not exhausted
+        generator.close()  # type: ignore[attr-defined]
+        if sample is not None:
+            _record(sample)
+
+
+async def _measure_async_generator(name: str, generator: typing.AsyncIterator[typing.Any]) -> typing.AsyncIterator[typing.Any]:
+    # Asynchronous generators are measured while they run, like generators - they are not reported to the observers, since concurrent tasks interleave
+    sample = None if _sample() is not None else OperationSample(name)
+
+    try:
+        while True:
+            # Resume the generator as the running operation
+            previous, start = _sample(), time.perf_counter()
+            if sample is not None:
+                _SAMPLE.set(sample)
+
+            try:
+                value = await generator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                # Suspend the operation
+                if sample is not None:
+                    sample.seconds += time.perf_counter() - start
+                    _SAMPLE.set(previous)
+
+            # Yield the value outside of the operation
+            yield value
+    finally:
+        # Close the generator and record the sample, even if it was not exhausted
+        await generator.aclose()  # type: ignore[attr-defined]
+        if sample is not None:
+            _record(sample)
+
+
+def _instrument_operation(name: str, method: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+    # Generators are measured once they are created
+    if inspect.isgeneratorfunction(method):
+
+        @functools.wraps(method)
+        def generator_wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Iterator[typing.Any]:
+            # Nothing is measured while the instrumentation is unused
+            if not _USERS:
+                return method(*args, **kwargs)  # type: ignore[no-any-return]
+
+            # Measure the generator
+            return _measure_generator(name, method(*args, **kwargs))
+
+        return generator_wrapper
+
+    # Asynchronous generators are measured once they are created
+    if inspect.isasyncgenfunction(method):
+
+        @functools.wraps(method)
+        def async_generator_wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.AsyncIterator[typing.Any]:
+            # Nothing is measured while the instrumentation is unused
+            if not _USERS:
+                return method(*args, **kwargs)  # type: ignore[no-any-return]
+
+            # Measure the generator
+            return _measure_async_generator(name, method(*args, **kwargs))
+
+        return async_generator_wrapper
+
+    # Coroutines are measured like methods - they are not reported to the observers, since concurrent tasks interleave
+    if inspect.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def coroutine_wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            # Nothing is measured while the instrumentation is unused, and operations called by other operations are attributed to the outer operation
+            if not _USERS or _sample() is not None:
+                return await method(*args, **kwargs)
+
+            # Run the method as the running operation
+            sample = OperationSample(name)
+            token, start = _SAMPLE.set(sample), time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                sample.seconds = time.perf_counter() - start
+                _SAMPLE.reset(token)
+                _record(sample)
+
+        return coroutine_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        # Nothing is measured while the instrumentation is unused
+        if not _USERS:
+            return method(*args, **kwargs)
+
+        # Notify the observers of the call
+        for observer in _observers():
+            observer.enter(name, object())
+
+        try:
+            # Operations called by other operations are attributed to the outer operation
+            if _sample() is not None:
+                return method(*args, **kwargs)
+
+            # Run the method as the running operation
+            sample = OperationSample(name)
+            token, start = _SAMPLE.set(sample), time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                sample.seconds = time.perf_counter() - start
+                _SAMPLE.reset(token)
+                _record(sample)
+        finally:
+            # Notify the observers of the return
+            for observer in _observers():
+                observer.exit()
+
+    return wrapper
+
+
+def instrument_creation(method: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+
+    @functools.wraps(method)
+    def wrapper(self: typing.Any, nested_type: typing.Any, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        # Nothing is reported while the instrumentation is unused
+        if not _USERS:
+            return method(self, nested_type, *args, **kwargs)
+
+        # Nested handle creation is only reported to the observers
+        for observer in _observers():
+            observer.enter(f"{nested_type.nested_class.__name__}.create", object())
+
+        try:
+            # Create the nested handle
+            return method(self, nested_type, *args, **kwargs)
+        finally:
+            # Notify the observers of the return
+            for observer in _observers():
+                observer.exit()
+
+    return wrapper
+
+
+def _report_command(sample: typing.Optional[OperationSample], arguments: typing.Tuple[typing.Any, ...], response: typing.Any) -> None:
+    # Commands outside of operations are not measured
+    if sample is None:
+        return
+
+    # Add the command to the sample
+    sample.round_trips += 1
+    sample.commands += 1
+    sample.bytes_sent += _size(arguments)
+    sample.bytes_received += _size(response)
+
+
+def _instrument_command(method: typing.Callable[..., typing.Any]) -> typing.Callable[..., typing.Any]:
+    # Asynchronous commands are measured once awaited
+    if inspect.iscoroutinefunction(method):
+
+        async def async_wrapper(*args: typing.Any, **options: typing.Any) -> typing.Any:
+            # Notify the observers of the command
+            for observer in _observers():
+                observer.command(str(args[0]).upper() if args else "", args[1:], 0)
+
+            # Execute the command and measure it
+            sample = _sample()
+            response = await method(*args, **options)
+            _report_command(sample, args, response)
+
+            # Return the response
+            return response
+
+        return async_wrapper
+
+    def wrapper(*args: typing.Any, **options: typing.Any) -> typing.Any:
+        # Notify the observers of the command
+        for observer in _observers():
+            observer.command(str(args[0]).upper() if args else "", args[1:], 0)
+
+        # Execute the command and measure it
+        sample = _sample()
+        response = method(*args, **options)
+        _report_command(sample, args, response)
+
+        # Return the response
+        return response
+
+    return wrapper
+
+
+def _pipeline_stack(pipeline: typing.Any) -> typing.List[typing.Tuple[typing.Any, ...]]:
+    # Fetch the arguments of the queued commands before they are cleared
+    if isinstance(pipeline, (redis.client.Pipeline, redis.asyncio.client.Pipeline)):
+        stack = [command[0] for command in pipeline.command_stack]
+    else:
+        stack = [command.args for command in getattr(getattr(pipeline, "_execution_strategy", None), "command_queue", ())]
+
+    # Notify the observers of the pipeline - empty pipelines are not sent
+    if stack:
+        for observer in _observers():
+            observer.command("PIPELINE", tuple(str(command[0]).upper() for command in stack), len(stack))
+
+    # Return the arguments of the commands
+    return stack
+
+
+def _report_pipeline(sample: typing.Optional[OperationSample], stack: typing.List[typing.Tuple[typing.Any, ...]], response: typing.Any) -> None:
+    # Pipelines outside of operations are not measured
+    if sample is None:
+        return
+
+    # Add the pipeline to the sample
+    sample.round_trips += 1 if stack else 0
+    sample.commands += len(stack)
+    sample.bytes_sent += _size(stack)
+    sample.bytes_received += _size(response)
+
+
+def _instrument_pipeline(pipeline: typing.Any) -> typing.Any:
+    # The pipeline is created by the instrumented connection, so its own methods are replaced
+    execute = pipeline.execute
+
+    # Asynchronous pipelines are measured once awaited
+    if inspect.iscoroutinefunction(execute):
+
+        async def async_execute(*args: typing.Any, **options: typing.Any) -> typing.Any:
+            # Execute the pipeline and measure it
+            stack, sample = _pipeline_stack(pipeline), _sample()
+            response = await execute(*args, **options)
+            _report_pipeline(sample, stack, response)
+
+            # Return the responses
+            return response
+
+        pipeline.execute = async_execute
+    else:
+
+        def sync_execute(*args: typing.Any, **options: typing.Any) -> typing.Any:
+            # Execute the pipeline and measure it
+            stack, sample = _pipeline_stack(pipeline), _sample()
+            response = execute(*args, **options)
+            _report_pipeline(sample, stack, response)
+
+            # Return the responses
+            return response
+
+        pipeline.execute = sync_execute
+
+    # Commands of watching pipelines are sent immediately
+    if isinstance(pipeline, (redis.client.Pipeline, redis.asyncio.client.Pipeline)):
+        pipeline.immediate_execute_command = _instrument_command(pipeline.immediate_execute_command)
+
+    # Return the instrumented pipeline
+    return pipeline
+
+
+class InstrumentedConnection:
+
+    # Connections used by the nested handles while instrumentation is used - they share the state of the original connections
+
+    def execute_command(self, *args: typing.Any, **options: typing.Any) -> typing.Any:
+        # Measure the command
+        return _instrument_command(super().execute_command)(*args, **options)  # type: ignore[misc]
+
+    def pipeline(self, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        # Measure the pipeline
+        return _instrument_pipeline(super().pipeline(*args, **kwargs))  # type: ignore[misc]
+
+    def __del__(self) -> None:
+        # The original connection owns the sockets, so nothing is closed
+        pass
+
+
+def instrumented_connection(connection: typing.Any) -> typing.Any:
+    # Use the connection itself while the instrumentation is unused
+    if not _USERS or isinstance(connection, InstrumentedConnection):
+        return connection
+
+    # Fetch the instrumented copy of the connection
+    entry = _CONNECTIONS.get(id(connection))
+    if entry is not None:
+        return entry[1]
+
+    with _LOCK:
+        # Check again, since the instrumentation might have been released meanwhile
+        if not _USERS:
+            return connection
+
+        # Create the instrumented class of the connection once
+        connection_type = _CONNECTION_TYPES.get(type(connection))
+        if connection_type is None:
+            connection_type = _CONNECTION_TYPES[type(connection)] = type(f"Instrumented{type(connection).__name__}", (InstrumentedConnection, type(connection)), {})
+
+        # Create a copy sharing the attributes of the connection, so that both use the same pool
+        copy = object.__new__(connection_type)
+        copy.__dict__ = connection.__dict__
+
+        # Store the copy until the instrumentation is released
+        entry = _CONNECTIONS.setdefault(id(connection), (connection, copy))
+        _COPIES[id(entry[1])] = connection
+
+        # Return the copy
+        return entry[1]
+
+
+def original_connection(connection: typing.Any) -> typing.Any:
+    # Return the connection of an instrumented copy
+    return _COPIES.get(id(connection), connection)
+
+
+def instrument_class(nested_class: type) -> None:
+    # Instrument all of the public operations defined by the class itself - the wrappers measure nothing while the instrumentation is unused
+    for attribute, value in list(vars(nested_class).items()):
+        # Skip private methods and methods which only wrap other operations
+        if (attribute.startswith("_") and attribute not in OPERATIONS) or attribute in EXCLUDED:
+            continue
+
+        # Skip anything but plain methods
+        if not inspect.isfunction(value):
+            continue
+
+        # Name the operation by the class and the method, without the underscores of special methods
+        setattr(nested_class, attribute, _instrument_operation(f"{nested_class.__name__}.{attribute.strip('_')}", value))
+
+
+def _acquire() -> None:
+    global _USERS
+
+    with _LOCK:
+        # Start measuring through the nested handles
+        _USERS += 1
+
+
+def _release() -> None:
+    global _USERS
+
+    with _LOCK:
+        # Drop the instrumented connections after the last user
+        _USERS -= 1
+        if not _USERS:
+            _CONNECTIONS.clear()
+            _COPIES.clear()
+
+
+def enabled() -> bool:
+    # Return whether the statistics are collected
+    return _ENABLED
+
+
+def enable_instrumentation() -> None:
+    global _ENABLED
+
+    with _LOCK:
+        # Start measuring unless already enabled
+        if not _ENABLED:
+            _ENABLED = True
+            _acquire()
+
+
+def disable_instrumentation() -> None:
+    global _ENABLED
+
+    with _LOCK:
+        # Stop measuring unless already disabled
+        if _ENABLED:
+            _ENABLED = False
+            _release()
+
+
+@contextlib.contextmanager
+def observe(observer: Observer) -> typing.Iterator[Observer]:
+    # Measure while observing
+    _acquire()
+
+    # Observe the operations of the current thread
+    _observers().append(observer)
+
+    try:
+        # Yield the observer
+        yield observer
+    finally:
+        # Stop observing and measuring
+        _observers().remove(observer)
+        _release()
+
+
+def stats() -> typing.Dict[str, OperationStats]:
+    with _LOCK:
+        # Return a snapshot of the statistics
+        return {name: dataclasses.replace(operation_stats, histogram=list(operation_stats.histogram)) for name, operation_stats in _STATS.items()}
+
+
+def reset_stats() -> None:
+    with _LOCK:
+        # Clear all of the statistics
+        _STATS.clear()
+
+
+def add_exporter(exporter: Exporter) -> None:
+    with _LOCK:
+        # Register the exporter
+        _EXPORTERS.append(exporter)
+
+
+def remove_exporter(exporter: Exporter) -> None:
+    with _LOCK:
+        # Unregister the exporter
+        _EXPORTERS.remove(exporter)
@@ -1,13 +1,37 @@
-import os
 import typing
+import itertools
 import contextlib
+import dataclasses
+
+import redis
 
 # Import abstract types
-from collections.abc import Sequence, Iterable
+from collections.abc import Sequence
 
 # Import extension objects
 from rednest.nested import Nested, NestedType, NESTED_TYPES
 
+# Import write batching
+from rednest.batching import Finisher
+
+# Import lua scripts
+from rednest.scripts import INDEX_SCRIPT, SPLICE_SCRIPT
+
+
+@dataclasses.dataclass
+class ListWrites:
+
+    # Buffered operations in order - consecutive extends and consecutive sets are coalesced
+    operations: typing.List[typing.Tuple[str, typing.Any]] = dataclasses.field(default_factory=list)
+
+    def operation(self, name: str, factory: typing.Callable[[], typing.Any]) -> typing.Any:
+        # Start a new operation unless the last operation can be coalesced
+        if not self.operations or self.operations[-1][0] != name:
+            self.operations.append((name, factory()))
+
+        # Return the operation arguments
+        return self.operations[-1][1]
+
 
 class List(typing.MutableSequence[typing.Any], Nested):
 
@@ -15,31 +39,44 @@ class List(typing.MutableSequence[typing.Any], Nested):
     _COPY_TYPE: typing.Type[typing.MutableSequence[typing.Any]] = list
 
     def initialize(self, value: typing.List[typing.Any]) -> None:
+        # If the value is nested, copy it before de-initializing
+        if isinstance(value, Nested):
+            value = value.copy()
+
         # De-initialize before initializing
         self.deinitialize()
 
         # Update the list
-        self[:] = value
+        self.extend(value)
 
     def deinitialize(self) -> None:
         # Clear the list
         self.clear()
 
+    def _plan_initialize(self, pipeline: redis.client.Pipeline, value: typing.Any) -> None:
+        # The key is brand new, so initializing is extending
+        self._plan_extend(pipeline, value)
+
+    def _plan_extend(self, pipeline: redis.client.Pipeline, values: typing.Iterable[typing.Any]) -> None:
+        # If the values are nested, copy them in a single call
+        if isinstance(values, Nested):
+            values = values.copy()
+
+        # Create an iterator of planned identifiers
+        iterator = (self._plan_identifier(pipeline, item) for item in values)
+
+        # Push all of the identifiers in chunks
+        while chunk := list(itertools.islice(iterator, self._CHUNK_SIZE)):
+            pipeline.rpush(self._key, *chunk)
+
     def _identifier_from_index(self, index: int) -> typing.Union[str, bytes]:
-        # Request the list at slice index->index
-        identifier_response = self._connection.lrange(self._key, index, index)
+        # Request the item at the index, possibly from the near cache - negative indexes are supported natively
+        identifier = self._cached(index, lambda: self._connection.lindex(self._key, index))
 
         # If the response is empty, item does not exist
-        if not identifier_response:
+        if identifier is None:
             raise IndexError(index)
 
-        # Make sure the identifier response is a list
-        if not isinstance(identifier_response, Iterable):
-            raise TypeError(identifier_response)
-
-        # Fetch the only item in the response
-        identifier, = identifier_response
-
         # Make sure the identifier is a string or bytes
         if not isinstance(identifier, (str, bytes)):
             raise TypeError(identifier)
@@ -47,6 +84,40 @@ class List(typing.MutableSequence[typing.Any], Nested):
         # Return the identifier
         return identifier
 
+    def _identifiers_from_slice(self, index: slice) -> typing.List[typing.Union[str, bytes]]:
+        # Fetch the slice step
+        step = 1 if index.step is None else index.step
+
+        # Make sure the step is valid
+        if step == 0:
+            raise ValueError("slice step cannot be zero")
+
+        # Forward slices map directly to a range request
+        if step > 0:
+            # An exclusive stop of 0 is always empty
+            if index.stop == 0:
+                return []
+
+            # Request the entire span of the slice - negative indexes are supported natively
+            identifiers = self._connection.lrange(self._key, index.start or 0, -1 if index.stop is None else index.stop - 1)
+        else:
+            # Fetch the slice indices
+            indices = range(*index.indices(len(self)))
+
+            # If the slice is empty, nothing to fetch
+            if not indices:
+                return []
+
+            # Request the entire span of the slice and reverse it
+            identifiers = self._connection.lrange(self._key, indices[-1], indices[0])[::-1]  # type: ignore[index]
+
+        # Make sure the identifiers are a list
+        if not isinstance(identifiers, list):
+            raise TypeError(identifiers)
+
+        # Apply the step to the span
+        return identifiers[::abs(step)]
+
     def __repr__(self) -> str:
         # Format the data like a list
         return f"[{', '.join(repr(item) for item in self)}]"
@@ -54,12 +125,8 @@ class List(typing.MutableSequence[typing.Any], Nested):
     def __getitem__(self, index: typing.Union[int, slice]) -> typing.Union[typing.Any, typing.List[typing.Any]]:
         # If a slice is provided, return a list of items
         if isinstance(index, slice):
-            # Create a list with all of the requested items
-            return [self[item_index] for item_index in range(*index.indices(len(self)))]
-
-        # If index is negative, add the length to it
-        if index < 0:
-            index += len(self)
+            # Fetch the identifiers and decode them in bulk
+            return [self._fetch_by_identifier(identifier) for identifier in self._identifiers_from_slice(index)]
 
         # Fetch the identifier
         identifier = self._identifier_from_index(index)
@@ -70,39 +137,36 @@ class List(typing.MutableSequence[typing.Any], Nested):
     def __setitem__(self, index: typing.Union[int, slice], value: typing.Union[typing.Any, typing.Sequence[typing.Any]]) -> None:
         # If a slice is provided, splice the list
         if isinstance(index, slice):
-            # Fetch slice parameters
-            start, stop, step = index.indices(len(self))
-
-            # If the step is more then 1, the value length must match the indice count
-            if step > 1 and len(value) != len(range(start, stop, step)):
-                raise ValueError(f"Attempted to assign sequence of incompatible size {len(value)}")
-
-            # Create an iterator for the value
-            iterator = iter(value)
+            # If the value is nested, copy it in a single call
+            if isinstance(value, Nested):
+                value = value.copy()
 
-            # Insert all of the items from the value
-            for subindex, subvalue in zip(range(start, stop, step), iterator):
-                self[subindex] = subvalue
+            # Create all of the new identifiers at once
+            with self._create_identifiers_from_values(list(value)) as identifiers:
+                # Splice the list atomically
+                original_identifiers = self._splice(index, identifiers)
 
-            # If the step is exactly 1, then we want to insert new values
-            if step == 1:
-                # Loop over remaining items and insert them
-                for counter, subvalue in enumerate(iterator):
-                    self.insert(stop + counter, subvalue)
+            # Delete the original nested values
+            self._delete_tree(identifiers=original_identifiers)
 
             # Nothing more to do
             return
 
-        # If index is negative, add the length to it
-        if index < 0:
-            index += len(self)
+        # Buffer the value when batching - the last value of every index wins
+        if (batch := self._batching()) is not None:
+            # Fetch the buffered values of the last set operation
+            values = batch.writes(self, ListWrites).operation("set", dict)
 
-        # Fetch the identifier
-        original_identifier = self._identifier_from_index(index)
+            # Move the index to the end, so that aliasing indexes are set in order
+            values.pop(index, None)
+            values[index] = value.copy() if isinstance(value, Nested) else value
+
+            # Nothing more to do
+            return
 
-        # Generate the item value and set it
+        # Generate the item value and set it atomically
         with self._create_identifier_from_value(value) as identifier:
-            self._connection.lset(self._key, index, identifier)
+            original_identifier = self._execute_index_script("set", index, identifier)
 
         # Delete the original nested value
         self._delete_by_identifier(original_identifier)
@@ -110,45 +174,73 @@ class List(typing.MutableSequence[typing.Any], Nested):
     def __delitem__(self, index: typing.Union[int, slice]) -> None:
         # If a slice is provided, splice the list
         if isinstance(index, slice):
-            # Delete all required items
-            for counter, subindex in enumerate(range(*index.indices(len(self)))):
-                del self[subindex - counter]
+            # Delete the slice atomically and delete the original nested values
+            self._delete_tree(identifiers=self._splice(index))
 
             # Nothing more to do
             return
 
-        # If index is negative, add the length to it
-        if index < 0:
-            index += len(self)
+        # Delete the item atomically
+        identifier = self._execute_index_script("delete", index)
 
-        # Fetch the identifier
-        identifier = self._identifier_from_index(index)
+        # Delete the original nested object
+        self._delete_by_identifier(identifier)
 
-        # Check if index is the first item
-        if index == 0:
-            # Index 0 == lpop
-            self._connection.lpop(self._key, 1)
-        elif index == len(self) - 1:
-            # Index -1 == rpop
-            self._connection.rpop(self._key, 1)
-        else:
-            # Generate a temporary value
-            temporary_value = os.urandom(64).hex()
+    def _execute_index_script(self, operation: str, index: int, identifier: str = "") -> typing.Union[str, bytes]:
+        # Index operations cannot be buffered, flush the batch first
+        self._flush_batch()
 
-            # Use a pipeline to execute all of the actions atomically
-            pipeline = self._connection.pipeline()
+        try:
+            # Execute the operation on the index
+            response = self._execute_script(INDEX_SCRIPT, keys=[self._key], args=[operation, index, identifier])
+        except redis.ResponseError as exception:
+            # Check whether the index was out of range
+            if not str(exception).startswith("INDEX"):
+                raise
 
-            # Set the temporary value in the selected index
-            pipeline.lset(self._key, index, temporary_value)
+            # Raise an index error instead
+            raise IndexError(index) from None
 
-            # Remove 1 item with the temporary value
-            pipeline.lrem(self._key, 1, temporary_value)
+        # Invalidate the cached items
+        self._invalidate()
 
-            # Execute all pipeline actions
-            pipeline.execute()  # type: ignore[no-untyped-call]
+        # Return the response
+        return response  # type: ignore[no-any-return]
 
-        # Delete the original nested object
-        self._delete_by_identifier(identifier)
+    def _splice(self, index: slice, identifiers: typing.Optional[typing.List[str]] = None) -> typing.List[typing.Union[str, bytes]]:
+        # Convert the slice to script arguments
+        arguments = ["" if argument is None else argument for argument in (index.start, index.stop, index.step)]
+
+        # Make sure the step is valid
+        if index.step == 0:
+            raise ValueError("slice step cannot be zero")
+
+        # Splices cannot be buffered, flush the batch first
+        self._flush_batch()
+
+        try:
+            # Assign or delete the slice
+            if identifiers is not None:
+                original_identifiers = self._execute_script(SPLICE_SCRIPT, keys=[self._key], args=[*arguments, "assign", *identifiers])
+            else:
+                original_identifiers = self._execute_script(SPLICE_SCRIPT, keys=[self._key], args=[*arguments, "delete"])
+        except redis.ResponseError as exception:
+            # Check whether the extended slice size did not match
+            if not str(exception).startswith("SIZE"):
+                raise
+
+            # Raise a value error instead
+            raise ValueError(f"Attempted to assign sequence of incompatible size {len(identifiers or ())}") from None
+
+        # Invalidate the cached items
+        self._invalidate()
+
+        # Make sure the original identifiers are a list
+        if not isinstance(original_identifiers, list):
+            raise TypeError(original_identifiers)
+
+        # Return the original identifiers
+        return original_identifiers
 
     def __len__(self) -> int:
         # Fetch the list length
@@ -161,11 +253,53 @@ class List(typing.MutableSequence[typing.Any], Nested):
         # Return the length
         return length
 
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        # Stream the list chunk by chunk
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def iter_chunks(self, size: typing.Optional[int] = None) -> typing.Iterator[typing.List[typing.Any]]:
+        # Stream the entire list
+        return self._iter_chunks(size or self._CHUNK_SIZE)
+
+    def _iter_chunks(self, size: int, start: int = 0, stop: typing.Optional[int] = None) -> typing.Iterator[typing.List[typing.Any]]:
+        # Decode the values of every window
+        for identifiers in self._iter_identifiers(size, start, stop):
+            yield [self._fetch_by_identifier(identifier) for identifier in identifiers]
+
+    def _iter_identifiers(self, size: int, start: int = 0, stop: typing.Optional[int] = None) -> typing.Iterator[typing.List[typing.Union[str, bytes]]]:
+        # Loop until the end of the requested range
+        while stop is None or start < stop:
+            # Fetch the next window of identifiers
+            identifiers = self._connection.lrange(self._key, start, start + size - 1 if stop is None else min(start + size, stop) - 1)
+
+            # Make sure the identifiers are a list
+            if not isinstance(identifiers, list):
+                raise TypeError(identifiers)
+
+            # If the window is empty, the list has ended
+            if not identifiers:
+                return
+
+            # Yield the identifiers of the window
+            yield identifiers
+
+            # If the window is partial, the list has ended
+            if len(identifiers) < size:
+                return
+
+            # Move to the next window
+            start += size
+
     def __eq__(self, other: typing.Any) -> bool:
         # Make sure the other item is a sequence
         if not isinstance(other, Sequence):
             return False
 
+        # If the other object is nested, copy it in a single call
+        if isinstance(other, Nested):
+            other = other.copy()
+
         # Make sure lengths are the same
         if len(self) != len(other):
             return False
@@ -179,78 +313,145 @@ class List(typing.MutableSequence[typing.Any], Nested):
         # Items match
         return True
 
-    def insert(self, index: int, value: typing.Any) -> None:
-        # If index is negative, add the length to it
-        if index < 0:
-            index += len(self)
-
-        # Check whether the index is 0
-        if index == 0:
-            # Insert 0 == lpush
-            with self._create_identifier_from_value(value) as identifier:
-                self._connection.lpush(self._key, identifier)
-        elif index == len(self):
-            # Insert -1 == rpush
-            with self._create_identifier_from_value(value) as identifier:
-                self._connection.rpush(self._key, identifier)
-        else:
-            # Fetch the identifier
-            original_identifier = self._identifier_from_index(index)
+    def append(self, value: typing.Any) -> None:
+        # Extend the list with a single value
+        self.extend([value])
+
+    def extend(self, values: typing.Iterable[typing.Any]) -> None:
+        # Buffer the values when batching
+        if (batch := self._batching()) is not None:
+            # If the values are nested, copy them in a single call
+            if isinstance(values, Nested):
+                values = values.copy()
+
+            # Buffer all of the values, copying nested values so that later changes are not flushed
+            batch.writes(self, ListWrites).operation("extend", list).extend(value.copy() if isinstance(value, Nested) else value for value in values)
+
+            # Nothing more to do
+            return
+
+        # Create a pipeline to hold all of the writes
+        pipeline = self._connection.pipeline()
 
-            # Make sure the original identifier is a string
-            if not isinstance(original_identifier, str):
-                original_identifier = original_identifier.decode(self._ENCODING)
+        # Plan the nested writes and the pushes, then execute them at once
+        self._plan_extend(pipeline, values)
+        pipeline.execute()  # type: ignore[no-untyped-call]
+        self._invalidate()
 
-            # Create the new value already
-            with self._create_identifier_from_value(value) as identifier:
-                # Generate a temporary value
-                temporary_value = os.urandom(64).hex()
+    def index(self, value: typing.Any, start: int = 0, stop: typing.Optional[int] = None) -> int:
+        # If the start or the stop are negative, add the length to them
+        if start < 0:
+            start = max(len(self) + start, 0)
+        if stop is not None and stop < 0:
+            stop += len(self)
 
-                # Use a pipeline to execute all of the actions atomically
-                pipeline = self._connection.pipeline()
+        # Stream the requested range of the list
+        for chunk_start, chunk in zip(itertools.count(start, self._CHUNK_SIZE), self._iter_chunks(self._CHUNK_SIZE, start, stop)):
+            # Loop over the items in the chunk
+            for offset, item in enumerate(chunk):
+                # Compare the items
+                if item is value or item == value:
+                    return chunk_start + offset
 
-                # Set the temporary value at the current index
-                pipeline.lset(self._key, index, temporary_value)
+        # The value was not found
+        raise ValueError(value)
 
-                # Insert the new item before the temporary item
-                pipeline.linsert(self._key, "before", temporary_value, identifier)
+    def insert(self, index: int, value: typing.Any) -> None:
+        # Generate the item value and insert it atomically
+        with self._create_identifier_from_value(value) as identifier:
+            self._execute_index_script("insert", index, identifier)
 
-                # Restore the original value at the required index
-                pipeline.lset(self._key, index + 1, original_identifier)
+    def clear(self) -> None:
+        # Buffer the clearing when batching, dropping all of the buffered operations
+        if (batch := self._batching()) is not None:
+            batch.writes(self, ListWrites).operations[:] = [("clear", None)]
+            return
 
-                # Execute all pipeline actions
-                pipeline.execute()  # type: ignore[no-untyped-call]
+        # Delete the list and all of the nested values
+        self._delete_tree(keys=[self._key])
+        self._invalidate()
+
+    def _plan_batch(self, pipeline: redis.client.Pipeline, writes: ListWrites) -> Finisher:
+        # Positions of the commands whose results are needed
+        cleared: typing.List[int] = []
+        assigned: typing.List[typing.Tuple[int, int, str]] = []
+
+        # Plan all of the operations in order
+        for name, arguments in writes.operations:
+            if name == "clear":
+                # Fetch and delete the entire list
+                cleared.append(len(pipeline))
+                pipeline.lrange(self._key, 0, -1)
+                pipeline.delete(self._key)
+            elif name == "extend":
+                # Push all of the values
+                self._plan_extend(pipeline, arguments)
+            else:
+                # Set all of the values atomically
+                for index, value in arguments.items():
+                    identifier = self._plan_identifier(pipeline, value)
+                    assigned.append((len(pipeline), index, identifier))
+                    self._execute_script(INDEX_SCRIPT, keys=[self._key], args=["set", index, identifier], client=pipeline)
+
+        def finish(results: typing.List[typing.Any]) -> typing.Tuple[typing.List[typing.Any], typing.List[Exception]]:
+            # Collect the original identifiers and the errors
+            identifiers: typing.List[typing.Any] = []
+            errors: typing.List[Exception] = []
+
+            # Collect the identifiers of the cleared lists
+            for position in cleared:
+                if not isinstance(results[position], Exception):
+                    identifiers.extend(results[position])
+
+            # Collect the identifiers of the replaced items
+            for position, index, identifier in assigned:
+                # Check whether the index was out of range
+                if isinstance(results[position], redis.ResponseError) and str(results[position]).startswith("INDEX"):
+                    # Delete the new value instead and raise an index error
+                    identifiers.append(identifier)
+                    errors.append(IndexError(index))
+                elif isinstance(results[position], (str, bytes)):
+                    identifiers.append(results[position])
+
+            # Return the identifiers and the errors
+            return identifiers, errors
+
+        # Return the result processing callback
+        return finish
 
     def copy(self) -> typing.Sequence[typing.Any]:
+        # Materialize the entire tree in a single call and copy it
+        return self._copy_from_contents(self._materialize())
+
+    def _copy_from_contents(self, contents: typing.List[typing.Any]) -> typing.Sequence[typing.Any]:
         # Create initial bunch
         output = self._COPY_TYPE()
 
-        # Loop over keys
-        for value in self:
-            # Try copying the value
-            with contextlib.suppress(AttributeError):
-                value = value.copy()
-
-            # Update the bunch
-            output.append(value)
+        # Loop over materialized values
+        for value in contents:
+            # Update the bunch with the copied value
+            output.append(self._copy_from_materialized(value))
 
         # Return the created output
         return output
 
     def pop(self, index: int = -1) -> typing.Any:
+        # Remove the item atomically
+        identifier = self._execute_index_script("delete", index)
+
         # Fetch the original value
-        value = self[index]
+        value = self._fetch_by_identifier(identifier)
 
         # Try copying the value
         with contextlib.suppress(AttributeError):
             value = value.copy()
 
-        # Delete the item
-        del self[index]
+        # Delete the original nested object
+        self._delete_by_identifier(identifier)
 
         # Return the value
         return value
 
 
 # Extend nested types with list
-NESTED_TYPES.append(NestedType("list", List, list))
+NESTED_TYPES.register(NestedType("list", List, list))
@@ -0,0 +1,364 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import typing
+import argparse
+import threading
+import dataclasses
+import multiprocessing
+
+import redis
+
+# Import nested objects
+from rednest.list import List
+from rednest.dictionary import Dictionary
+from rednest.batching import TRANSACTION_STATS
+
+# Default mix of operations, as relative weights
+DEFAULT_MIX = "read=70,update=10,replace=10,insert=10"
+
+# Maximal length of the list of every master, so that inserts do not grow the memory forever
+LOG_LENGTH = 100
+
+# Type of load operations, which receive the master, a random generator and the number of keys
+Operation = typing.Callable[[Dictionary, random.Random, int], typing.Any]
+
+# Type of the measurements sent by the worker processes - latencies by operation, errors by operation and transaction counters
+Measurements = typing.Tuple[typing.Dict[str, typing.List[float]], typing.Dict[str, int], typing.Dict[str, int]]
+
+
+def _read(master: Dictionary, generator: random.Random, keys: int) -> None:
+    # Read an entire nested value, if it was written already
+    value = master["nested"].get(f"key{generator.randrange(keys)}")
+    if value is not None:
+        value.copy()
+
+
+def _update(master: Dictionary, generator: random.Random, keys: int) -> None:
+    # Increment a counter using an optimistic transaction, which conflicts with the other writers
+    key = f"key{generator.randrange(keys)}"
+    master["counters"].transaction(lambda counters: counters.__setitem__(key, counters.get(key, 0) + 1))
+
+
+def _replace(master: Dictionary, generator: random.Random, keys: int) -> None:
+    # Replace an entire nested value, deleting the previous subtree
+    master["nested"][f"key{generator.randrange(keys)}"] = {"values": [generator.random() for _ in range(5)], "writer": {"pid": os.getpid()}}
+
+
+def _insert(master: Dictionary, generator: random.Random, keys: int) -> None:
+    # Insert a value at the head of the list, trimming its tail
+    log: List = master["log"]
+    log.insert(0, generator.random())
+    if len(log) > LOG_LENGTH:
+        log.pop()
+
+
+# All of the load operations by name
+OPERATIONS: typing.Dict[str, Operation] = {
+    "read": _read,
+    "update": _update,
+    "replace": _replace,
+    "insert": _insert,
+}
+
+
+@dataclasses.dataclass
+class Interval:
+
+    # Seconds since the load started
+    elapsed: float
+
+    # Number of finished operations and failed operations
+    operations: int
+    errors: int
+
+    # Operations per second
+    throughput: float
+
+    # Latency percentiles in seconds
+    p50: float
+    p99: float
+
+    # Transaction counters
+    commits: int
+    retries: int
+    aborts: int
+
+    # Memory used by redis, in bytes
+    memory: int
+
+    @property
+    def retry_rate(self) -> float:
+        # Return the number of retries per committed transaction
+        return self.retries / self.commits if self.commits else 0.0
+
+
+@dataclasses.dataclass
+class OperationSummary:
+
+    # Number of finished operations and failed operations
+    calls: int
+    errors: int
+
+    # Latency percentiles in seconds
+    p50: float
+    p99: float
+
+
+@dataclasses.dataclass
+class LoadReport:
+
+    # Measurements of every reporting interval
+    intervals: typing.List[Interval] = dataclasses.field(default_factory=list)
+
+    # Summaries of all of the operations by name
+    operations: typing.Dict[str, OperationSummary] = dataclasses.field(default_factory=dict)
+
+    # Memory used by redis before the load started, in bytes
+    initial_memory: int = 0
+
+    # Number of keys which were left behind after the masters were deleted, like subtrees orphaned by racing writers - they are kept for inspection
+    leaked_keys: int = 0
+
+    @property
+    def throughput(self) -> float:
+        # Return the average operations per second
+        return sum(interval.operations for interval in self.intervals) / self.intervals[-1].elapsed if self.intervals else 0.0
+
+    @property
+    def memory_growth(self) -> int:
+        # Return the memory growth since the load started
+        return self.intervals[-1].memory - self.initial_memory if self.intervals else 0
+
+
+def percentile(values: typing.List[float], fraction: float) -> float:
+    # Percentiles of nothing are zero
+    if not values:
+        return 0.0
+
+    # Return the nearest ranked value
+    return sorted(values)[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def parse_mix(text: str) -> typing.Dict[str, int]:
+    # Parse the weight of every operation
+    mix = {}
+    for part in filter(None, text.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}, choose from {', '.join(OPERATIONS)}")
+        mix[name] = int(weight or 1)
+
+    # Make sure some operation can be chosen
+    if not any(mix.values()):
+        raise ValueError(f"Mix {text!r} does not contain any operation")
+
+    # Return the operations which can be chosen
+    return {name: weight for name, weight in mix.items() if weight}
+
+
+def _work(url: str, names: typing.List[str], keys: int, mix: typing.Dict[str, int], threads: int, interval: float, measurements: typing.Any, stop: typing.Any) -> None:
+    # Create a connection for the process, shared by its threads
+    connection = redis.Redis.from_url(url)
+
+    # Create the buffers of the measurements and their lock
+    lock = threading.Lock()
+    latencies: typing.Dict[str, typing.List[float]] = {name: [] for name in mix}
+    errors: typing.Dict[str, int] = {name: 0 for name in mix}
+
+    def loop() -> None:
+        # Create a random generator for the thread
+        generator = random.Random()
+        masters = [Dictionary(connection, name) for name in names]
+
+        # Run random operations until stopped
+        while not stop.is_set():
+            name = generator.choices(list(mix), weights=list(mix.values()))[0]
+            start = time.perf_counter()
+
+            try:
+                OPERATIONS[name](generator.choice(masters), generator, keys)
+            except (redis.RedisError, LookupError, TypeError, ValueError):
+                # Count the failure without stopping the load
+                with lock:
+                    errors[name] += 1
+                continue
+
+            # Record the latency
+            with lock:
+                latencies[name].append(time.perf_counter() - start)
+
+    def flush(previous: typing.Dict[str, int]) -> typing.Dict[str, int]:
+        # Take the transaction counters of the process
+        counters = {counter: getattr(TRANSACTION_STATS, counter) for counter in ("commits", "retries", "aborts")}
+
+        # Swap the buffers and send their measurements
+        with lock:
+            measurements.put(({name: latencies[name][:] for name in mix}, dict(errors), {counter: counters[counter] - previous[counter] for counter in counters}))
+            for name in mix:
+                latencies[name].clear()
+                errors[name] = 0
+
+        # Return the counters for the next flush
+        return counters
+
+    # Start all of the threads
+    workers = [threading.Thread(target=loop, daemon=True) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+
+    # Send the measurements several times per interval until stopped, so that they arrive within their interval - counters inherited from the parent process are not sent
+    counters = {counter: getattr(TRANSACTION_STATS, counter) for counter in ("commits", "retries", "aborts")}
+    while not stop.wait(interval / 4):
+        counters = flush(counters)
+
+    # Wait for the threads, then send the last measurements and the end marker
+    for worker in workers:
+        worker.join()
+    flush(counters)
+    measurements.put(None)
+
+
+def prepare(connection: redis.Redis, names: typing.List[str]) -> None:
+    # Create the structure of every master
+    for name in names:
+        Dictionary(connection, name).update({"counters": {}, "nested": {}, "log": []})
+
+
+def run(url: str, processes: int = 4, threads: int = 4, duration: float = 30.0, masters: int = 1, keys: int = 100, mix: str = DEFAULT_MIX, interval: float = 1.0, report: typing.Optional[typing.Callable[[Interval], None]] = None) -> LoadReport:
+    # Parse the mix before starting anything
+    weights = parse_mix(mix)
+
+    # Create the masters
+    connection = redis.Redis.from_url(url)
+    prefix = f"loadgen:{os.urandom(4).hex()}"
+    names = [f"{prefix}:{index}" for index in range(masters)]
+    prepare(connection, names)
+
+    # Start all of the processes
+    measurements: typing.Any = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    workers = [multiprocessing.Process(target=_work, args=(url, names, keys, weights, threads, interval, measurements, stop), daemon=True) for _ in range(processes)]
+    result = LoadReport(initial_memory=connection.info("memory")["used_memory"])
+    for worker in workers:
+        worker.start()
+
+    # Collect all of the latencies for the summaries
+    latencies: typing.Dict[str, typing.List[float]] = {name: [] for name in weights}
+    errors: typing.Dict[str, int] = {name: 0 for name in weights}
+
+    try:
+        # Aggregate the measurements every interval until all of the processes finished
+        start, finished = time.perf_counter(), 0
+        while finished < processes:
+            # Receive the measurements until the end of the interval
+            received: typing.List[Measurements] = []
+            deadline = min(time.perf_counter() + interval, start + duration)
+            while time.perf_counter() < deadline:
+                try:
+                    received.append(measurements.get(timeout=deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+
+            # Once the duration elapses, stop the workers and wait for their last measurements
+            if time.perf_counter() >= start + duration:
+                stop.set()
+                while finished < processes:
+                    try:
+                        measurement = measurements.get(timeout=1)
+                    except queue.Empty:
+                        # Stop waiting for processes which died
+                        if not any(worker.is_alive() for worker in workers):
+                            break
+                        continue
+
+                    # Count the end markers of the processes
+                    if measurement is None:
+                        finished += 1
+                    else:
+                        received.append(measurement)
+
+                # Processes which died are considered finished
+                finished = processes
+
+            # Merge the measurements of the interval
+            interval_latencies = [latency for measurement in received for values in measurement[0].values() for latency in values]
+            for interval_values, interval_errors, _ in received:
+                for name in weights:
+                    latencies[name].extend(interval_values[name])
+                    errors[name] += interval_errors[name]
+
+            # Summarize the interval
+            elapsed = time.perf_counter() - start
+            totals = {counter: sum(measurement[2][counter] for measurement in received) for counter in ("commits", "retries", "aborts")}
+            current = Interval(elapsed, len(interval_latencies), sum(sum(measurement[1].values()) for measurement in received), len(interval_latencies) / (elapsed - (result.intervals[-1].elapsed if result.intervals else 0.0)), percentile(interval_latencies, 0.5), percentile(interval_latencies, 0.99), totals["commits"], totals["retries"], totals["aborts"], connection.info("memory")["used_memory"])
+            result.intervals.append(current)
+
+            # Report the interval
+            if report is not None:
+                report(current)
+
+        # Summarize all of the operations
+        result.operations = {name: OperationSummary(len(latencies[name]), errors[name], percentile(latencies[name], 0.5), percentile(latencies[name], 0.99)) for name in weights}
+    finally:
+        # Stop and wait for the processes
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=10)
+
+        # Delete the masters
+        for name in names:
+            Dictionary(connection, name).clear()
+
+        # Count the keys which are no longer referenced by the masters
+        result.leaked_keys = sum(1 for _ in connection.scan_iter(match=f"*{prefix}:*"))
+
+    # Return the report
+    return result
+
+
+def _print_interval(interval: Interval) -> None:
+    # Print a single line per interval
+    print(f"{interval.elapsed:>7.1f}s {interval.throughput:>10,.0f} ops/s  p50 {interval.p50 * 1000:>7.2f}ms  p99 {interval.p99 * 1000:>7.2f}ms  retries {interval.retry_rate:>6.1%}  aborts {interval.aborts:>4}  errors {interval.errors:>4}  memory {interval.memory:>12,} B")
+
+
+def main() -> None:
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(prog="python -m rednest.loadgen", description="Generate contended load from many processes and threads against shared masters")
+    parser.add_argument("--url", default="redis://localhost:6379", help="redis server URL")
+    parser.add_argument("--processes", type=int, default=4, help="number of worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="number of threads in every process")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run the load")
+    parser.add_argument("--masters", type=int, default=1, help="number of shared masters")
+    parser.add_argument("--keys", type=int, default=100, help="number of keys in every master - fewer keys cause more conflicts")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weights of the operations ({', '.join(OPERATIONS)})")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between reports")
+    parser.add_argument("--json", help="path of a JSON file to write the report to")
+    arguments = parser.parse_args()
+
+    # Run the load, reporting every interval
+    result = run(arguments.url, arguments.processes, arguments.threads, arguments.duration, arguments.masters, arguments.keys, arguments.mix, arguments.interval, _print_interval)
+
+    # Print the summary of every operation
+    print(f"\n{'operation':<10}{'calls':>10}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, summary in result.operations.items():
+        print(f"{name:<10}{summary.calls:>10,}{summary.errors:>8,}{summary.p50 * 1000:>10.2f}{summary.p99 * 1000:>10.2f}")
+
+    # Print the totals
+    print(f"\n{result.throughput:,.0f} ops/s with {arguments.processes}x{arguments.threads} workers, memory grew by {result.memory_growth:+,} B, {result.leaked_keys:,} keys leaked")
+
+    # Write the report
+    if arguments.json:
+        with open(arguments.json, "w") as file:
+            json.dump(dataclasses.asdict(result), file, indent=2)
+
+    # Fail the run if keys leaked
+    if result.leaked_keys:
+        sys.exit(f"{result.leaked_keys:,} keys leaked")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,35 +5,69 @@ import contextlib
 import dataclasses
 
 import redis
+import redis.cluster
 
+# Import value codecs
+from rednest.codec import Codec, ReprCodec
 
-class Nested(abc.ABC):
+# Import the near cache
+from rednest.cache import NearCache
 
-    # Instance redis connection
-    _connection: redis.Redis = None  # type: ignore
+# Import write batching
+from rednest.batching import Batch, Finisher, Transaction, batch, transaction
+
+# Import operation instrumentation
+from rednest.instrumentation import instrument_class, instrument_creation, instrumented_connection, original_connection
+
+# Import lua scripts
+from rednest.scripts import DELETE_SCRIPT, MATERIALIZE_SCRIPT
+
+# Supported synchronous connections - nested keys share the hash slot of their master, so entire trees are co-located in clusters
+Connection = typing.Union[redis.Redis, redis.cluster.RedisCluster]
+
+
+class NestedBase(abc.ABC):
+
+    # Instance redis connection - synchronous or asynchronous
+    _client: typing.Any = None
 
     # Instance structure information
     _key: str = None  # type: ignore
     _master: str = None  # type: ignore
 
+    # Instance value codec
+    _codec: Codec = None  # type: ignore
+
+    # Default value codec and the codec used for nested key names, which must stay readable by the lua scripts
+    _CODEC: Codec = ReprCodec()
+    _NAME_CODEC: Codec = ReprCodec()
+
     # Type globals
     _ENCODING: str = "utf-8"
+    _CHUNK_SIZE: int = 1000
+
+    # Maximal number of elements deleted per call, 0 deletes entire trees at once
+    _DELETE_CHUNK_SIZE: int = 0
 
-    def __init__(self, connection: redis.Redis, key: str, master: typing.Optional[str] = None) -> None:
-        # Store redis connection
-        self._connection = connection
+    def __init__(self, connection: typing.Any, key: str, master: typing.Optional[str] = None, codec: typing.Optional[Codec] = None) -> None:
+        # Store redis connection - instrumented copies are never stored, so that handles stop measuring once instrumentation is released
+        self._client = original_connection(connection)
 
         # Store structure information
         self._key = key
         self._master = master or key
 
-    @abc.abstractmethod
-    def initialize(self, value: typing.Any) -> None:
-        raise NotImplementedError()
+        # Store the value codec
+        self._codec = codec or self._CODEC
 
-    @abc.abstractmethod
-    def deinitialize(self) -> None:
-        raise NotImplementedError()
+    @property
+    def _connection(self) -> typing.Any:
+        # Return the redis connection, which measures the commands of the handle while instrumentation is used
+        return instrumented_connection(self._client)
+
+    def _nested_types(self) -> "NestedTypeRegistry":
+        # Return the registry of the nested types of this flavour
+        return NESTED_TYPES
 
     def _fetch_by_identifier(self, identifier: typing.Union[str, bytes]) -> typing.Any:
         # Make sure the identifier is a string
@@ -43,22 +77,204 @@ class Nested(abc.ABC):
         # Split identifier to item type and encoded value
         redis_identifier, encoded_item_value = identifier.split(":", 1)
 
-        # Parse item type and encoded value to redis identifier and decoded value
-        decoded_item_value = self._decode(encoded_item_value)
-
         # Check if the item is nested
-        for nested_type in NESTED_TYPES:
-            # Check whether the item type matches the redis identifier
-            if redis_identifier != nested_type.redis_identifier:
-                continue
+        nested_type = self._nested_types().from_identifier(redis_identifier)
 
-            # Found a nested type match, create a nested instance
-            return nested_type.nested_class(key=decoded_item_value, connection=self._connection, master=self._master)
+        # Found a nested type match, create a nested instance
+        if nested_type is not None:
+            return self._create_nested(nested_type, self._NAME_CODEC.decode_key(encoded_item_value))
+
+        # Make sure the item is not of a nested type which is not registered
+        if redis_identifier:
+            raise TypeError(f"Unknown nested type {redis_identifier!r}")
 
         # Return the decoded value
-        return decoded_item_value
+        return self._decode(encoded_item_value)
+
+    def _create_nested(self, nested_type: "NestedType", key: str) -> typing.Any:
+        # Create a nested instance sharing the connection and the codec
+        return nested_type.nested_class(key=key, connection=self._connection, master=self._master, codec=self._codec)
+
+    def _plan_identifier(self, pipeline: typing.Any, value: typing.Any) -> str:
+        # Check whether value supports nesting
+        nested_type = self._nested_types().from_value(value)
+
+        # The value supports nesting
+        if nested_type is not None:
+            # Create a new nested name
+            nested_name = self._create_nested_name()
+
+            # Create a new nested class instance and plan its writes - the key is brand new, so it does not need clearing
+            nested_instance = self._create_nested(nested_type, nested_name)
+            nested_instance._plan_initialize(pipeline, value)
+
+            # Return the nested identifier
+            return f"{nested_type.redis_identifier}:{self._NAME_CODEC.encode(nested_name)}"
+
+        # Return the regular value
+        return f":{self._encode(value)}"
+
+    def _create_nested_name(self) -> str:
+        # Create a new random key name under the master, in the hash slot of the master
+        return f"{self._slot_prefix(self._master)}:{os.urandom(10).hex()}"
+
+    @staticmethod
+    def _slot_prefix(master: str) -> str:
+        # Find the hash tag of the master, like redis cluster does
+        opening = master.find("{")
+        closing = master.find("}", opening + 1)
+
+        # Masters which already have a hash tag keep it
+        if opening != -1 and closing > opening + 1:
+            return master
+
+        # Masters without a hash tag are hashed entirely, so wrapping them keeps the same slot
+        if "}" not in master:
+            return f"{{{master}}}"
+
+        # The master cannot be wrapped in a hash tag
+        return master
+
+    @abc.abstractmethod
+    def _plan_initialize(self, pipeline: typing.Any, value: typing.Any) -> None:
+        raise NotImplementedError()
+
+    def _encode(self, value: typing.Any) -> str:
+        # Encode the value using the codec
+        return self._codec.encode(value)
+
+    def _decode(self, value: typing.Union[str, bytes]) -> typing.Any:
+        # Make sure the value is a string
+        if not isinstance(value, str):
+            value = value.decode(self._ENCODING)
+
+        # Decode the value using the codec
+        return self._codec.decode(value)
+
+    def _decode_key(self, value: typing.Union[str, bytes]) -> typing.Any:
+        # Make sure the value is a string
+        if not isinstance(value, str):
+            value = value.decode(self._ENCODING)
+
+        # Decode the key using the codec
+        return self._codec.decode_key(value)
+
+
+class Nested(NestedBase):
+
+    # Instance redis connection
+    _client: Connection = None  # type: ignore
+
+    # Instance near cache
+    _cache: typing.Optional[NearCache] = None
+
+    # Instance write batch
+    _batch: typing.Optional[Batch] = None
+
+    # Whether the nested type can take part in batches and transactions
+    _BATCHABLE: bool = True
+
+    def __init_subclass__(cls, **kwargs: typing.Any) -> None:
+        # Initialize the subclass
+        super().__init_subclass__(**kwargs)
+
+        # Measure the operations of the nested type while instrumentation is used
+        instrument_class(cls)
+
+    def __init__(self, connection: Connection, key: str, master: typing.Optional[str] = None, codec: typing.Optional[Codec] = None, cache: typing.Optional[NearCache] = None) -> None:
+        # Initialize the structure information and the codec
+        super().__init__(connection, key, master, codec)
+
+        # Store the near cache
+        self._cache = cache
+
+    @abc.abstractmethod
+    def initialize(self, value: typing.Any) -> None:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def deinitialize(self) -> None:
+        raise NotImplementedError()
+
+    @instrument_creation
+    def _create_nested(self, nested_type: "NestedType", key: str) -> "Nested":
+        # Create a nested instance sharing the connection, the codec and the cache
+        nested_instance = nested_type.nested_class(key=key, connection=self._connection, master=self._master, codec=self._codec, cache=self._cache)
+
+        # Nested instances join the write batch
+        if self._batching() is not None:
+            self._batch.join(nested_instance)  # type: ignore[union-attr]
+
+        # Return the nested instance
+        return nested_instance
+
+    def batch(self) -> typing.ContextManager[Batch]:
+        # Buffer the writes of the instance and flush them at once
+        return batch(self)
+
+    def transaction(self, function: typing.Callable[[typing.Any], typing.Any], retries: int = 10) -> typing.Any:
+        # Run the function with buffered writes, committing them only if the watched keys did not change
+        return transaction(self, function, retries)
+
+    def _batching(self) -> typing.Optional[Batch]:
+        # Return the write batch if it is still buffering
+        if self._batch is not None and self._batch.active:
+            return self._batch
+
+        # Writes are not batched
+        return None
+
+    def _flush_batch(self) -> None:
+        # Flush the buffered writes before writes which cannot be buffered
+        if self._batching() is not None:
+            self._batch.flush()  # type: ignore[union-attr]
+
+    def _plan_batch(self, pipeline: redis.client.Pipeline, writes: typing.Any) -> Finisher:
+        # By default, nested types do not buffer writes, so there is nothing they could flush
+        raise TypeError(f"{type(self).__name__} does not support batching")
+
+    def _cached(self, field: typing.Any, loader: typing.Callable[[], typing.Any]) -> typing.Any:
+        # Load the value directly when there is no cache - transactions must read the watched values
+        if self._cache is None or isinstance(self._batching(), Transaction):
+            return loader()
+
+        # Load the value through the cache
+        return self._cache.get(self._key, field, loader)
+
+    def _invalidate(self) -> None:
+        # Invalidate the cached values of the key - the tracking invalidation may arrive later
+        if self._cache is not None:
+            self._cache.invalidate(self._key)
 
     def _delete_by_identifier(self, identifier: typing.Union[str, bytes]) -> None:
+        # Delete the nested tree of the identifier
+        self._delete_tree(identifiers=[identifier])
+
+    def _delete_tree(self, keys: typing.Iterable[str] = (), identifiers: typing.Iterable[typing.Union[str, bytes]] = (), chunk_size: typing.Optional[int] = None) -> None:
+        # Use the default chunk size if needed
+        if chunk_size is None:
+            chunk_size = self._DELETE_CHUNK_SIZE
+
+        # Filter out scalar identifiers, which have nothing to delete
+        keys, identifiers = list(keys), [identifier for identifier in identifiers if identifier[:1] not in (":", b":")]
+
+        # Loop until there is nothing left to delete
+        while keys or identifiers:
+            # Delete the next chunk of the trees
+            response = self._execute_script(DELETE_SCRIPT, keys=[self._key], args=[chunk_size, len(keys), *keys, *identifiers])
+
+            # Make sure the response is a list
+            if not isinstance(response, list):
+                raise TypeError(response)
+
+            # Split the response to the remaining work and the unknown identifiers
+            keys, identifiers, unknown_identifiers = response
+
+            # Deinitialize nested types the script does not know about
+            for identifier in unknown_identifiers:
+                self._deinitialize_by_identifier(identifier)
+
+    def _deinitialize_by_identifier(self, identifier: typing.Union[str, bytes]) -> None:
         # Make sure the identifier is a string
         if not isinstance(identifier, str):
             identifier = identifier.decode(self._ENCODING)
@@ -75,47 +291,108 @@ class Nested(abc.ABC):
 
     @contextlib.contextmanager
     def _create_identifier_from_value(self, value: typing.Any) -> typing.Iterator[str]:
-        # Check whether value supports nesting
-        for nested_type in NESTED_TYPES:
-            # Check if the value is an instance of the current type
-            if not isinstance(value, (nested_type.nested_class, nested_type.convertable_type)):
-                continue
+        # Create a pipeline to hold all of the nested writes
+        pipeline = self._connection.pipeline()
 
-            # Create a new nested name
-            nested_name = f"{self._master}:{os.urandom(10).hex()}"
+        # Plan the identifier and execute all of the nested writes at once
+        identifier = self._plan_identifier(pipeline, value)
+        pipeline.execute()  # type: ignore[no-untyped-call]
 
-            # Create a new nested class instance
-            nested_instance = nested_type.nested_class(key=nested_name, connection=self._connection, master=self._master)
-            nested_instance.initialize(value)
+        try:
+            # Yield the identifier
+            yield identifier
+        except:
+            # If there was a failure to insert the identifier, delete the nested item
+            self._delete_by_identifier(identifier)
 
-            try:
-                # Yield the nested identifier
-                yield f"{nested_type.redis_identifier}:{self._encode(nested_name)}"
-            except:
-                # If there was a failure to insert the identifier, delete the nested item
-                nested_instance.deinitialize()
+            # Re-raise the exception
+            raise
 
-                # Re-raise the exception
-                raise
+    @contextlib.contextmanager
+    def _create_identifiers_from_values(self, values: typing.Iterable[typing.Any]) -> typing.Iterator[typing.List[str]]:
+        # Create a pipeline to hold all of the nested writes
+        pipeline = self._connection.pipeline()
+
+        # Plan the identifiers and execute all of the nested writes at once
+        identifiers = [self._plan_identifier(pipeline, value) for value in values]
+        pipeline.execute()  # type: ignore[no-untyped-call]
+
+        try:
+            # Yield the identifiers
+            yield identifiers
+        except:
+            # If there was a failure to insert the identifiers, delete the nested items
+            self._delete_tree(identifiers=identifiers)
+
+            # Re-raise the exception
+            raise
+
+    def _plan_initialize(self, pipeline: redis.client.Pipeline, value: typing.Any) -> None:
+        # By default, initialize the nested value directly
+        self.initialize(value)
+
+    def _execute_script(self, script: str, keys: typing.Sequence[str] = (), args: typing.Sequence[typing.Any] = (), client: typing.Optional[redis.client.Pipeline] = None) -> typing.Any:
+        # Pipelines send the script as is - cached scripts cost a SCRIPT EXISTS round trip before every pipeline, and cluster pipelines cannot run them
+        if client is not None:
+            return client.execute_command("EVAL", script, len(keys), *keys, *args)
+
+        # Register the script on the connection and execute it
+        return self._connection.register_script(script)(keys=keys, args=args)
+
+    def _materialize(self) -> typing.List[typing.Any]:
+        # Fetch the entire nested tree in a single call
+        contents = self._execute_script(MATERIALIZE_SCRIPT, keys=[self._key])
+
+        # Make sure the contents are a list
+        if not isinstance(contents, list):
+            raise TypeError(contents)
+
+        # Inside transactions, the descendants were read before they were watched
+        if isinstance(writes := self._batching(), Transaction):
+            # Watch all of the descendants, then make sure they did not change before they were watched
+            writes.watch(*self._materialized_keys(contents))
+            if self._execute_script(MATERIALIZE_SCRIPT, keys=[self._key]) != contents:
+                raise redis.WatchError("Materialized subtree changed before it was watched")
+
+        # Return the materialized contents
+        return contents
+
+    def _materialized_keys(self, contents: typing.List[typing.Any]) -> typing.Iterator[str]:
+        # Yield the keys of all of the materialized descendants
+        for item in contents:
+            # Only nested values are materialized as identifier and contents pairs
+            if not isinstance(item, list):
+                continue
 
-            # Nothing more to do
-            return
+            # Yield the key of the nested value, then the keys of its descendants
+            identifier, nested_contents = item
+            if not isinstance(identifier, str):
+                identifier = identifier.decode(self._ENCODING)
+            yield self._NAME_CODEC.decode_key(identifier.split(":", 1)[1])
+            yield from self._materialized_keys(nested_contents)
 
-        # Yield the regular value
-        yield f":{self._encode(value)}"
+    def _copy_from_contents(self, contents: typing.List[typing.Any]) -> typing.Any:
+        # By default, ignore the materialized contents and copy the nested value directly
+        return self.copy()  # type: ignore[attr-defined]
 
-    def _encode(self, value: typing.Any) -> str:
-        # Return the representation of the object
-        return repr(value)
+    def _copy_from_materialized(self, value: typing.Any) -> typing.Any:
+        # Check whether the value was materialized as an identifier and contents pair
+        if isinstance(value, list):
+            # Split the pair to the identifier and the contents
+            identifier, contents = value
 
-    def _decode(self, value: typing.Union[str, bytes]) -> typing.Any:
-        # Make sure the value is a string
-        if not isinstance(value, str):
-            value = value.decode(self._ENCODING)
+            # Create the nested instance and copy it from the contents
+            return self._fetch_by_identifier(identifier)._copy_from_contents(contents)
+
+        # Fetch the value from the identifier
+        value = self._fetch_by_identifier(value)
 
-        # Evaluate the value
-        # pylint: disable-next=eval-used
-        return eval(value)
+        # Try copying the value - nested types which were not materialized
+        with contextlib.suppress(AttributeError):
+            value = value.copy()
+
+        # Return the copied value
+        return value
 
 
 @dataclasses.dataclass
@@ -125,11 +402,68 @@ class NestedType:
     redis_identifier: str
 
     # Nested class
-    nested_class: typing.Type[Nested]
+    nested_class: typing.Type[NestedBase]
 
     # Convertable type
     convertable_type: typing.Type[typing.Collection[typing.Any]]
 
 
-# List of all supported nested types
-NESTED_TYPES: typing.List[NestedType] = []
+class NestedTypeRegistry(typing.Iterable[NestedType]):
+
+    def __init__(self) -> None:
+        # Registered nested types, in registration order
+        self._nested_types: typing.List[NestedType] = []
+
+        # Nested types indexed by their redis identifiers
+        self._identifiers: typing.Dict[str, NestedType] = {}
+
+        # Dispatch cache of concrete value classes to their nested types
+        self._dispatch: typing.Dict[type, typing.Optional[NestedType]] = {}
+
+    def register(self, nested_type: NestedType) -> None:
+        # Add the nested type to the registry - the first registration of an identifier wins
+        self._nested_types.append(nested_type)
+        self._identifiers.setdefault(nested_type.redis_identifier, nested_type)
+
+        # Invalidate the dispatch cache
+        self._dispatch.clear()
+
+    # Keep supporting registration like the former list of nested types
+    append = register
+
+    def from_identifier(self, redis_identifier: str) -> typing.Optional[NestedType]:
+        # Look up the nested type by the identifier
+        return self._identifiers.get(redis_identifier)
+
+    def from_value(self, value: typing.Any) -> typing.Optional[NestedType]:
+        # Fetch the concrete class of the value
+        value_class = type(value)
+
+        try:
+            # Look up the nested type in the dispatch cache
+            return self._dispatch[value_class]
+        except KeyError:
+            # Find the nested type of the closest base class, so that subclasses like collections.Counter are not converted like their bases
+            nested_type = next((nested_type for base in value_class.__mro__ for nested_type in self._nested_types if base in (nested_type.nested_class, nested_type.convertable_type)), None)
+
+            # Fall back to the first nested type the value is an instance of, for virtual subclasses
+            if nested_type is None:
+                nested_type = next((nested_type for nested_type in self._nested_types if issubclass(value_class, (nested_type.nested_class, nested_type.convertable_type))), None)
+
+            # Cache the nested type, even if there was no match
+            self._dispatch[value_class] = nested_type
+
+            # Return the nested type
+            return nested_type
+
+    def __iter__(self) -> typing.Iterator[NestedType]:
+        # Iterate over the nested types
+        return iter(self._nested_types)
+
+    def __len__(self) -> int:
+        # Return the number of nested types
+        return len(self._nested_types)
+
+
+# Registry of all supported nested types
+NESTED_TYPES: NestedTypeRegistry = NestedTypeRegistry()
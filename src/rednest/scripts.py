@@ -0,0 +1,530 @@
+# Lua helper - parses an identifier and returns the nested key name, nil for scalar identifiers or false for unparsable identifiers
+NESTED_KEY_FUNCTION = """
+-- Escape sequences which python representations use for single characters
+local escapes = {["\\\\"] = "\\\\", ["'"] = "'", ['"'] = '"', n = "\\n", r = "\\r", t = "\\t"}
+
+-- Number of hex digits of the escape sequences of code points
+local digits = {x = 2, u = 4, U = 8}
+
+local function utf8_character(code)
+    -- Encode the code point the way the key name is stored
+    if code < 0x80 then
+        return string.char(code)
+    elseif code < 0x800 then
+        return string.char(0xC0 + math.floor(code / 0x40), 0x80 + code % 0x40)
+    elseif code < 0x10000 then
+        return string.char(0xE0 + math.floor(code / 0x1000), 0x80 + math.floor(code / 0x40) % 0x40, 0x80 + code % 0x40)
+    end
+
+    return string.char(0xF0 + math.floor(code / 0x40000), 0x80 + math.floor(code / 0x1000) % 0x40, 0x80 + math.floor(code / 0x40) % 0x40, 0x80 + code % 0x40)
+end
+
+local function unescape(encoded)
+    -- Collect the unescaped parts of the key name
+    local parts, position = {}, 1
+
+    while true do
+        -- Find the next escape sequence
+        local backslash = string.find(encoded, "\\\\", position, true)
+
+        if backslash == nil then
+            table.insert(parts, string.sub(encoded, position))
+            return table.concat(parts)
+        end
+
+        table.insert(parts, string.sub(encoded, position, backslash - 1))
+
+        -- Decode the escape sequence
+        local kind = string.sub(encoded, backslash + 1, backslash + 1)
+
+        if escapes[kind] then
+            table.insert(parts, escapes[kind])
+            position = backslash + 2
+        elseif digits[kind] then
+            local hex = string.sub(encoded, backslash + 2, backslash + 1 + digits[kind])
+
+            -- Make sure the code point is complete
+            if string.len(hex) ~= digits[kind] or string.find(hex, "^%x+$") == nil then
+                return false
+            end
+
+            table.insert(parts, utf8_character(tonumber(hex, 16)))
+            position = backslash + 2 + digits[kind]
+        else
+            return false
+        end
+    end
+end
+
+local function nested_key(identifier)
+    -- Find the separator between the nested type and the encoded key name
+    local separator = string.find(identifier, ":", 1, true)
+
+    -- Scalar identifiers have an empty nested type
+    if separator == nil or separator == 1 then
+        return nil
+    end
+
+    -- Fetch the encoded key name, which is the representation of a string
+    local encoded = string.sub(identifier, separator + 1)
+    local quote = string.sub(encoded, 1, 1)
+
+    -- Make sure the encoded key name is quoted
+    if string.len(encoded) < 2 or (quote ~= "'" and quote ~= '"') or string.sub(encoded, -1) ~= quote then
+        return false
+    end
+
+    -- Strip the quotes and decode the escape sequences of the representation
+    return unescape(string.sub(encoded, 2, -2))
+end
+"""
+
+# Lua script - materializes an entire nested tree in a single call.
+# Nested hashes and lists are replaced by {identifier, contents} pairs, other nested types are left as identifiers.
+MATERIALIZE_SCRIPT = NESTED_KEY_FUNCTION + """
+local function materialize(key)
+    -- Fetch the contents by the type of the key
+    local kind = redis.call("TYPE", key)["ok"]
+    local contents, first, step
+
+    if kind == "hash" then
+        contents, first, step = redis.call("HGETALL", key), 2, 2
+    elseif kind == "list" then
+        contents, first, step = redis.call("LRANGE", key, 0, -1), 1, 1
+    elseif kind == "none" then
+        return {}
+    else
+        return nil
+    end
+
+    -- Replace all nested identifiers with their contents
+    for index = first, #contents, step do
+        local name = nested_key(contents[index])
+
+        if name then
+            local nested = materialize(name)
+
+            if nested then
+                contents[index] = {contents[index], nested}
+            end
+        end
+    end
+
+    return contents
+end
+
+return materialize(KEYS[1]) or {}
+"""
+
+# Lua script - recursively deletes nested trees, unlinking every descendant key.
+# When a budget is given, at most that many elements are deleted and the remaining work is returned.
+DELETE_SCRIPT = NESTED_KEY_FUNCTION + """
+local budget = tonumber(ARGV[1])
+local roots = tonumber(ARGV[2])
+
+local stack, unlinked, unknown = {}, {}, {}
+local remaining_keys, remaining_identifiers = {}, {}
+local used = 0
+
+local function discover(identifier)
+    local name = nested_key(identifier)
+
+    if name then
+        table.insert(stack, {name, identifier})
+    elseif name == false then
+        table.insert(unknown, identifier)
+    end
+end
+
+-- Push the root keys and the identifiers to the stack
+for index = 3, 2 + roots do
+    table.insert(stack, {ARGV[index], false})
+end
+
+for index = 3 + roots, #ARGV do
+    discover(ARGV[index])
+end
+
+while #stack > 0 and (budget == 0 or used < budget) do
+    local entry = table.remove(stack)
+    local key, identifier = entry[1], entry[2]
+    local kind = redis.call("TYPE", key)["ok"]
+
+    if kind == "hash" or kind == "list" then
+        local length = redis.call(kind == "hash" and "HLEN" or "LLEN", key)
+        local limit = budget == 0 and length or budget - used
+        local children = {}
+
+        if length <= limit then
+            -- The entire key fits in the budget
+            if kind == "hash" then
+                children = redis.call("HVALS", key)
+            else
+                children = redis.call("LRANGE", key, 0, -1)
+            end
+
+            table.insert(unlinked, key)
+        elseif kind == "hash" then
+            -- Scan and delete some of the fields
+            local cursor, fields = "0", {}
+
+            repeat
+                local scan = redis.call("HSCAN", key, cursor, "COUNT", limit)
+                cursor = scan[1]
+
+                for index = 1, #scan[2], 2 do
+                    table.insert(fields, scan[2][index])
+                    table.insert(children, scan[2][index + 1])
+                end
+            until cursor == "0" or #fields >= limit
+
+            for index = 1, #fields, 1000 do
+                redis.call("HDEL", key, unpack(fields, index, math.min(index + 999, #fields)))
+            end
+
+            table.insert(remaining_keys, key)
+        else
+            -- Trim some of the items
+            children = redis.call("LRANGE", key, 0, limit - 1)
+            redis.call("LTRIM", key, limit, -1)
+
+            table.insert(remaining_keys, key)
+        end
+
+        used = used + math.max(#children, 1)
+
+        for index = 1, #children do
+            discover(children[index])
+        end
+    elseif kind ~= "none" then
+        -- Other nested types are deleted by the client
+        if identifier then
+            table.insert(unknown, identifier)
+        else
+            table.insert(unlinked, key)
+        end
+    end
+end
+
+-- Unlink all of the consumed keys
+for index = 1, #unlinked, 1000 do
+    redis.call("UNLINK", unpack(unlinked, index, math.min(index + 999, #unlinked)))
+end
+
+-- Return the remaining work
+for index = 1, #stack do
+    if stack[index][2] then
+        table.insert(remaining_identifiers, stack[index][2])
+    else
+        table.insert(remaining_keys, stack[index][1])
+    end
+end
+
+return {remaining_keys, remaining_identifiers, unknown}
+"""
+
+# Lua helpers - list manipulation functions shared by the list scripts
+LIST_FUNCTIONS = """
+local function push(key, items, left)
+    -- Push items to the list in chunks, preserving their order
+    if left then
+        local chunk = {}
+
+        for index = #items, 1, -1 do
+            table.insert(chunk, items[index])
+
+            if #chunk == 1000 or index == 1 then
+                redis.call("LPUSH", key, unpack(chunk))
+                chunk = {}
+            end
+        end
+    else
+        for index = 1, #items, 1000 do
+            redis.call("RPUSH", key, unpack(items, index, math.min(index + 999, #items)))
+        end
+    end
+end
+
+local function splice(key, length, first, last, items)
+    -- Fetch the removed items
+    local removed = {}
+
+    if last > first then
+        removed = redis.call("LRANGE", key, first, last - 1)
+    end
+
+    -- Same size replacements are done in place
+    if #items == last - first then
+        for index = 1, #items do
+            redis.call("LSET", key, first + index - 1, items[index])
+        end
+
+        return removed
+    end
+
+    -- Rebuild the shorter side of the list
+    if first <= length - last then
+        local head = {}
+
+        if first > 0 then
+            head = redis.call("LRANGE", key, 0, first - 1)
+        end
+
+        if last >= length then
+            redis.call("DEL", key)
+        else
+            redis.call("LTRIM", key, last, -1)
+        end
+
+        push(key, items, true)
+        push(key, head, true)
+    else
+        local tail = {}
+
+        if last < length then
+            tail = redis.call("LRANGE", key, last, -1)
+        end
+
+        if first == 0 then
+            redis.call("DEL", key)
+        else
+            redis.call("LTRIM", key, 0, first - 1)
+        end
+
+        push(key, items, false)
+        push(key, tail, false)
+    end
+
+    return removed
+end
+"""
+
+# Lua script - atomically assigns or deletes a slice of a list, returning the removed identifiers
+SPLICE_SCRIPT = LIST_FUNCTIONS + """
+local key = KEYS[1]
+local length = redis.call("LLEN", key)
+local start, stop, step = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]) or 1
+local assign = ARGV[4] == "assign"
+local items = {}
+
+for index = 5, #ARGV do
+    table.insert(items, ARGV[index])
+end
+
+-- Adjust the slice indices like python does
+if step > 0 then
+    start = start == nil and 0 or (start < 0 and math.max(start + length, 0) or math.min(start, length))
+    stop = stop == nil and length or (stop < 0 and math.max(stop + length, 0) or math.min(stop, length))
+else
+    start = start == nil and length - 1 or (start < 0 and math.max(start + length, -1) or math.min(start, length - 1))
+    stop = stop == nil and -1 or (stop < 0 and math.max(stop + length, -1) or math.min(stop, length - 1))
+end
+
+-- Simple slices are spliced
+if step == 1 then
+    if not assign then
+        items = {}
+    end
+
+    return splice(key, length, start, math.max(start, stop), items)
+end
+
+-- Collect the positions of the extended slice
+local positions = {}
+
+for position = start, stop - (step > 0 and 1 or -1), step do
+    table.insert(positions, position)
+end
+
+-- Extended slices are assigned in place
+if assign then
+    if #items ~= #positions then
+        return redis.error_reply("SIZE " .. #positions)
+    end
+
+    local removed = {}
+
+    for index = 1, #positions do
+        table.insert(removed, redis.call("LINDEX", key, positions[index]))
+        redis.call("LSET", key, positions[index], items[index])
+    end
+
+    return removed
+end
+
+-- Extended slices are deleted by splicing their span
+if #positions == 0 then
+    return {}
+end
+
+local first, last = math.min(positions[1], positions[#positions]), math.max(positions[1], positions[#positions])
+local span = redis.call("LRANGE", key, first, last)
+local deleted, kept, removed = {}, {}, {}
+
+for index = 1, #positions do
+    deleted[positions[index]] = true
+end
+
+for index = 1, #span do
+    if deleted[first + index - 1] then
+        table.insert(removed, span[index])
+    else
+        table.insert(kept, span[index])
+    end
+end
+
+splice(key, length, first, last + 1, kept)
+
+return removed
+"""
+
+# Lua script - atomically inserts, deletes or sets a single item of a list, returning the removed identifier
+INDEX_SCRIPT = LIST_FUNCTIONS + """
+local key = KEYS[1]
+local length = redis.call("LLEN", key)
+local operation, index = ARGV[1], tonumber(ARGV[2])
+
+-- Adjust negative indexes like python does
+if index < 0 then
+    index = index + length
+end
+
+-- Inserting clamps the index to the list bounds
+if operation == "insert" then
+    splice(key, length, math.min(math.max(index, 0), length), math.min(math.max(index, 0), length), {ARGV[3]})
+    return nil
+end
+
+-- Other operations require an existing index
+if index < 0 or index >= length then
+    return redis.error_reply("INDEX")
+end
+
+if operation == "set" then
+    local removed = redis.call("LINDEX", key, index)
+    redis.call("LSET", key, index, ARGV[3])
+    return removed
+end
+
+return splice(key, length, index, index + 1, {})[1]
+"""
+
+# Lua script - deletes hash fields only if they still hold the expected identifiers, returning which fields were deleted
+DELETE_FIELDS_IF_SCRIPT = """
+local deleted = {}
+
+for index = 1, #ARGV, 2 do
+    if redis.call("HGET", KEYS[1], ARGV[index]) == ARGV[index + 1] then
+        redis.call("HDEL", KEYS[1], ARGV[index])
+        table.insert(deleted, 1)
+    else
+        table.insert(deleted, 0)
+    end
+end
+
+return deleted
+"""
+
+# Lua script - atomically replaces hash fields, returning the previous identifiers. Empty identifiers delete the fields.
+REPLACE_FIELDS_SCRIPT = """
+local previous = {}
+
+for index = 1, #ARGV, 2 do
+    table.insert(previous, redis.call("HGET", KEYS[1], ARGV[index]))
+
+    if ARGV[index + 1] == "" then
+        redis.call("HDEL", KEYS[1], ARGV[index])
+    else
+        redis.call("HSET", KEYS[1], ARGV[index], ARGV[index + 1])
+    end
+end
+
+return previous
+"""
+
+# Lua script - atomically increments a numeric hash field, keeping the encoding of the codec.
+# Returns the new encoded value, or false when the value cannot be incremented server-side.
+INCREMENT_SCRIPT = """
+local field, kind, amount, integer_tag, float_tag = ARGV[1], ARGV[2], tonumber(ARGV[3]), ARGV[4], ARGV[5]
+local limit = 9007199254740992
+
+local function parse(payload, tag, patterns)
+    -- Make sure the payload has the tag
+    if string.sub(payload, 1, #tag) ~= tag then
+        return nil
+    end
+
+    -- Make sure the payload matches one of the patterns
+    local body = string.sub(payload, #tag + 1)
+
+    for index = 1, #patterns do
+        if string.find(body, patterns[index]) then
+            return tonumber(body)
+        end
+    end
+
+    return nil
+end
+
+-- Fetch the stored value, which defaults to zero
+local value, value_kind = 0, kind
+local identifier = redis.call("HGET", KEYS[1], field)
+
+if identifier then
+    -- Nested values cannot be incremented
+    if string.sub(identifier, 1, 1) ~= ":" then
+        return false
+    end
+
+    -- Parse the stored number
+    local payload = string.sub(identifier, 2)
+    value, value_kind = parse(payload, integer_tag, {"^-?%d+$"}), "int"
+
+    if value == nil then
+        value, value_kind = parse(payload, float_tag, {"^-?%d+%.%d+$", "^-?%d+%.?%d*[eE][-+]?%d+$"}), "float"
+    end
+
+    -- Other values are incremented by the client
+    if value == nil then
+        return false
+    end
+end
+
+-- Increment the value - integers stay integers only when both numbers are integers
+local result = value + amount
+local text
+
+if value_kind == "int" and kind == "int" then
+    -- Integers must be exactly representable
+    if math.abs(value) >= limit or math.abs(amount) >= limit or math.abs(result) >= limit then
+        return false
+    end
+
+    text = integer_tag .. string.format("%.0f", result)
+else
+    -- Floats must be finite
+    if result ~= result or math.abs(result) == math.huge then
+        return false
+    end
+
+    -- Format the float using the shortest representation that round-trips
+    for precision = 15, 17 do
+        text = string.format("%." .. precision .. "g", result)
+
+        if tonumber(text) == result then
+            break
+        end
+    end
+
+    -- Make sure the float does not look like an integer
+    if not string.find(text, "[%.eE]") then
+        text = text .. ".0"
+    end
+
+    text = float_tag .. text
+end
+
+redis.call("HSET", KEYS[1], field, ":" .. text)
+
+return text
+"""
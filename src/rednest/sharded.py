@@ -0,0 +1,452 @@
+import zlib
+import typing
+import concurrent.futures
+
+# Import abstract types
+from collections.abc import Mapping
+
+# Import nested objects
+from rednest.codec import Codec
+from rednest.nested import Connection, Nested
+from rednest.dictionary import Dictionary, DictionaryItemsView, DictionaryValuesView
+
+# Import lua scripts
+from rednest.scripts import DELETE_FIELDS_IF_SCRIPT, REPLACE_FIELDS_SCRIPT
+
+# Fields of the layout stored in the master hash - the current number of buckets and the number of buckets being migrated from
+BUCKETS_FIELD = "buckets"
+PREVIOUS_FIELD = "previous"
+
+
+class ShardedDictionary(typing.MutableMapping[typing.Any, typing.Any], Nested):
+
+    # Copy type - the type used when calling copy
+    _COPY_TYPE: typing.Type[typing.MutableMapping[typing.Any, typing.Any]] = dict
+
+    # Instance layout - the number of buckets and the number of buckets being migrated from, 0 when not resharding
+    _layout: typing.Optional[typing.Tuple[int, int]] = None
+
+    # Whether the layout is stored in the master hash - it is stored by the first write
+    _stored: bool = False
+
+    # Number of buckets used until a layout is stored
+    _initial: typing.Optional[int] = None
+
+    # Default number of buckets
+    _BUCKETS: int = 16
+
+    # Writes go through the buckets and are validated against the layout, so they cannot be buffered
+    _BATCHABLE: bool = False
+
+    def __init__(self, connection: Connection, key: str, buckets: typing.Optional[int] = None, codec: typing.Optional[Codec] = None) -> None:
+        # Initialize the structure information and the codec
+        super().__init__(connection, key, codec=codec)
+
+        # Store the initial bucket count - the layout is only written by the first write, so that reads do not create keys
+        self._initial = buckets or self._BUCKETS
+
+    def refresh(self) -> None:
+        # Load the layout from the master hash
+        self._layout = self._parse_layout(self._connection.hmget(self._key, [BUCKETS_FIELD, PREVIOUS_FIELD]))
+
+    def _current_layout(self) -> typing.Tuple[int, int]:
+        # Load the layout on first use, so that creating a handle does not cost a round trip
+        if self._layout is None:
+            self.refresh()
+
+        # Return the loaded layout
+        return self._layout  # type: ignore[return-value]
+
+    def _parse_layout(self, response: typing.Any) -> typing.Tuple[int, int]:
+        # Make sure the response is a list
+        if not isinstance(response, list):
+            raise TypeError(response)
+
+        # Check whether the layout was stored already
+        buckets, previous = response
+        self._stored = buckets is not None
+
+        # Parse the bucket counts - the initial count is used until a layout is stored, and the previous count is missing when not resharding
+        return int(buckets or self._initial), int(previous or 0)
+
+    def _bucket(self, buckets: int, index: int) -> Dictionary:
+        # Each bucket is a dictionary of its own, so nested values are stored in the slot of their bucket
+        return Dictionary(connection=self._connection, key=f"{self._key}:{buckets}:{index}", codec=self._codec)
+
+    def _bucket_of(self, buckets: int, encoded_key: str) -> Dictionary:
+        # Hash the encoded key into one of the buckets - the hash must be stable across processes
+        return self._bucket(buckets, zlib.crc32(encoded_key.encode(self._ENCODING)) % buckets)
+
+    def _buckets(self) -> typing.List[Dictionary]:
+        # Return all of the buckets of the layout, including buckets being migrated from
+        buckets, previous = self._current_layout()
+        return [self._bucket(count, index) for count in (previous, buckets) if count for index in range(count)]
+
+    def _execute(self, pipeline: typing.Any) -> typing.Tuple[typing.List[typing.Any], bool]:
+        # Validate the layout after all of the commands - if the layout changed, the commands may have used stale buckets
+        pipeline.hmget(self._key, [BUCKETS_FIELD, PREVIOUS_FIELD])
+        results = pipeline.execute()
+
+        # Check whether the layout is still valid
+        layout = self._parse_layout(results[-1])
+        if layout == self._layout:
+            return results, True
+
+        # Update the layout, so that the operation is retried using it
+        self._layout = layout
+        return results, False
+
+    def _identifier_from_key(self, key: typing.Any) -> typing.Tuple[Dictionary, typing.Optional[typing.Union[str, bytes]]]:
+        # Encode the key
+        encoded_key = self._encode(key)
+
+        # Loop until the layout is stable
+        while True:
+            # Fetch the identifier from the previous bucket first, then from the current bucket, so that migrated keys are never missed
+            buckets = [self._bucket_of(count, encoded_key) for count in self._current_layout()[::-1] if count]
+
+            # Fetch the identifiers in a single round trip
+            pipeline = self._connection.pipeline(transaction=False)
+            for bucket in buckets:
+                pipeline.hget(bucket._key, encoded_key)
+
+            # Execute and validate the layout
+            results, valid = self._execute(pipeline)
+            if not valid:
+                continue
+
+            # Prefer the identifier from the current bucket
+            for bucket, identifier in reversed(list(zip(buckets, results))):
+                if identifier is not None:
+                    return bucket, identifier
+
+            # The key does not exist
+            return buckets[-1], None
+
+    def initialize(self, value: typing.Dict[typing.Any, typing.Any]) -> None:
+        # De-initialize before initializing
+        self.deinitialize()
+
+        # Update the dictionary
+        self.update(value)
+
+    def deinitialize(self) -> None:
+        # Clear the dictionary
+        self.clear()
+
+    def __repr__(self) -> str:
+        # Represent a copy of the dictionary
+        return repr(self.copy())
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        # Fetch the identifier
+        bucket, identifier = self._identifier_from_key(key)
+
+        # If the identifier is missing, item does not exist
+        if identifier is None:
+            raise KeyError(key)
+
+        # Fetch the value using the bucket, so that nested values are created in the slot of the bucket
+        return bucket._fetch_by_identifier(identifier)
+
+    def __setitem__(self, key: typing.Any, value: typing.Any) -> None:
+        # Use the update method to update the item
+        self.update({key: value})
+
+    def __delitem__(self, key: typing.Any) -> None:
+        # Delete the key from all of the layouts, and make sure it existed
+        if not self._remove([self._encode(key)]):
+            raise KeyError(key)
+
+    def __contains__(self, key: typing.Any) -> bool:
+        # Make sure key exists in one of the buckets
+        return self._identifier_from_key(key)[1] is not None
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        # Stream the keys bucket by bucket - keys being migrated might be returned more than once
+        for bucket in self._buckets():
+            yield from bucket.iterkeys()
+
+    def __len__(self) -> int:
+        # Loop until the layout is stable
+        while True:
+            # Fetch the keys of the previous buckets when resharding, since they might have been copied to the current buckets already
+            buckets, previous = self._current_layout()
+            pending: typing.List[str] = []
+            if previous:
+                # Fetch the keys of all of the previous buckets in a single round trip
+                pipeline = self._connection.pipeline(transaction=False)
+                for index in range(previous):
+                    pipeline.hkeys(self._bucket(previous, index)._key)
+
+                # Execute and validate the layout
+                results, valid = self._execute(pipeline)
+                if not valid:
+                    continue
+
+                # Collect the encoded keys
+                pending = [self._text(encoded_key) for encoded_keys in results[:previous] for encoded_key in encoded_keys]
+
+            # Fetch the lengths of the current buckets, and check which of the pending keys were copied, in a single round trip
+            pipeline = self._connection.pipeline(transaction=False)
+            for index in range(buckets):
+                pipeline.hlen(self._bucket(buckets, index)._key)
+            for encoded_key in pending:
+                pipeline.hexists(self._bucket_of(buckets, encoded_key)._key, encoded_key)
+
+            # Execute and validate the layout
+            results, valid = self._execute(pipeline)
+            if not valid:
+                continue
+
+            # Sum the lengths, counting only the pending keys which were not copied yet, so that migrating keys are counted once
+            return sum(results[:buckets]) + sum(1 for exists in results[buckets:buckets + len(pending)] if not exists)
+
+    def __eq__(self, other: typing.Any) -> bool:
+        # Compare a copy of the dictionary
+        return self.copy() == other
+
+    def items(self) -> DictionaryItemsView:  # type: ignore[override]
+        # Create a batched items view
+        return DictionaryItemsView(self)  # type: ignore[arg-type]
+
+    def values(self) -> DictionaryValuesView:  # type: ignore[override]
+        # Create a batched values view
+        return DictionaryValuesView(self)  # type: ignore[arg-type]
+
+    def _iter_items(self, length: typing.Optional[int] = None) -> typing.Iterator[typing.Tuple[typing.Any, typing.Any]]:
+        # Fetch the items bucket by bucket
+        for bucket in self._buckets():
+            yield from bucket._iter_items()
+
+    def update(self, other: typing.Any = (), /, **kwargs: typing.Any) -> None:
+        # Add values from "other" to "kwargs", since kwargs is a dictionary
+        if other:
+            kwargs.update(other)
+
+        # If there is nothing to update, return
+        if not kwargs:
+            return
+
+        # Encode the keys, copying nested values in advance since writes may be retried
+        values = {self._encode(key): value.copy() if isinstance(value, Nested) else value for key, value in kwargs.items()}
+
+        # Bucket counts which were written to using a stale layout
+        stale: typing.Set[int] = set()
+
+        # Loop until the layout is stable
+        while True:
+            # Create a pipeline to hold all of the writes
+            pipeline = self._connection.pipeline(transaction=False)
+
+            # Store the layout before the first write, unless another handle stored one meanwhile - the validation retries if it did
+            buckets, previous = self._current_layout()
+            if not self._stored:
+                pipeline.hsetnx(self._key, BUCKETS_FIELD, buckets)
+
+            # Write the values to the current buckets, fetching the original identifiers for future deletion
+            originals = []
+            for bucket, fields in self._group(buckets, values):
+                # Plan the new identifiers
+                mapping = {encoded_key: bucket._plan_identifier(pipeline, value) for encoded_key, value in fields.items()}
+
+                # Replace the identifiers atomically, so that concurrent writes cannot leak the original values
+                originals.append((bucket, len(pipeline)))
+                self._replace(pipeline, bucket, mapping)
+
+            # Remove the keys from the previous buckets and from buckets written to using a stale layout
+            for count in (stale | {previous}) - {0, buckets}:
+                for bucket, fields in self._group(count, values):
+                    originals.append((bucket, len(pipeline)))
+                    self._replace(pipeline, bucket, dict.fromkeys(fields, ""))
+
+            # Execute and validate the layout
+            results, valid = self._execute(pipeline)
+
+            # Delete all of the original values
+            for bucket, position in originals:
+                bucket._delete_tree(identifiers=[identifier for identifier in results[position] if identifier is not None])
+
+            # Check whether the writes used the current layout
+            if valid:
+                return
+
+            # Retry using the new layout, removing the stale writes
+            stale.add(buckets)
+
+    def _remove(self, encoded_keys: typing.List[str]) -> bool:
+        # Whether any of the keys existed
+        removed = False
+
+        # Loop until the layout is stable
+        while True:
+            # Create a pipeline to hold all of the deletions
+            pipeline = self._connection.pipeline(transaction=False)
+
+            # Remove the keys from all of the layouts
+            originals = []
+            for count in self._current_layout():
+                # Skip missing layouts
+                if not count:
+                    continue
+
+                # Delete the keys, fetching the original identifiers
+                for bucket, fields in self._group(count, dict.fromkeys(encoded_keys, "")):
+                    originals.append((bucket, len(pipeline)))
+                    self._replace(pipeline, bucket, fields)
+
+            # Execute and validate the layout
+            results, valid = self._execute(pipeline)
+
+            # Delete all of the original values
+            for bucket, position in originals:
+                identifiers = [identifier for identifier in results[position] if identifier is not None]
+                removed = removed or bool(identifiers)
+                bucket._delete_tree(identifiers=identifiers)
+
+            # Check whether the deletions used the current layout
+            if valid:
+                return removed
+
+    def _replace(self, pipeline: typing.Any, bucket: Dictionary, mapping: typing.Dict[str, str]) -> None:
+        # Flatten the mapping to the script arguments
+        arguments = [argument for item in mapping.items() for argument in item]
+
+        # Replace the identifiers of the bucket as part of the pipeline - empty identifiers delete the fields
+        bucket._execute_script(REPLACE_FIELDS_SCRIPT, keys=[bucket._key], args=arguments, client=pipeline)
+
+    def _group(self, buckets: int, values: typing.Mapping[str, typing.Any]) -> typing.List[typing.Tuple[Dictionary, typing.Dict[str, typing.Any]]]:
+        # Group the values by their buckets
+        groups: typing.Dict[str, typing.Tuple[Dictionary, typing.Dict[str, typing.Any]]] = {}
+        for encoded_key, value in values.items():
+            bucket = self._bucket_of(buckets, encoded_key)
+            groups.setdefault(bucket._key, (bucket, {}))[1][encoded_key] = value
+
+        # Return the groups by bucket
+        return list(groups.values())
+
+    def clear(self) -> None:
+        # Delete all of the buckets and all of the nested values
+        for bucket in self._buckets():
+            bucket.clear()
+
+    def copy(self, workers: typing.Optional[int] = None) -> typing.Mapping[typing.Any, typing.Any]:
+        # Create output mapping
+        output = self._COPY_TYPE()
+
+        # Copy all of the buckets in parallel - the current buckets are last, so their values win
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for bucket_copy in executor.map(lambda bucket: bucket.copy(), self._buckets()):
+                output.update(bucket_copy)
+
+        # Return the created output
+        return output
+
+    def reshard(self, buckets: int, count: typing.Optional[int] = None) -> None:
+        # Make sure the bucket count is valid
+        if buckets < 1:
+            raise ValueError(f"Invalid bucket count {buckets}")
+
+        # Finish any previous migration first
+        self.refresh()
+        self._migrate(count)
+
+        # Nothing to do if the layout does not change
+        current, _ = self._current_layout()
+        if buckets == current:
+            return
+
+        # Switch to the new layout - from now on, writes go to the new buckets and reads fall back to the previous buckets
+        self._connection.hset(self._key, mapping={BUCKETS_FIELD: buckets, PREVIOUS_FIELD: current})
+        self._layout = (buckets, current)
+
+        # Migrate all of the keys to the new buckets
+        self._migrate(count)
+
+    def _migrate(self, count: typing.Optional[int] = None) -> None:
+        # Nothing to do when not resharding
+        buckets, previous = self._current_layout()
+        if not previous:
+            return
+
+        # Migrate the previous buckets one by one
+        for index in range(previous):
+            # Fetch the previous bucket
+            bucket = self._bucket(previous, index)
+
+            # Move the bucket page by page, until it is empty - fields which were written meanwhile are moved by the next pass
+            cursor = 0
+            while True:
+                # Fetch the next page of the bucket
+                cursor, raw_mapping = self._connection.hscan(bucket._key, cursor, count=count or self._CHUNK_SIZE)
+
+                # Make sure the raw mapping is a mapping
+                if not isinstance(raw_mapping, Mapping):
+                    raise TypeError(raw_mapping)
+
+                # Move the page
+                if raw_mapping:
+                    self._move(bucket, buckets, {self._text(encoded_key): self._text(identifier) for encoded_key, identifier in raw_mapping.items()})
+
+                # Once a pass is complete, check whether the bucket is empty - empty hashes are deleted by redis
+                if not cursor and not self._connection.exists(bucket._key):
+                    break
+
+        # The migration is complete
+        self._connection.hdel(self._key, PREVIOUS_FIELD)
+        self._layout = (buckets, 0)
+
+    def _move(self, source: Dictionary, buckets: int, identifiers: typing.Dict[str, str]) -> None:
+        # Create a pipeline to hold all of the copies
+        pipeline = self._connection.pipeline(transaction=False)
+
+        # Copy the values into the new buckets unless they were already written to - nested values are copied into the slot of their new bucket
+        copies, positions = {}, []
+        for encoded_key, identifier in identifiers.items():
+            # Scalars are copied as is
+            bucket = self._bucket_of(buckets, encoded_key)
+            if identifier.startswith(":"):
+                copies[encoded_key] = (bucket, identifier)
+            else:
+                copies[encoded_key] = (bucket, bucket._plan_identifier(pipeline, source._fetch_by_identifier(identifier).copy()))
+
+            # Set the copy only if the key was not written since, remembering the position of the result
+            positions.append(len(pipeline))
+            pipeline.hsetnx(bucket._key, encoded_key, copies[encoded_key][1])
+
+        # Execute all of the copies at once
+        results = pipeline.execute()
+        inserted = [results[position] for position in positions]
+
+        # Delete the moved keys from the source bucket, unless they were changed meanwhile
+        deleted = source._execute_script(DELETE_FIELDS_IF_SCRIPT, keys=[source._key], args=[argument for item in identifiers.items() for argument in item])
+
+        # Collect the copies which must be undone and the values which must be deleted
+        undo: typing.Dict[str, typing.Tuple[Dictionary, typing.Dict[str, str]]] = {}
+        for (encoded_key, identifier), was_inserted, was_deleted in zip(identifiers.items(), inserted, deleted):
+            bucket, copy_identifier = copies[encoded_key]
+
+            # The original value was moved or replaced, so it is no longer referenced
+            if was_deleted:
+                source._delete_by_identifier(identifier)
+
+            # The copy was not inserted, so it is not referenced
+            if not was_inserted:
+                bucket._delete_by_identifier(copy_identifier)
+
+            # The key was deleted meanwhile, so the inserted copy must be undone
+            elif not was_deleted:
+                undo.setdefault(bucket._key, (bucket, {}))[1][encoded_key] = copy_identifier
+
+        # Undo the copies of deleted keys, unless they were written meanwhile
+        for bucket, fields in undo.values():
+            undone = bucket._execute_script(DELETE_FIELDS_IF_SCRIPT, keys=[bucket._key], args=[argument for item in fields.items() for argument in item])
+            bucket._delete_tree(identifiers=[identifier for identifier, was_undone in zip(fields.values(), undone) if was_undone])
+
+    def _text(self, value: typing.Union[str, bytes]) -> str:
+        # Make sure the value is a string
+        if not isinstance(value, str):
+            value = value.decode(self._ENCODING)
+
+        # Return the string
+        return value
@@ -0,0 +1,28 @@
+import typing
+import contextlib
+
+import pytest
+
+# Import explain mode
+from rednest.explain import THRESHOLD, Plan, explain
+
+
+@contextlib.contextmanager
+def round_trip_budget(round_trips: typing.Optional[int] = None, threshold: typing.Optional[int] = None) -> typing.Iterator[Plan]:
+    # Record the plan of the block - N+1 patterns fail the test only when a threshold is given
+    with explain(threshold if threshold is not None else THRESHOLD) as plan:
+        yield plan
+
+    # Fail the test if the block exceeded the budget
+    if round_trips is not None and plan.round_trips > round_trips:
+        pytest.fail(f"Round trip budget exceeded ({plan.round_trips} > {round_trips}):\n{plan}", pytrace=False)
+
+    # Fail the test if the block contains N+1 patterns
+    if threshold is not None and plan.findings:
+        pytest.fail(f"N+1 pattern detected:\n{plan}", pytrace=False)
+
+
+@pytest.fixture()
+def rednest_budget() -> typing.Callable[..., typing.ContextManager[Plan]]:
+    # Return the budget context manager, to be used as "with rednest_budget(3):"
+    return round_trip_budget
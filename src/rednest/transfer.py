@@ -0,0 +1,262 @@
+import json
+import time
+import typing
+import dataclasses
+
+# Import value codecs
+from rednest.codec import Codec
+
+# Import nested objects
+from rednest.list import List
+from rednest.counter import Counter
+from rednest.dictionary import Dictionary
+from rednest.nested import Connection, Nested, NESTED_TYPES
+
+# Version of the dump format
+FORMAT_VERSION = 1
+
+# Type of raw tree entries - raw path, decoded path, nested type identifier or None for leaves, raw leaf value and the owning handle
+Entry = typing.Tuple[typing.Tuple[typing.Any, ...], typing.Tuple[typing.Any, ...], typing.Optional[str], typing.Optional[str], Nested]
+
+
+@dataclasses.dataclass
+class TransferStats:
+
+    # Number of transferred tree entries
+    items: int = 0
+
+    # Number of transferred bytes
+    bytes: int = 0
+
+    # Transfer duration in seconds
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        # Return the throughput in entries per second
+        return self.items / self.seconds if self.seconds else 0.0
+
+
+def _text(value: typing.Union[str, bytes]) -> str:
+    # Make sure the value is a string
+    if not isinstance(value, str):
+        value = value.decode(Nested._ENCODING)
+
+    # Return the string
+    return value
+
+
+def _entries(handle: Nested, count: int) -> typing.Iterator[typing.Tuple[typing.Any, typing.Any, str]]:
+    # Stream the raw fields of dictionaries page by page
+    if isinstance(handle, Dictionary):
+        for encoded_key, identifier in handle._scan(count):
+            yield _text(encoded_key), handle._decode_key(encoded_key), _text(identifier)
+        return
+
+    # Stream the raw items of lists chunk by chunk
+    if isinstance(handle, List):
+        index = 0
+        for identifiers in handle._iter_identifiers(count):
+            for identifier in identifiers:
+                yield index, index, _text(identifier)
+                index += 1
+        return
+
+    # Stream the scores of counters page by page, encoding the counts as leaves
+    if isinstance(handle, Counter):
+        for encoded_key, score in handle._connection.zscan_iter(handle._key, count=count):
+            yield _text(encoded_key), handle._decode_key(encoded_key), f":{handle._encode(handle._decode_count(score))}"
+        return
+
+    # Other nested types cannot be streamed
+    raise TypeError(f"Object of type {type(handle).__name__} cannot be streamed")
+
+
+def _traverse(handle: Nested, count: typing.Optional[int] = None) -> typing.Iterator[Entry]:
+    # Create the stack of the containers being traversed - only the current branch is held in memory
+    stack = [((), (), handle, _entries(handle, count or handle._CHUNK_SIZE))]
+
+    # Loop until all of the containers were traversed
+    while stack:
+        # Fetch the next entry of the innermost container
+        raw_path, path, container, entries = stack[-1]
+        entry = next(entries, None)
+
+        # If the container has ended, move back to its parent
+        if entry is None:
+            stack.pop()
+            continue
+
+        # Extend the paths with the entry key
+        raw_key, key, identifier = entry
+        entry_raw_path, entry_path = raw_path + (raw_key,), path + (key,)
+
+        # Split the identifier to the nested type and the encoded value
+        redis_identifier, encoded_value = identifier.split(":", 1)
+
+        # Yield leaves as is
+        if not redis_identifier:
+            yield entry_raw_path, entry_path, None, encoded_value, container
+            continue
+
+        # Yield the nested container, then traverse it
+        nested = container._fetch_by_identifier(identifier)
+        yield entry_raw_path, entry_path, redis_identifier, None, nested
+        stack.append((entry_raw_path, entry_path, nested, _entries(nested, count or nested._CHUNK_SIZE)))
+
+
+def walk(handle: Nested, count: typing.Optional[int] = None) -> typing.Iterator[typing.Tuple[typing.Tuple[typing.Any, ...], typing.Any]]:
+    # The last nested container which did not yield any leaves yet
+    pending: typing.Optional[typing.Tuple[typing.Tuple[typing.Any, ...], typing.Tuple[typing.Any, ...], Nested]] = None
+
+    # Loop over all of the entries of the tree
+    for raw_path, path, redis_identifier, encoded_value, owner in _traverse(handle, count):
+        # If the pending container is not the parent of the entry, it is empty
+        if pending is not None and raw_path[:len(pending[0])] != pending[0]:
+            yield pending[1], pending[2]._COPY_TYPE()  # type: ignore[attr-defined]
+
+        # Nested containers are pending until their first leaf
+        pending = None
+        if redis_identifier:
+            pending = (raw_path, path, owner)
+            continue
+
+        # Yield the decoded leaf
+        yield path, owner._decode(encoded_value)  # type: ignore[arg-type]
+
+    # The last container may be empty too
+    if pending is not None:
+        yield pending[1], pending[2]._COPY_TYPE()  # type: ignore[attr-defined]
+
+
+def dump(handle: Nested, fp: typing.TextIO, count: typing.Optional[int] = None) -> TransferStats:
+    # Start measuring the transfer
+    stats, start = TransferStats(), time.perf_counter()
+
+    # Find the nested type of the handle
+    nested_type = next(nested_type for nested_type in NESTED_TYPES if isinstance(handle, nested_type.nested_class))
+
+    # Write the header, which stores the root type and the codec of the raw values
+    header = json.dumps({"format": "rednest", "version": FORMAT_VERSION, "type": nested_type.redis_identifier, "codec": type(handle._codec).__name__})
+    fp.write(header + "\n")
+
+    # Write the raw entries of the tree, one per line
+    for raw_path, _, redis_identifier, encoded_value, _ in _traverse(handle, count):
+        # Nested containers are written as type markers
+        if redis_identifier:
+            line = json.dumps({"path": raw_path, "type": redis_identifier})
+        else:
+            line = json.dumps({"path": raw_path, "value": encoded_value})
+
+        # Write the line and count it
+        fp.write(line + "\n")
+        stats.items += 1
+        stats.bytes += len(line.encode()) + 1
+
+    # Return the transfer statistics
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def load(fp: typing.Iterable[str], connection: Connection, key: str, codec: typing.Optional[Codec] = None, count: typing.Optional[int] = None) -> typing.Tuple[Nested, TransferStats]:
+    # Start measuring the transfer
+    stats, start = TransferStats(), time.perf_counter()
+
+    # Read the header
+    lines = iter(fp)
+    header = json.loads(next(lines, "null"))
+
+    # Make sure the header is valid
+    if not isinstance(header, dict) or header.get("format") != "rednest" or header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Invalid dump header {header!r}")
+
+    # Find the nested type of the root
+    nested_type = NESTED_TYPES.from_identifier(header["type"])
+    if nested_type is None:
+        raise TypeError(f"Unknown nested type {header['type']!r}")
+
+    # Create the root and make sure the codec matches the raw values
+    root: Nested = nested_type.nested_class(connection=connection, key=key, codec=codec)  # type: ignore[assignment]
+    if type(root._codec).__name__ != header["codec"]:
+        raise ValueError(f"Dump was encoded using {header['codec']}, not {type(root._codec).__name__}")
+
+    # Clear the root before loading
+    root.deinitialize()
+
+    # Create the stack of the containers being loaded - raw path, key and nested type identifier
+    stack: typing.List[typing.Tuple[typing.List[typing.Any], str, str]] = [([], key, header["type"])]
+
+    # Pending writes - the buffered identifiers of the current container and a pipeline of flushed buffers, along with the number of its entries
+    pipeline = connection.pipeline(transaction=False)
+    target: typing.Optional[typing.Tuple[str, str]] = None
+    buffer: typing.List[typing.Tuple[str, str]] = []
+    pending = 0
+    size = count or root._CHUNK_SIZE
+
+    def flush_buffer() -> None:
+        nonlocal pending
+
+        # Write the buffered identifiers to the pipeline
+        if target is not None and buffer:
+            if target[1] == "list":
+                pipeline.rpush(target[0], *(identifier for _, identifier in buffer))
+            elif target[1] == "zset":
+                pipeline.zadd(target[0], {member: root._codec.decode(identifier[1:]) for member, identifier in buffer})
+            else:
+                pipeline.hset(target[0], mapping=dict(buffer))
+
+        # Execute the pipeline once it holds enough entries, so that at most twice the chunk size is buffered
+        pending += len(buffer)
+        if pending >= size:
+            pipeline.execute()  # type: ignore[no-untyped-call]
+            pending = 0
+
+        # Clear the buffer
+        buffer.clear()
+
+    # Loop over all of the entries
+    for line in lines:
+        # Skip empty lines
+        if not line.strip():
+            continue
+
+        # Parse the entry and count it
+        entry = json.loads(line)
+        stats.items += 1
+        stats.bytes += len(line.encode())
+
+        # Move back to the parent container of the entry
+        path = entry["path"]
+        while stack[-1][0] != path[:-1]:
+            stack.pop()
+
+        # Fetch the container which holds the entry
+        _, container_key, container_type = stack[-1]
+
+        # Create the identifier of the entry
+        if "type" in entry:
+            # Create a new nested key for the container
+            nested_name = root._create_nested_name()
+            identifier = f"{entry['type']}:{root._NAME_CODEC.encode(nested_name)}"
+
+            # Load the next entries into the container
+            stack.append((path, nested_name, entry["type"]))
+        else:
+            # Leaves are stored as is
+            identifier = f":{entry['value']}"
+
+        # Flush the buffer when the container changes or the buffer is full
+        if target != (container_key, container_type) or len(buffer) >= size:
+            flush_buffer()
+            target = (container_key, container_type)
+
+        # Buffer the identifier
+        buffer.append((path[-1], identifier))
+
+    # Flush the remaining writes
+    flush_buffer()
+    pipeline.execute()  # type: ignore[no-untyped-call]
+
+    # Return the root and the transfer statistics
+    stats.seconds = time.perf_counter() - start
+    return root, stats
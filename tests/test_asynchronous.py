@@ -0,0 +1,184 @@
+import os
+import collections
+import redis
+import redis.asyncio
+import asyncio
+import pytest
+
+from rednest import AsyncDictionary, AsyncList, AsyncCounter
+
+from test_utilities import dictionary_type
+
+# All supported asynchronous test connections
+ASYNC_REDIS_CONNECTIONS = [{}, {"decode_responses": True}]
+
+
+@pytest.fixture(params=ASYNC_REDIS_CONNECTIONS)
+def my_async_redis(request):
+    return request.param
+
+
+def run(coroutine_function, **kwargs):
+    async def wrapper():
+        # Create the connection inside the event loop
+        connection = redis.asyncio.Redis(**kwargs)
+
+        try:
+            return await coroutine_function(connection)
+        finally:
+            await connection.aclose()
+
+    # Run the test in a new event loop
+    return asyncio.run(wrapper())
+
+
+def test_dictionary_read_write(my_async_redis):
+    async def test(connection):
+        # Create a random dictionary
+        my_dictionary = AsyncDictionary(connection, os.urandom(4).hex())
+
+        # Write and read some values
+        await my_dictionary.set("a", 1)
+        await my_dictionary.update({"b": [1, 2], "c": {"d": None}})
+        assert await my_dictionary["a"] == 1
+        assert await my_dictionary.get("missing", 5) == 5
+        assert await my_dictionary.contains("b")
+        assert await my_dictionary.length() == 3
+
+        # Make sure nested values are asynchronous handles
+        nested = await my_dictionary["c"]
+        assert isinstance(nested, AsyncDictionary)
+        await nested.set("e", 2)
+        assert await my_dictionary.copy() == {"a": 1, "b": [1, 2], "c": {"d": None, "e": 2}}
+
+        # Make sure missing keys raise
+        with pytest.raises(KeyError):
+            await my_dictionary["missing"]
+
+        # Delete and pop some values
+        await my_dictionary.delete("a")
+        assert await my_dictionary.pop("c") == {"d": None, "e": 2}
+        assert await my_dictionary.pop("c", None) is None
+        assert await my_dictionary.setdefault("f", {"g": 1}) == {"g": 1}
+        assert await (await my_dictionary.setdefault("f", 2)).copy() == {"g": 1}
+
+        # Iterate over the dictionary
+        assert sorted([key async for key in my_dictionary]) == ["b", "f"]
+        assert sorted([type(value).__name__ async for value in my_dictionary.values()]) == ["AsyncDictionary", "AsyncList"]
+        assert dict([item async for item in my_dictionary.items()]).keys() == {"b", "f"}
+
+        # Clear the dictionary and make sure nothing was left behind
+        await my_dictionary.clear()
+        assert not await connection.keys(f"*{my_dictionary._key}*")
+
+    run(test, **my_async_redis)
+
+
+def test_list_read_write(my_async_redis):
+    async def test(connection):
+        # Create a random list
+        my_list = AsyncList(connection, os.urandom(4).hex())
+
+        # Write and read some values
+        await my_list.extend([1, 2, 3])
+        await my_list.append({"a": [1]})
+        await my_list.insert(0, 0)
+        assert await my_list[0] == 0
+        assert isinstance(await my_list[-1], AsyncDictionary)
+        assert await (await my_list[-1]).copy() == {"a": [1]}
+        assert await my_list[1:3] == [1, 2]
+        assert (await my_list[::-2])[1:] == [2, 0]
+        assert await my_list.length() == 5
+
+        # Set and delete some values
+        await my_list.set(0, [5])
+        await my_list.set(slice(1, 3), ["a", "b", "c"])
+        await my_list.delete(slice(2, 4))
+        await my_list.delete(0)
+        assert await my_list.copy() == ["a", 3, {"a": [1]}]
+
+        # Make sure out of range indexes raise
+        with pytest.raises(IndexError):
+            await my_list[10]
+        with pytest.raises(IndexError):
+            await my_list.set(10, 1)
+
+        # Pop and iterate over the list
+        assert await my_list.pop() == {"a": [1]}
+        assert [item async for item in my_list] == ["a", 3]
+
+        # Clear the list and make sure nothing was left behind
+        await my_list.clear()
+        assert not await connection.keys(f"*{my_list._key}*")
+
+    run(test, **my_async_redis)
+
+
+def test_nested_copies(my_async_redis):
+    async def test(connection):
+        # Create two random dictionaries
+        my_dictionary = AsyncDictionary(connection, os.urandom(4).hex())
+        other_dictionary = AsyncDictionary(connection, os.urandom(4).hex())
+
+        # Assign asynchronous handles, even inside of plain values
+        await other_dictionary.update(a={"b": [1, 2]})
+        await my_dictionary.update(a=await other_dictionary["a"], b=[{"c": await other_dictionary["a"]}])
+
+        # Make sure the values were copied
+        await other_dictionary.clear()
+        assert await my_dictionary.copy() == {"a": {"b": [1, 2]}, "b": [{"c": {"b": [1, 2]}}]}
+
+        # Clean up
+        await my_dictionary.clear()
+
+    run(test, **my_async_redis)
+
+
+def test_storage_compatibility(my_async_redis):
+    async def test(connection):
+        # Create a synchronous dictionary and an asynchronous dictionary of the same key
+        name = os.urandom(4).hex()
+        my_dictionary = dictionary_type(redis.Redis(), name)
+        async_dictionary = AsyncDictionary(connection, name)
+
+        # Write from both flavours and read from the other
+        my_dictionary.update(a={"b": [1, (2, 3)]})
+        await async_dictionary.set("c", {"d": b"Hello"})
+        assert await async_dictionary.copy() == my_dictionary.copy() == {"a": {"b": [1, (2, 3)]}, "c": {"d": b"Hello"}}
+
+        # Clean up
+        await async_dictionary.clear()
+
+    run(test, **my_async_redis)
+
+
+def test_counter(my_async_redis):
+    async def test(connection):
+        # Create a random dictionary with a counter
+        my_dictionary = AsyncDictionary(connection, os.urandom(4).hex())
+        await my_dictionary.set("c", collections.Counter("aab"))
+
+        # Make sure the counter is an asynchronous handle
+        counter = await my_dictionary["c"]
+        assert isinstance(counter, AsyncCounter)
+        assert await counter["a"] == 2
+        assert await counter["missing"] == 0
+
+        # Count some more elements
+        assert await counter.increment("b", 2) == 3
+        await counter.update("cc")
+        await counter.subtract({"a": 1})
+        assert await counter.most_common(1) == [("b", 3)]
+        assert await counter.total() == 6
+        assert sorted([key async for key in counter]) == ["a", "b", "c"]
+
+        # Make sure the counter is copied with the dictionary
+        copied = await my_dictionary.copy()
+        assert copied == {"c": {"a": 1, "b": 3, "c": 2}}
+        assert isinstance(copied["c"], collections.Counter)
+
+        # Make sure clearing the dictionary deletes the counter
+        await my_dictionary.clear()
+        assert not await connection.exists(counter._key)
+
+    run(test, **my_async_redis)
@@ -0,0 +1,190 @@
+import pytest
+import collections
+
+from rednest import batch
+
+from test_utilities import my_dictionary, my_list
+
+
+def test_dictionary_batch(my_dictionary):
+    # Buffer writes to the dictionary
+    with my_dictionary.batch():
+        for index in range(100):
+            my_dictionary[index] = index
+
+        # Make sure nothing was written yet
+        assert len(my_dictionary) == 0
+
+        # Overwrite and delete some of the values
+        my_dictionary[0] = "Hello"
+        del my_dictionary[1]
+
+    # Make sure the writes were coalesced
+    assert len(my_dictionary) == 99
+    assert my_dictionary[0] == "Hello"
+    assert 1 not in my_dictionary
+    assert my_dictionary[99] == 99
+
+
+def test_dictionary_batch_nested(my_dictionary):
+    # Create some nested values
+    my_dictionary.a = {"b": [1, 2]}
+    my_dictionary.c = [{"d": 1}]
+
+    # Replace the nested values in a batch
+    with my_dictionary.batch():
+        my_dictionary.a.b = [3]
+        my_dictionary.a.e = {"f": 1}
+        my_dictionary.c = 5
+
+    # Make sure the nested writes were flushed
+    assert my_dictionary == {"a": {"b": [3], "e": {"f": 1}}, "c": 5}
+
+    # Make sure the replaced nested values were deleted
+    assert len(my_dictionary._connection.keys(f"*{my_dictionary._key}*")) == 4
+
+
+def test_dictionary_batch_clear(my_dictionary):
+    # Create some values
+    my_dictionary.update(a=1, b={"c": 1})
+
+    # Clear the dictionary and write to it in a batch
+    with my_dictionary.batch():
+        my_dictionary.d = 1
+        my_dictionary.clear()
+        my_dictionary.e = 2
+
+    # Make sure only the writes after the clear remain
+    assert my_dictionary == {"e": 2}
+    assert len(my_dictionary._connection.keys(f"*{my_dictionary._key}*")) == 1
+
+
+def test_dictionary_batch_failure(my_dictionary):
+    # Make sure the writes are discarded on failure
+    with pytest.raises(ZeroDivisionError):
+        with my_dictionary.batch():
+            my_dictionary.a = 1
+            raise ZeroDivisionError()
+
+    # Make sure nothing was written and writes are no longer buffered
+    assert "a" not in my_dictionary
+    my_dictionary.a = 2
+    assert my_dictionary.a == 2
+
+
+def test_dictionary_batch_key_error(my_dictionary):
+    # Create some values
+    my_dictionary.update(a=1, b=2)
+
+    # Make sure deleting a deleted key raises immediately
+    with my_dictionary.batch():
+        del my_dictionary.a
+        with pytest.raises(KeyError):
+            del my_dictionary["a"]
+
+        # Make sure deleting a key of a cleared dictionary raises immediately
+        my_dictionary.clear()
+        with pytest.raises(KeyError):
+            del my_dictionary["b"]
+
+        # Make sure buffered values can be deleted
+        my_dictionary.c = 3
+        del my_dictionary.c
+
+    # Make sure deleting a missing key raises when flushing
+    with pytest.raises(KeyError, match="missing"):
+        with my_dictionary.batch():
+            my_dictionary.d = {"e": 1}
+            del my_dictionary["missing"]
+
+    # Make sure the other writes were applied
+    assert my_dictionary == {"d": {"e": 1}}
+
+    # Make sure deleting a missing key before clearing raises as well
+    with pytest.raises(KeyError, match="missing"):
+        with my_dictionary.batch():
+            del my_dictionary["missing"]
+            my_dictionary.clear()
+
+    # Make sure the dictionary was cleared, without leaving nested values behind
+    assert my_dictionary == {}
+    assert len(my_dictionary._connection.keys(f"*{my_dictionary._key}*")) == 0
+
+
+def test_list_batch(my_list):
+    # Buffer writes to the list
+    with my_list.batch():
+        my_list.extend([1, 2, 3])
+        my_list.append({"a": 1})
+        my_list[0] = 0
+
+        # Make sure nothing was written yet
+        assert len(my_list) == 0
+
+    # Make sure the writes were applied in order
+    assert my_list == [0, 2, 3, {"a": 1}]
+
+    # Set aliasing indexes in a batch
+    with my_list.batch():
+        my_list[-1] = [1]
+        my_list[3] = 2
+        my_list[-1] = 3
+        my_list.append(4)
+
+    # Make sure the last write won and the replaced values were deleted
+    assert my_list == [0, 2, 3, 3, 4]
+    assert len(my_list._connection.keys(f"*{my_list._key}*")) == 1
+
+
+def test_list_batch_unbuffered(my_list):
+    # Make sure writes which cannot be buffered see the buffered writes
+    with my_list.batch():
+        my_list.extend([1, 2, 3])
+        assert my_list.pop() == 3
+        my_list.insert(0, 0)
+        my_list.clear()
+        my_list.append(5)
+
+    # Make sure all of the writes were applied
+    assert my_list == [5]
+
+
+def test_list_batch_index_error(my_list):
+    # Make sure out of range sets raise when flushing
+    with pytest.raises(IndexError):
+        with my_list.batch():
+            my_list.append({"a": 1})
+            my_list[5] = {"b": 1}
+
+    # Make sure the other writes were applied and nothing was left behind
+    assert my_list == [{"a": 1}]
+    assert len(my_list._connection.keys(f"*{my_list._key}*")) == 2
+
+
+def test_batch_multiple_handles(my_dictionary, my_list):
+    # Buffer writes to multiple handles
+    with batch(my_dictionary, my_list):
+        my_dictionary.a = 1
+        my_list.append(1)
+
+        # Make sure nested batches join the outer batch
+        with my_dictionary.batch():
+            my_dictionary.b = 2
+
+        # Make sure nothing was written yet
+        assert not my_dictionary and not my_list
+
+    # Make sure all of the writes were flushed
+    assert my_dictionary == {"a": 1, "b": 2}
+    assert my_list == [1]
+
+
+def test_batch_unsupported_type(my_dictionary):
+    # Create a counter, whose writes are never buffered
+    my_dictionary["words"] = collections.Counter("abracadabra")
+    words = my_dictionary["words"]
+
+    # Make sure writes buffered for the counter cannot be flushed
+    with pytest.raises(TypeError, match="Counter does not support batching"):
+        with batch(words) as writes:
+            writes.writes(words, dict)
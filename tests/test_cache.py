@@ -0,0 +1,158 @@
+import os
+import time
+import redis
+import pytest
+
+from rednest import NearCache
+
+from test_utilities import dictionary_type, list_type
+
+# Connections using both invalidation protocols - RESP3 push messages and RESP2 redirection
+CACHE_CONNECTIONS = [redis.Redis(protocol=3), redis.Redis(protocol=2, decode_responses=True)]
+
+
+@pytest.fixture(params=CACHE_CONNECTIONS)
+def my_cache(request):
+    # Create the cache and close it after the test
+    cache = NearCache(request.param, max_size=100)
+    yield cache
+    cache.close()
+
+
+def wait_for(condition):
+    # Poll until the condition holds, since invalidations arrive asynchronously
+    for _ in range(100):
+        if condition():
+            return True
+        time.sleep(0.05)
+
+    return False
+
+
+def test_dictionary_cache_hits(my_cache):
+    # Create a cached dictionary
+    my_dictionary = dictionary_type(redis.Redis(), os.urandom(4).hex(), cache=my_cache)
+    my_dictionary.update(a=1, b=2)
+
+    # Read the same key multiple times
+    assert my_dictionary.a == 1
+    assert my_dictionary.a == 1
+    assert my_dictionary["a"] == 1
+
+    # Make sure only the first read missed
+    assert my_cache.misses == 1
+    assert my_cache.hits == 2
+
+    # Make sure missing keys are cached too
+    assert "c" not in my_dictionary
+    assert "c" not in my_dictionary
+    assert my_cache.hits == 3
+
+
+def test_dictionary_local_writes(my_cache):
+    # Create a cached dictionary
+    my_dictionary = dictionary_type(redis.Redis(), os.urandom(4).hex(), cache=my_cache)
+    my_dictionary.a = 1
+    assert my_dictionary.a == 1
+
+    # Make sure local writes are visible immediately
+    my_dictionary.a = 2
+    assert my_dictionary.a == 2
+    del my_dictionary.a
+    assert "a" not in my_dictionary
+    my_dictionary.setdefault("a", 3)
+    assert my_dictionary.a == 3
+    my_dictionary.clear()
+    assert "a" not in my_dictionary
+
+
+def test_dictionary_remote_invalidation(my_cache):
+    # Create a cached dictionary and an uncached dictionary of another client
+    name = os.urandom(4).hex()
+    my_dictionary = dictionary_type(redis.Redis(), name, cache=my_cache)
+    other_dictionary = dictionary_type(redis.Redis(decode_responses=True), name)
+
+    # Cache a value
+    my_dictionary.a = 1
+    assert my_dictionary.a == 1
+
+    # Update the value from the other client and wait for the invalidation
+    other_dictionary.a = 2
+    assert wait_for(lambda: my_dictionary.a == 2)
+
+    # Make sure nested values are invalidated too
+    other_dictionary.b = {"c": 1}
+    assert my_dictionary.b.c == 1
+    other_dictionary.b.c = 2
+    assert wait_for(lambda: my_dictionary.b.c == 2)
+
+
+def test_list_remote_invalidation(my_cache):
+    # Create a cached list and an uncached list of another client
+    name = os.urandom(4).hex()
+    my_list = list_type(redis.Redis(), name, cache=my_cache)
+    other_list = list_type(redis.Redis(), name)
+
+    # Cache some items
+    my_list.extend([1, 2, 3])
+    assert my_list[0] == 1
+    assert my_list[-1] == 3
+
+    # Make sure local writes are visible immediately
+    my_list.insert(0, 0)
+    assert my_list[0] == 0
+    my_list[0] = 5
+    assert my_list[0] == 5
+    del my_list[0]
+    assert my_list[0] == 1
+
+    # Update the list from the other client and wait for the invalidation
+    other_list[0] = 10
+    assert wait_for(lambda: my_list[0] == 10)
+
+
+def test_cache_eviction(my_cache):
+    # Create a cached dictionary with more keys than the cache can hold
+    my_dictionary = dictionary_type(redis.Redis(), os.urandom(4).hex(), cache=my_cache)
+    my_dictionary.update({index: index for index in range(150)})
+
+    # Read all of the keys
+    for index in range(150):
+        assert my_dictionary[index] == index
+
+    # Make sure the cache is bounded and the least recently used keys were evicted
+    assert len(my_cache) == 100
+    assert my_dictionary[149] == 149
+    assert my_cache.hits == 1
+    assert my_dictionary[0] == 0
+    assert my_cache.misses == 151
+
+
+def test_cache_close(my_cache):
+    # Create a cached dictionary
+    my_dictionary = dictionary_type(redis.Redis(), os.urandom(4).hex(), cache=my_cache)
+    my_dictionary.a = 1
+    assert my_dictionary.a == 1
+
+    # Make sure a closed cache stops caching
+    my_cache.close()
+    assert len(my_cache) == 0
+    assert my_dictionary.a == 1
+    assert my_dictionary.a == 1
+    assert my_cache.hits == 0
+
+
+def test_cache_loader_failure(my_cache):
+    # Create a loader which fails
+    def loader():
+        raise ConnectionError("Loader failed")
+
+    # Make sure the original error is raised and nothing is cached
+    with pytest.raises(ConnectionError, match="Loader failed"):
+        my_cache.get("key", "field", loader)
+    assert len(my_cache) == 0
+
+    # Make sure the cache keeps working
+    assert my_cache.get("key", "field", lambda: 1) == 1
+    assert my_cache.get("key", "field", loader) == 1
+    assert my_cache._loading == 0
@@ -0,0 +1,102 @@
+import os
+import redis
+import redis.cluster
+import pytest
+
+from rednest import batch, NearCache, ShardedDictionary
+
+from test_utilities import dictionary_type, list_type
+
+# Address of the local test cluster - for example, redis-cli --cluster create 127.0.0.1:7000 127.0.0.1:7001 127.0.0.1:7002
+CLUSTER_HOST = os.environ.get("REDNEST_CLUSTER_HOST", "127.0.0.1")
+CLUSTER_PORT = int(os.environ.get("REDNEST_CLUSTER_PORT", "7000"))
+
+
+@pytest.fixture(scope="module")
+def my_cluster():
+    try:
+        # Connect to the test cluster
+        return redis.cluster.RedisCluster(host=CLUSTER_HOST, port=CLUSTER_PORT)
+    except (redis.RedisError, OSError):
+        pytest.skip("No redis cluster is available")
+
+
+def tree_keys(connection, key):
+    # Find all of the keys of the tree on all of the nodes
+    return connection.keys(f"*{key}*", target_nodes=redis.cluster.RedisCluster.ALL_NODES)
+
+
+def test_slot_prefix():
+    # Masters without hash tags are wrapped
+    assert dictionary_type._slot_prefix("users") == "{users}"
+
+    # Masters with hash tags are kept
+    assert dictionary_type._slot_prefix("{users}:1") == "{users}:1"
+    assert dictionary_type._slot_prefix("users:{1}") == "users:{1}"
+
+    # Masters with broken hash tags cannot be wrapped
+    assert dictionary_type._slot_prefix("users{") == "{users{}"
+    assert dictionary_type._slot_prefix("users{}") == "users{}"
+
+
+def test_tree_colocation(my_cluster):
+    # Create a dictionary with nested values
+    my_dictionary = dictionary_type(my_cluster, os.urandom(4).hex())
+    my_dictionary.update(a={"b": [1, {"c": 2}]}, d=[[3]])
+
+    # Make sure the entire tree shares the slot of the master
+    keys = tree_keys(my_cluster, my_dictionary._key)
+    assert len(keys) == 6
+    assert {my_cluster.keyslot(key) for key in keys} == {my_cluster.keyslot(my_dictionary._key)}
+
+    # Make sure the multi-key scripts work
+    my_dictionary.a.b[0:1] = [4, 5]
+    del my_dictionary.d
+    assert my_dictionary.copy() == {"a": {"b": [4, 5, {"c": 2}]}}
+
+    # Clear the tree and make sure nothing was left behind
+    my_dictionary.clear()
+    assert not tree_keys(my_cluster, my_dictionary._key)
+
+
+def test_batch_multiple_masters(my_cluster):
+    # Create handles of different masters, which are probably on different nodes
+    my_dictionary = dictionary_type(my_cluster, os.urandom(4).hex())
+    my_list = list_type(my_cluster, os.urandom(4).hex())
+
+    # Write to both of them in a batch
+    with batch(my_dictionary, my_list):
+        my_dictionary.a = {"b": 1}
+        my_list.extend([[1], 2])
+
+    # Make sure both transactions were flushed
+    assert my_dictionary == {"a": {"b": 1}}
+    assert my_list == [[1], 2]
+
+    # Clean up
+    my_dictionary.clear()
+    my_list.clear()
+
+
+def test_near_cache_unsupported(my_cluster):
+    # Make sure near caching requires a single node connection
+    with pytest.raises(TypeError):
+        NearCache(my_cluster)
+
+
+def test_sharded_reshard(my_cluster):
+    # Create a sharded dictionary spread across the cluster
+    my_sharded = ShardedDictionary(my_cluster, os.urandom(4).hex(), buckets=4)
+    value = {index: [index] for index in range(30)}
+    my_sharded.update(value)
+
+    # Make sure the buckets are spread across the slots
+    assert len({my_cluster.keyslot(bucket._key) for bucket in my_sharded._buckets()}) == 4
+
+    # Reshard the dictionary
+    my_sharded.reshard(6, count=4)
+    assert my_sharded == value
+
+    # Make sure the dictionary can be deleted entirely, leaving only the layout
+    my_sharded.clear()
+    assert tree_keys(my_cluster, my_sharded._key) == [my_sharded._key.encode()]
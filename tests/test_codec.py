@@ -0,0 +1,106 @@
+import os
+import math
+import pytest
+
+from rednest import ReprCodec, JSONCodec, PickleCodec, TaggedCodec
+
+from test_utilities import my_redis, my_codec, dictionary_type, list_type
+
+
+def test_codec_round_trip(my_codec):
+    # Check values that all codecs support
+    for value in [None, True, False, 0, -42, 10**30, 1.5, "", "Hello 'World'", "Unicode א"]:
+        assert my_codec.decode(my_codec.encode(value)) == value
+        assert type(my_codec.decode(my_codec.encode(value))) == type(value)
+
+
+def test_binary_codecs_round_trip():
+    # Check values that only some of the codecs support
+    for codec in [PickleCodec(), TaggedCodec()]:
+        for value in [b"AAAA\x00BBBB", bytearray(range(100)), (1, "2", (b"3", None)), float("inf")]:
+            assert codec.decode(codec.encode(value)) == value
+            assert type(codec.decode(codec.encode(value))) == type(value)
+
+
+def test_tagged_codec_unsupported():
+    # Make sure unsupported types are rejected
+    with pytest.raises(TypeError):
+        TaggedCodec().encode(object())
+
+
+def test_dictionary_codec(my_redis, my_codec):
+    # Create a dictionary with the codec
+    my_dictionary = dictionary_type(my_redis, os.urandom(4).hex(), codec=my_codec)
+
+    # Write nested values
+    my_dictionary["Hello"] = {"World": [1, 2.5, None], "Nested": {"Value": "Test"}}
+
+    # Make sure the nested values use the same codec
+    assert my_dictionary["Hello"]._codec is my_codec
+    assert my_dictionary["Hello"]["World"]._codec is my_codec
+
+    # Check the stored values
+    assert my_dictionary["Hello"]["Nested"]["Value"] == "Test"
+    assert my_dictionary.copy() == {"Hello": {"World": [1, 2.5, None], "Nested": {"Value": "Test"}}}
+
+    # Clear the dictionary
+    my_dictionary.clear()
+
+    # Make sure nothing was left behind
+    assert not my_redis.keys(f"*{my_dictionary._key}*")
+
+
+def test_list_codec(my_redis, my_codec):
+    # Create a list with the codec
+    my_list = list_type(my_redis, os.urandom(4).hex(), codec=my_codec)
+
+    # Write some values
+    my_list.append("Hello")
+    my_list.append({"World": 42})
+
+    # Check the stored values
+    assert my_list[0] == "Hello"
+    assert my_list[1]["World"] == 42
+    assert my_list == ["Hello", {"World": 42}]
+
+
+def test_json_codec_encoding():
+    # Make sure the JSON codec stores plain JSON
+    assert JSONCodec().encode({"a": [1, "b"]}) == '{"a":[1,"b"]}'
+
+
+def test_repr_codec_decoding():
+    # Create the codec
+    codec = ReprCodec()
+
+    # Check simple values, tuples and exotic values
+    for value in ["abc", 'it\'s "quoted"', "line\nbreak", "", b"", b"AAAA\x00BBBB", b"plain", 42, -1, 1.5, 1e100, -0.0, float("inf"), None, True, False, (), (1,), (1, "a, b", None, b"c"), ((1, 2), [3]), [1, {"a": 2}], {1, 2}, set(), frozenset({3}), bytearray(b"xyz"), 1 + 2j]:
+        assert codec.decode(codec.encode(value)) == value
+        assert type(codec.decode(codec.encode(value))) == type(value)
+
+    # Make sure decoded keys are cached
+    assert codec.decode_key("'key'") is codec.decode_key("'key'")
+
+
+def test_repr_codec_nested_values():
+    # Create the codec
+    codec = ReprCodec()
+
+    # Check constructors and names at any depth, which were stored by previous versions
+    for value in [(1, frozenset({2})), frozenset({frozenset({1})}), (bytearray(b"a"), [bytearray(b"b'\"")]), range(0, 3), range(1, 10, 2), Ellipsis, (Ellipsis, [None]), [float("inf"), -float("inf")], {"a": (1 - 2j, {frozenset()})}]:
+        assert codec.decode(codec.encode(value)) == value
+        assert type(codec.decode(codec.encode(value))) == type(value)
+
+    # Make sure nan is decoded inside containers
+    assert math.isnan(codec.decode(codec.encode([float("nan")]))[0])
+
+
+def test_repr_codec_is_safe():
+    # Make sure code is never evaluated
+    with pytest.raises((ValueError, SyntaxError)):
+        ReprCodec().decode("__import__('os').getcwd()")
+
+    # Make sure only known constructors and numeric operators are evaluated
+    for value in ["open('file')", "set.__class__", "(lambda: 1)()", "'a' + 'b'", "set(x=1)"]:
+        with pytest.raises((ValueError, SyntaxError)):
+            ReprCodec().decode(value)
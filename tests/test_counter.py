@@ -0,0 +1,125 @@
+import pytest
+import collections
+
+from rednest import Counter
+
+from test_utilities import my_dictionary
+
+
+def test_counter_conversion(my_dictionary):
+    # Store a counter
+    my_dictionary["words"] = collections.Counter("abracadabra")
+
+    # Make sure the counter was converted to a counter, not to a dictionary
+    words = my_dictionary["words"]
+    assert isinstance(words, Counter)
+    assert words.copy() == collections.Counter("abracadabra")
+    assert my_dictionary.copy() == {"words": collections.Counter("abracadabra")}
+
+    # Plain dictionaries are still dictionaries
+    my_dictionary["plain"] = {"a": 1}
+    assert not isinstance(my_dictionary["plain"], Counter)
+
+
+def test_counter_existing_hash(my_dictionary):
+    # Store a counter the way previous versions did, as a hash
+    my_dictionary["words"] = dict(collections.Counter("abracadabra"))
+
+    # Make sure the existing counter still reads back with the same counts
+    words = my_dictionary["words"]
+    assert not isinstance(words, Counter)
+    assert words == collections.Counter("abracadabra")
+    assert words["a"] == 5
+
+    # Make sure assigning the counter again converts it to a sorted set
+    my_dictionary["words"] = collections.Counter(words.copy())
+    assert isinstance(my_dictionary["words"], Counter)
+    assert my_dictionary["words"] == collections.Counter("abracadabra")
+
+
+def test_counter_mapping(my_dictionary):
+    # Create a counter
+    my_dictionary["words"] = collections.Counter()
+    words = my_dictionary["words"]
+
+    # Set and read counts
+    words["a"] = 3
+    words[1] = 1.5
+    assert words["a"] == 3 and type(words["a"]) is int
+    assert words[1] == 1.5
+    assert len(words) == 2
+    assert sorted(words, key=str) == [1, "a"]
+
+    # Missing elements are counted as zero
+    assert words["missing"] == 0
+    assert "missing" not in words
+    assert words.get("missing") is None
+
+    # Deleting missing elements is ignored
+    del words["a"]
+    del words["a"]
+    assert words == {1: 1.5}
+
+
+def test_counter_counting(my_dictionary):
+    # Create a counter
+    my_dictionary["words"] = collections.Counter()
+    words = my_dictionary["words"]
+
+    # Count elements in different ways
+    assert words.increment("a") == 1
+    assert words.increment("a", 2) == 3
+    words.update("abcb")
+    words.update({"c": 10}, d=2)
+    words.subtract(["d"])
+
+    # Make sure the counts were added
+    assert words == collections.Counter({"a": 4, "b": 2, "c": 11, "d": 1})
+    assert words.total() == 18
+    assert sorted(words.elements()) == sorted("aaaabbcccccccccccd")
+
+
+def test_counter_pop(my_dictionary):
+    # Create a counter
+    my_dictionary["words"] = collections.Counter("abb")
+    words = my_dictionary["words"]
+
+    # Make sure missing elements raise instead of being counted as zero
+    assert words.pop("a") == 1
+    with pytest.raises(KeyError):
+        words.pop("a")
+    assert words.pop("a", None) is None
+
+    # Make sure missing elements are set by setdefault only
+    assert words.setdefault("b", 5) == 2
+    assert words.setdefault("c", 5) == 5
+    assert words.setdefault("d") == 0
+    assert words == collections.Counter({"b": 2, "c": 5, "d": 0})
+
+    # Make sure the highest counts are popped first
+    assert words.popitem() == ("c", 5)
+    assert words.popitem() == ("b", 2)
+    assert words.popitem() == ("d", 0)
+    with pytest.raises(KeyError):
+        words.popitem()
+
+
+def test_counter_most_common(my_dictionary):
+    # Create a counter
+    my_dictionary["words"] = collections.Counter({index: index for index in range(100)})
+    words = my_dictionary["words"]
+
+    # Make sure only the highest counts are returned
+    assert words.most_common(3) == [(99, 99), (98, 98), (97, 97)]
+    assert words.most_common(0) == []
+    assert len(words.most_common()) == 100
+
+
+def test_counter_delete(my_dictionary):
+    # Create a counter
+    my_dictionary["words"] = collections.Counter("Hello")
+    words = my_dictionary["words"]
+
+    # Make sure the counter is deleted with its parent
+    del my_dictionary["words"]
+    assert not words._connection.exists(words._key)
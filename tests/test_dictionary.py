@@ -1,5 +1,7 @@
 import pytest
 
+from rednest import ReprCodec, JSONCodec, PickleCodec, TaggedCodec, explain
+
 from test_utilities import my_dictionary, list_type, dictionary_type
 
 
@@ -384,3 +386,166 @@ def test_bunch_mode(my_dictionary):
 
     # Check final my_dictionary values
     assert my_dictionary == {"test_value": 10}
+
+
+def test_copy_nested(my_dictionary):
+    # Load nested values to my_dictionary
+    my_dictionary["Hello"] = {"World": [1, 2, {"Deep": (3, 4)}], "Empty": {}}
+    my_dictionary["Other"] = []
+
+    # Copy the my_dictionary
+    copy = my_dictionary.copy()
+
+    # Make sure the copy is made of plain types
+    assert type(copy["Hello"]) == dict
+    assert type(copy["Hello"]["World"]) == list
+    assert type(copy["Hello"]["World"][2]) == dict
+
+    # Check copy
+    assert copy == {"Hello": {"World": [1, 2, {"Deep": (3, 4)}], "Empty": {}}, "Other": []}
+
+
+def test_write_large_nested(my_dictionary):
+    # Create a large nested document
+    document = {f"User {index}": {"Index": index, "Tags": [index, str(index)], "Empty": {}} for index in range(2500)}
+
+    # Write the document
+    my_dictionary["Users"] = document
+
+    # Make sure the document was written
+    assert my_dictionary["Users"]["User 1234"]["Tags"] == [1234, "1234"]
+    assert my_dictionary["Users"].copy() == document
+
+
+def test_clear_deletes_nested_keys(my_dictionary):
+    # Load nested values
+    my_dictionary["Hello"] = {"World": [1, 2, {"Deep": [3, 4]}]}
+    my_dictionary["Other"] = [{"Test": 1}]
+
+    # Replace one of the nested values
+    my_dictionary["Other"] = "Scalar"
+
+    # Clear the my_dictionary
+    my_dictionary.clear()
+
+    # Make sure no nested keys were left behind
+    assert not my_dictionary._connection.keys(f"*{my_dictionary._key}*")
+
+
+def test_clear_chunked(my_dictionary):
+    # Delete only a few elements per call
+    my_dictionary._DELETE_CHUNK_SIZE = 3
+
+    # Load many nested values
+    my_dictionary.update({f"Key {index}": {"Values": list(range(index))} for index in range(20)})
+
+    # Clear the my_dictionary
+    my_dictionary.clear()
+
+    # Make sure nothing was left behind
+    assert not my_dictionary
+    assert not my_dictionary._connection.keys(f"*{my_dictionary._key}*")
+
+
+def test_streaming_iteration(my_dictionary):
+    # Load many values
+    my_dictionary.update({f"Key {index}": index for index in range(1000)})
+    my_dictionary["Nested"] = {"Value": 1}
+
+    # Make sure all the streams are complete
+    assert set(my_dictionary.iterkeys(count=10)) == {f"Key {index}" for index in range(1000)} | {"Nested"}
+    assert sorted(value for value in my_dictionary.itervalues(count=10) if isinstance(value, int)) == list(range(1000))
+    assert dict(my_dictionary.iteritems(count=10))["Nested"] == {"Value": 1}
+
+    # Make sure iteration does not fetch the length first
+    with explain() as plan:
+        assert len([key for key in my_dictionary]) == len(dict(my_dictionary.items())) == 1001
+    assert plan.round_trips == 2 and "HLEN" not in str(plan)
+
+    # Make sure iteration streams large hashes in pages, continuing the first page
+    my_dictionary._SCAN_THRESHOLD = 100
+    with explain() as plan:
+        assert [key for key in my_dictionary].count("Nested") == 1
+    commands = [command.name for call in plan.calls for command in call.commands()]
+    assert commands[:2] == ["HSCAN", "HLEN"] and set(commands[2:]) == {"HSCAN"}
+
+
+def test_views(my_dictionary):
+    # Load some values
+    my_dictionary.update({"a": 1, "b": [2], "c": {"d": 3}})
+
+    # Check the items view
+    assert sorted(key for key, _ in my_dictionary.items()) == ["a", "b", "c"]
+    assert dict(my_dictionary.items()) == {"a": 1, "b": [2], "c": {"d": 3}}
+    assert ("a", 1) in my_dictionary.items()
+    assert ("a", 2) not in my_dictionary.items()
+    assert ("z", 1) not in my_dictionary.items()
+    assert len(my_dictionary.items()) == 3
+
+    # Check the values view
+    assert 1 in list(my_dictionary.values())
+    assert [2] in my_dictionary.values()
+    assert len(my_dictionary.values()) == 3
+
+    # Make sure the streamed views behave the same
+    my_dictionary._SCAN_THRESHOLD = 1
+    assert dict(my_dictionary.items()) == {"a": 1, "b": [2], "c": {"d": 3}}
+    assert my_dictionary == {"a": 1, "b": [2], "c": {"d": 3}}
+
+
+def test_equals_nested(my_dictionary):
+    # Load nested values to my_dictionary
+    my_dictionary["Hello"] = {"World": [1, 2]}
+    my_dictionary["Other"] = {"World": [1, 2]}
+
+    # Compare nested dictionaries
+    assert my_dictionary["Hello"] == my_dictionary["Other"]
+    assert my_dictionary != {"Hello": {"World": [1, 2]}, "Another": {"World": [1, 2]}}
+    assert my_dictionary != {"Hello": {"World": [1, 3]}, "Other": {"World": [1, 2]}}
+
+
+@pytest.mark.parametrize("codec", [ReprCodec(), JSONCodec(), PickleCodec(), TaggedCodec()])
+def test_increment(my_dictionary, codec):
+    # Use the codec for the dictionary
+    my_dictionary = dictionary_type(my_dictionary._connection, my_dictionary._key, codec=codec)
+
+    # Missing values start from zero
+    assert my_dictionary.increment("count") == 1
+    assert my_dictionary.increment("count", 5) == 6
+    assert my_dictionary.increment("count", -10) == -4
+    assert type(my_dictionary["count"]) is int
+
+    # Floats turn the value to a float
+    assert my_dictionary.increment_float("count", 0.5) == -3.5
+    assert my_dictionary.increment_float("ratio", 0.1) == 0.1
+    assert my_dictionary.increment_float("ratio", 0.2) == 0.1 + 0.2
+    assert my_dictionary.increment_float("whole", 3) == 3.0
+    assert type(my_dictionary["whole"]) is float
+
+    # Large integers stay exact
+    assert my_dictionary.increment("large", 2 ** 60) == 2 ** 60
+    assert my_dictionary.increment("large") == 2 ** 60 + 1
+
+    # Make sure the values are readable
+    assert my_dictionary.copy() == {"count": -3.5, "ratio": 0.1 + 0.2, "whole": 3.0, "large": 2 ** 60 + 1}
+
+    # Make sure the amount is checked
+    with pytest.raises(TypeError):
+        my_dictionary.increment("count", 0.5)
+    with pytest.raises(TypeError):
+        my_dictionary.increment("count", True)
+    assert my_dictionary["count"] == -3.5
+
+
+def test_increment_invalid(my_dictionary):
+    # Create non numeric values
+    my_dictionary.update({"text": "Hello", "nested": {"a": 1}})
+
+    # Make sure non numeric values cannot be incremented
+    with pytest.raises(TypeError):
+        my_dictionary.increment("text")
+    with pytest.raises(TypeError):
+        my_dictionary.increment("nested")
+
+    # Make sure the values did not change
+    assert my_dictionary.copy() == {"text": "Hello", "nested": {"a": 1}}
@@ -0,0 +1,109 @@
+import pytest
+import threading
+
+import rednest
+
+from rednest.testing import rednest_budget
+from test_utilities import my_dictionary
+
+
+def test_plan_tree(my_dictionary):
+    # Create a nested value
+    my_dictionary.update({"a": {"b": [1, 2, 3]}})
+
+    # Read a nested item
+    with rednest.explain() as plan:
+        assert my_dictionary.a.b[2] == 3
+
+    # Make sure every public call was recorded with its commands
+    assert [call.name for call in plan.calls] == ["Dictionary.getitem", "Dictionary.getitem", "List.getitem"]
+    assert [command.name for command in plan.calls[0].commands()] == ["HGET"]
+    assert plan.round_trips == plan.commands == 3
+
+    # Make sure nested handle creation was recorded
+    assert [entry.name for entry in plan.calls[0].entries] == ["HGET", "Dictionary.create"]
+    assert "List.create" in str(plan)
+
+
+def test_plan_pipelines(my_dictionary):
+    # Write a nested value in a single pipeline
+    with rednest.explain() as plan:
+        my_dictionary["a"] = {"b": [1, 2, 3]}
+
+    # Make sure the pipeline is a single round trip, without checking for cached scripts first
+    pipelines = [command for command in plan.calls[0].commands() if command.name == "PIPELINE"]
+    assert len(pipelines) == 1
+    assert plan.round_trips == 1
+    assert plan.commands == plan.round_trips - 1 + pipelines[0].size
+    assert not plan.findings
+
+
+def test_plan_findings(my_dictionary):
+    # Create a list
+    my_dictionary["a"] = list(range(10))
+    my_list = my_dictionary["a"]
+
+    # Read the list item by item
+    with rednest.explain(threshold=5) as plan:
+        for index in range(10):
+            my_list[index]
+
+    # Make sure the repeated commands were reported
+    assert [(finding.operation, finding.command, finding.count, finding.calls) for finding in plan.findings] == [("List.getitem", "LINDEX", 10, 10)]
+    assert "N+1" in str(plan)
+
+    # Make sure reading the list at once is not reported
+    with rednest.explain(threshold=5) as plan:
+        my_list.copy()
+    assert not plan.findings
+
+
+def test_plan_generators(my_dictionary):
+    # Create some values
+    my_dictionary.update({index: index for index in range(10)})
+
+    # Consume a generator in chunks, calling other operations meanwhile
+    with rednest.explain() as plan:
+        for key in my_dictionary.iterkeys(count=2):
+            len(my_dictionary)
+
+    # Make sure the generator was recorded as a single call
+    assert [call.name for call in plan.calls].count("Dictionary.iterkeys") == 1
+    assert [call.name for call in plan.calls].count("Dictionary.len") == 10
+
+
+def test_plan_threads(my_dictionary):
+    # Start a plan and run an operation in another thread
+    with rednest.explain() as plan:
+        thread = threading.Thread(target=len, args=(my_dictionary,))
+        thread.start()
+        thread.join()
+
+    # Make sure the other thread was not recorded
+    assert not plan.calls
+
+    # Make sure the handle stopped measuring its commands
+    assert my_dictionary._connection is my_dictionary._client
+
+
+def test_budget(my_dictionary, rednest_budget):
+    # Create a list
+    my_dictionary["a"] = list(range(10))
+    my_list = my_dictionary["a"]
+
+    # Stay within the budget
+    with rednest_budget(round_trips=1, threshold=5) as plan:
+        my_list.copy()
+    assert plan.round_trips == 1
+
+    # Exceed the budget
+    with pytest.raises(pytest.fail.Exception, match="budget exceeded"):
+        with rednest_budget(round_trips=3):
+            for index in range(4):
+                my_list[index]
+
+    # Exceed the threshold
+    with pytest.raises(pytest.fail.Exception, match="N\\+1"):
+        with rednest_budget(threshold=5):
+            for index in range(5):
+                my_list[index]
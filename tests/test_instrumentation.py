@@ -0,0 +1,147 @@
+import os
+import redis
+import redis.asyncio
+import asyncio
+import pytest
+
+import rednest
+
+from test_utilities import my_dictionary, dictionary_type
+
+
+@pytest.fixture()
+def instrumentation():
+    # Enable the instrumentation with clean statistics
+    rednest.reset_stats()
+    rednest.enable_instrumentation()
+
+    try:
+        yield
+    finally:
+        # Disable the instrumentation
+        rednest.disable_instrumentation()
+        rednest.reset_stats()
+
+
+def test_operation_stats(my_dictionary, instrumentation):
+    # Create a nested value
+    my_dictionary.update({"a": {"b": [1, 2, 3, 4]}})
+
+    # Read a nested item
+    assert my_dictionary.a.b[3] == 4
+
+    # Make sure every level was measured separately
+    stats = rednest.stats()
+    assert stats["Dictionary.update"].calls == 1
+    assert stats["Dictionary.getitem"].calls == 2
+    assert stats["Dictionary.getitem"].round_trips == 2
+    assert stats["List.getitem"].calls == 1
+    assert stats["List.getitem"].commands == 1
+    assert stats["List.getitem"].bytes_sent > 0
+    assert stats["List.getitem"].bytes_received > 0
+    assert sum(stats["Dictionary.getitem"].histogram) == 2
+
+    # Make sure inner operations are attributed to the outer operation
+    my_dictionary["c"] = 1
+    assert rednest.stats()["Dictionary.setitem"].calls == 1
+    assert rednest.stats()["Dictionary.update"].calls == 1
+
+
+def test_generator_stats(my_dictionary, instrumentation):
+    # Create some values
+    my_dictionary.update({index: index for index in range(10)})
+
+    # Consume some of the keys, calling other operations meanwhile
+    for key in my_dictionary.iterkeys(count=2):
+        my_dictionary[key]
+        break
+
+    # Make sure both operations were measured
+    stats = rednest.stats()
+    assert stats["Dictionary.iterkeys"].calls == 1
+    assert stats["Dictionary.iterkeys"].commands == 1
+    assert stats["Dictionary.getitem"].calls == 1
+
+
+def test_exporters(my_dictionary, instrumentation):
+    # Register an exporter
+    samples = []
+    rednest.add_exporter(samples.append)
+
+    try:
+        # Run an operation
+        len(my_dictionary)
+    finally:
+        rednest.remove_exporter(samples.append)
+
+    # Make sure the sample was exported
+    assert [(sample.name, sample.commands) for sample in samples] == [("Dictionary.len", 1)]
+
+
+def test_disabled(my_dictionary):
+    # Enable and disable the instrumentation
+    rednest.enable_instrumentation()
+    rednest.disable_instrumentation()
+
+    # Make sure nothing is measured
+    assert my_dictionary._connection is my_dictionary._client
+    len(my_dictionary)
+    assert not rednest.stats()
+
+
+def test_unrelated_connections(my_dictionary, instrumentation):
+    # Use the connection of the dictionary directly, inside an operation of the dictionary
+    class MyDictionary(dictionary_type):
+
+        def length_and_ping(self):
+            self._client.ping()
+            return len(self)
+
+    # Make sure only the commands of the handle are measured
+    with rednest.explain() as plan:
+        MyDictionary(my_dictionary._connection, my_dictionary._key).length_and_ping()
+        my_dictionary._client.ping()
+    assert plan.commands == 1
+    assert rednest.stats()["MyDictionary.length_and_ping"].commands == 1
+
+    # Make sure the connection itself was not changed
+    assert type(my_dictionary._client) in (redis.Redis, redis.cluster.RedisCluster)
+
+
+def test_asynchronous_stats(instrumentation):
+    async def test():
+        # Create an asynchronous dictionary
+        connection = redis.asyncio.Redis()
+        my_dictionary = rednest.AsyncDictionary(connection, os.urandom(4).hex())
+
+        try:
+            # Run some operations concurrently
+            await my_dictionary.update({"a": {"b": 1}})
+            await asyncio.gather(my_dictionary.length(), my_dictionary.length())
+            assert [key async for key in my_dictionary.keys()] == ["a"]
+            await my_dictionary.clear()
+        finally:
+            await connection.aclose()
+
+    # Run the operations
+    asyncio.run(test())
+
+    # Make sure the operations of the asynchronous handles were measured separately
+    stats = rednest.stats()
+    assert stats["AsyncDictionary.length"].calls == 2
+    assert stats["AsyncDictionary.length"].commands == 2
+    assert stats["AsyncDictionary.update"].round_trips >= 1
+    assert stats["AsyncDictionary.keys"].calls == 1
+
+
+def test_new_classes(my_dictionary, instrumentation):
+
+    # Define a nested type while the instrumentation is enabled
+    class MyDictionary(dictionary_type):
+
+        def keys_count(self):
+            return len(self)
+
+    # Make sure its operations are measured
+    MyDictionary(my_dictionary._connection, my_dictionary._key).keys_count()
+    assert rednest.stats()["MyDictionary.keys_count"].calls == 1
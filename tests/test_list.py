@@ -1,5 +1,7 @@
 import pytest
 
+import rednest
+
 from test_utilities import my_dictionary, my_list, list_type, dictionary_type
 
 
@@ -209,6 +211,20 @@ def test_equals(my_list):
     assert my_list == (1, 2, 3)
 
 
+def test_equals_nested(my_dictionary):
+    # Create nested lists
+    my_dictionary["a"] = list(range(50))
+    my_dictionary["b"] = list(range(50))
+    my_dictionary["c"] = list(range(49)) + [[1]]
+
+    # Compare the nested lists without fetching the items one by one
+    with rednest.explain() as plan:
+        assert my_dictionary.a == my_dictionary.b
+        assert my_dictionary.a != my_dictionary.c
+    assert not plan.findings
+    assert plan.round_trips < 20
+
+
 def test_assignment(my_list):
     # Insert to list
     my_list.append(1)
@@ -267,3 +283,200 @@ def test_reassign(my_list):
 
     # Make sure the item has the value we expect
     assert my_list[0] == [2, 3, 4]
+
+
+def test_copy_nested(my_list):
+    # Insert nested values to list
+    my_list.append([1, [2, 3], []])
+    my_list.append(dict(a=[4, 5]))
+
+    # Copy the list
+    copy = my_list.copy()
+
+    # Make sure the copy is made of plain types
+    assert type(copy) == list
+    assert type(copy[0][1]) == list
+    assert type(copy[1]) == dict
+
+    # Check copy
+    assert copy == [[1, [2, 3], []], dict(a=[4, 5])]
+
+
+def test_clear(my_list):
+    # Insert nested values to list
+    my_list.append([1, [2, 3]])
+    my_list.append(dict(a=[4, 5]))
+
+    # Clear the list
+    my_list.clear()
+
+    # Make sure nothing was left behind
+    assert my_list == []
+    assert not my_list._connection.keys(f"*{my_list._key}*")
+
+
+def test_iter_chunks(my_list):
+    # Insert to list
+    my_list.extend(range(10))
+
+    # Stream the list in chunks
+    assert list(my_list.iter_chunks(4)) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert list(my_list.iter_chunks(5)) == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+
+    # Make sure the list is iterable
+    assert list(my_list) == list(range(10))
+
+
+def test_index(my_list):
+    # Insert to list
+    my_list.extend([1, 2, 3, 1, 2, 3])
+
+    # Look up some values
+    assert my_list.index(3) == 2
+    assert my_list.index(1, 1) == 3
+    assert my_list.index(3, -2) == 5
+
+    # Make sure missing values raise
+    with pytest.raises(ValueError):
+        my_list.index(4)
+
+    # Make sure the stop is respected
+    with pytest.raises(ValueError):
+        my_list.index(3, 3, 5)
+
+
+def test_slice_reads(my_list):
+    # Insert to list
+    reference = list(range(12))
+    my_list.extend(reference)
+
+    # Compare many slices with the reference list
+    for start in [None, 0, 1, 5, 11, 12, 20, -1, -5, -12, -20]:
+        for stop in [None, 0, 1, 5, 11, 12, 20, -1, -5, -12, -20]:
+            for step in [None, 1, 2, 5, -1, -2, -5]:
+                assert my_list[start:stop:step] == reference[start:stop:step]
+
+    # Make sure zero steps are invalid
+    with pytest.raises(ValueError):
+        my_list[::0]
+
+    # Make sure negative indexes work
+    assert my_list[-1] == 11
+    assert my_list[-12] == 0
+
+    # Make sure out of range indexes raise
+    with pytest.raises(IndexError):
+        my_list[-13]
+    with pytest.raises(IndexError):
+        my_list[12]
+
+
+def test_slice_writes(my_list):
+    # Create the reference list
+    reference = list(range(12))
+    my_list.extend(reference)
+
+    # Compare many slice assignments and deletions with the reference list
+    for start in [None, 0, 3, 11, 20, -1, -5, -20]:
+        for stop in [None, 0, 4, 11, 20, -1, -5, -20]:
+            for step in [None, 1, 2, -1, -3]:
+                # Delete the slice
+                del my_list[start:stop:step]
+                del reference[start:stop:step]
+                assert my_list == reference
+
+                # Assign the slice
+                if step in (None, 1):
+                    values = [100, 101, 102]
+                else:
+                    values = list(range(200, 200 + len(reference[start:stop:step])))
+
+                my_list[start:stop:step] = values
+                reference[start:stop:step] = values
+                assert my_list == reference
+
+
+def test_slice_writes_nested(my_list):
+    # Insert nested values to list
+    my_list.extend([[1], {"a": 2}, [3], {"b": 4}])
+
+    # Replace some of the nested values
+    my_list[1:3] = [{"c": 5}]
+
+    # Delete the rest of the nested values
+    del my_list[::2]
+
+    # Make sure only the remaining value exists
+    assert my_list == [{"c": 5}]
+
+    # Clear the list
+    my_list[:] = []
+
+    # Make sure nothing was left behind
+    assert not my_list._connection.keys(f"*{my_list._key}*")
+
+
+def test_extend(my_list):
+    # Extend the list with many values
+    my_list.extend(range(2500))
+    my_list.extend([[1, 2], {"a": 3}])
+
+    # Extend using the operator
+    my_list += (4, 5)
+
+    # Extend the list with itself
+    my_list.extend(my_list)
+
+    # Check the list
+    assert len(my_list) == 5008
+    assert my_list[2500] == [1, 2]
+    assert my_list[-4:] == [[1, 2], {"a": 3}, 4, 5]
+    assert my_list.copy() == 2 * (list(range(2500)) + [[1, 2], {"a": 3}, 4, 5])
+
+
+def test_index_operations(my_list):
+    # Create the reference list
+    reference = list(range(10))
+    my_list.extend(reference)
+
+    # Compare insertions with the reference list
+    for index in [0, 3, 5, 9, 10, 20, -1, -3, -20]:
+        my_list.insert(index, 100 + index)
+        reference.insert(index, 100 + index)
+        assert my_list == reference
+
+    # Compare assignments and deletions with the reference list
+    for index in [0, 3, 9, -1, -3]:
+        my_list[index] = 200 + index
+        reference[index] = 200 + index
+        assert my_list == reference
+
+        del my_list[index]
+        del reference[index]
+        assert my_list == reference
+
+    # Compare pops with the reference list
+    for index in [0, 4, -1, -2]:
+        assert my_list.pop(index) == reference.pop(index)
+        assert my_list == reference
+
+    # Make sure out of range indexes raise
+    for index in [len(reference), -len(reference) - 1]:
+        with pytest.raises(IndexError):
+            my_list[index] = 1
+        with pytest.raises(IndexError):
+            del my_list[index]
+        with pytest.raises(IndexError):
+            my_list.pop(index)
+
+
+def test_pop_nested_cleanup(my_list):
+    # Insert nested values to list
+    my_list.extend([[1, [2]], {"a": [3]}])
+
+    # Pop the nested values
+    assert my_list.pop() == {"a": [3]}
+    assert my_list.pop(0) == [1, [2]]
+
+    # Make sure nothing was left behind
+    assert not my_list._connection.keys(f"*{my_list._key}*")
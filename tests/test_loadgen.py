@@ -0,0 +1,52 @@
+import pytest
+
+import redis
+
+from rednest.loadgen import parse_mix, percentile, run
+
+
+def test_parse_mix():
+    # Make sure weights are parsed, and operations without weights are dropped
+    assert parse_mix("read=3,update,insert=0") == {"read": 3, "update": 1}
+
+    # Make sure unknown operations and empty mixes are rejected
+    with pytest.raises(ValueError):
+        parse_mix("read=1,unknown=1")
+    with pytest.raises(ValueError):
+        parse_mix("read=0")
+
+
+def test_percentile():
+    # Make sure the nearest ranked value is returned
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile(list(range(100)), 0.99) == 99
+
+
+def test_run():
+    # Run a short load with every operation
+    intervals = []
+    result = run("redis://localhost:6379", processes=2, threads=2, duration=1.0, masters=2, keys=5, interval=0.5, report=intervals.append)
+
+    # Make sure every interval was reported
+    assert intervals == result.intervals
+    assert len(result.intervals) >= 2
+    assert result.throughput > 0
+
+    # Make sure every operation ran without errors
+    assert set(result.operations) == {"read", "update", "replace", "insert"}
+    assert all(summary.calls > 0 and not summary.errors for summary in result.operations.values())
+    assert all(summary.p50 <= summary.p99 for summary in result.operations.values())
+
+    # Make sure racing writers did not leak any keys, and the masters were deleted
+    assert result.leaked_keys == 0
+    assert not redis.Redis().keys("*loadgen:*")
+
+
+def test_run_without_contention():
+    # Run a short load with a single writer
+    result = run("redis://localhost:6379", processes=1, threads=1, duration=0.5, keys=5, interval=0.25)
+
+    # Make sure nothing leaked
+    assert result.operations["replace"].calls > 0
+    assert result.leaked_keys == 0
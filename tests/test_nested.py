@@ -0,0 +1,84 @@
+import os
+import collections
+
+import pytest
+
+from rednest import NestedBase, NestedType, NestedTypeRegistry
+
+from test_utilities import my_redis, my_dictionary, dictionary_type, list_type
+
+
+class OrderedDictionary(dictionary_type):
+
+    # Copy type - the type used when calling copy
+    _COPY_TYPE = collections.OrderedDict
+
+
+def test_registry_lookup():
+    # Create a registry
+    registry = NestedTypeRegistry()
+    registry.register(NestedType("hash", dictionary_type, dict))
+    registry.register(NestedType("list", list_type, list))
+
+    # Make sure identifiers are looked up
+    assert registry.from_identifier("hash").nested_class is dictionary_type
+    assert registry.from_identifier("") is None
+
+    # Make sure values are dispatched
+    assert registry.from_value({}).nested_class is dictionary_type
+    assert registry.from_value([]).nested_class is list_type
+    assert registry.from_value(collections.OrderedDict()).nested_class is dictionary_type
+    assert registry.from_value("Hello") is None
+
+    # Make sure all types are iterable
+    assert len(registry) == 2
+    assert [nested_type.redis_identifier for nested_type in registry] == ["hash", "list"]
+
+
+def test_registry_invalidation():
+    # Create a registry
+    registry = NestedTypeRegistry()
+    registry.register(NestedType("list", list_type, list))
+
+    # Cache a missing dispatch
+    assert registry.from_value(collections.OrderedDict()) is None
+
+    # Register a third party type the old way
+    registry.append(NestedType("ordered", OrderedDictionary, collections.OrderedDict))
+
+    # Make sure the cache was invalidated
+    assert registry.from_value(collections.OrderedDict()).nested_class is OrderedDictionary
+    assert registry.from_identifier("ordered").nested_class is OrderedDictionary
+
+
+def test_unknown_nested_type(my_dictionary):
+    # Store an identifier of a nested type which is not registered
+    my_dictionary._connection.hset(my_dictionary._key, my_dictionary._encode("a"), "stream:'name'")
+
+    # Make sure the identifier is not decoded as a scalar
+    with pytest.raises(TypeError, match="stream"):
+        my_dictionary["a"]
+
+
+def test_missing_plan_initialize(my_redis):
+    # Create a nested type which does not plan its initialization
+    class Incomplete(NestedBase):
+        pass
+
+    # Make sure the missing override fails when the type is used, not when it is first nested
+    with pytest.raises(TypeError):
+        Incomplete(my_redis, "incomplete")
+
+
+def test_escaped_master_names(my_redis):
+    # Create a dictionary whose master name has characters which are escaped in representations
+    name = "\n\t\x01\x85\u200b\U000e0001'\"\\" + os.urandom(4).hex()
+    my_dictionary = dictionary_type(my_redis, name)
+    my_dictionary["a"] = {"b": [1, {"c": 2}]}
+
+    # Make sure the scripts find the nested keys
+    assert my_dictionary.copy() == {"a": {"b": [1, {"c": 2}]}}
+
+    # Make sure the scripts delete the nested keys
+    my_dictionary.clear()
+    assert not my_redis.keys(f"*{name[-8:]}*")
@@ -0,0 +1,194 @@
+import os
+import pytest
+import threading
+
+import rednest
+
+from rednest import ShardedDictionary
+
+from test_utilities import my_redis
+
+
+@pytest.fixture()
+def my_sharded(my_redis):
+    # Create a random sharded dictionary with a few buckets
+    return ShardedDictionary(my_redis, os.urandom(4).hex(), buckets=4)
+
+
+def test_sharded_mapping(my_sharded):
+    # Set some values
+    my_sharded["a"] = 1
+    my_sharded.update({"b": [1, 2], 3: {"c": None}})
+
+    # Make sure the values can be read
+    assert my_sharded["a"] == 1
+    assert my_sharded["b"] == [1, 2]
+    assert my_sharded[3]["c"] is None
+    assert "a" in my_sharded and "z" not in my_sharded
+    assert len(my_sharded) == 3
+    assert sorted(my_sharded, key=str) == [3, "a", "b"]
+    assert my_sharded == {"a": 1, "b": [1, 2], 3: {"c": None}}
+    assert dict(my_sharded.items()) == my_sharded.copy()
+
+    # Replace and delete values
+    my_sharded["b"] = "b"
+    del my_sharded[3]
+    assert my_sharded.copy() == {"a": 1, "b": "b"}
+
+    # Make sure missing keys raise
+    with pytest.raises(KeyError):
+        my_sharded["z"]
+    with pytest.raises(KeyError):
+        del my_sharded["z"]
+
+
+def test_sharded_spreads(my_sharded):
+    # Set many values
+    my_sharded.update({index: index for index in range(100)})
+
+    # Make sure all of the buckets were used
+    assert all(my_sharded._connection.hlen(bucket._key) for bucket in my_sharded._buckets())
+
+
+def test_sharded_layout_shared(my_redis):
+    # Create two handles with different bucket counts
+    name = os.urandom(4).hex()
+    first, second = ShardedDictionary(my_redis, name, buckets=4), ShardedDictionary(my_redis, name, buckets=8)
+
+    # Make sure reading does not store a layout
+    assert "a" not in first and len(second) == 0 and not second.copy()
+    assert not my_redis.keys(f"*{name}*")
+
+    # Make sure the layout of the first write wins
+    second["a"] = 1
+    first["b"] = 2
+    assert first._layout == second._layout == (8, 0)
+    assert first == second == {"a": 1, "b": 2}
+
+    # Make sure new handles load the stored layout
+    assert ShardedDictionary(my_redis, name, buckets=4)._current_layout() == (8, 0)
+    assert not my_redis.keys(f"{name}:4:*")
+
+
+def test_sharded_lazy_layout(my_redis):
+    # Create a handle while explaining the commands
+    with rednest.explain() as plan:
+        sharded = ShardedDictionary(my_redis, os.urandom(4).hex())
+
+    # Make sure creating the handle does not load the layout
+    assert plan.round_trips == 0 and sharded._layout is None
+
+    # Make sure the layout is loaded on first use
+    assert "a" not in sharded
+    assert sharded._layout == (16, 0)
+
+
+def test_sharded_batching(my_sharded):
+    # Make sure batches refuse sharded dictionaries, since their writes cannot be buffered
+    with pytest.raises(TypeError):
+        with rednest.batch(my_sharded):
+            my_sharded["a"] = 1
+    with pytest.raises(TypeError):
+        my_sharded.transaction(lambda handle: handle.update(a=1))
+
+    # Make sure nothing was written
+    assert "a" not in my_sharded and my_sharded._batch is None
+
+
+def test_sharded_reshard(my_sharded):
+    # Create the dictionary
+    value = {index: {"index": [index]} if index % 3 else index for index in range(200)}
+    my_sharded.update(value)
+
+    # Reshard the dictionary in small chunks
+    my_sharded.reshard(7, count=10)
+
+    # Make sure the values were moved
+    assert my_sharded._layout == (7, 0)
+    assert len(my_sharded) == 200
+    assert my_sharded == value
+
+    # Make sure the previous buckets were deleted, along with their nested values
+    assert not my_sharded._connection.keys(f"{my_sharded._key}:4:*")
+    assert not my_sharded._connection.keys(f"{{{my_sharded._key}:4:*")
+
+    # Make sure other handles switch to the new layout
+    other = ShardedDictionary(my_sharded._connection, my_sharded._key)
+    assert other._current_layout() == (7, 0)
+
+    # Make sure the dictionary can be deleted entirely
+    my_sharded.clear()
+    assert my_sharded._connection.keys(f"*{my_sharded._key}*") == [my_sharded._key if my_sharded._connection.get_encoder().decode_responses else my_sharded._key.encode()]
+
+
+def test_sharded_stale_handle(my_sharded):
+    # Create a stale handle
+    stale = ShardedDictionary(my_sharded._connection, my_sharded._key)
+    my_sharded.update({index: index for index in range(20)})
+    assert stale._current_layout() == (4, 0)
+
+    # Reshard using the other handle
+    my_sharded.reshard(3)
+
+    # Make sure the stale handle follows the new layout
+    stale["a"] = "a"
+    assert stale._layout == (3, 0)
+    assert my_sharded["a"] == "a"
+    assert len(stale) == 21
+
+
+def test_sharded_length_during_reshard(my_sharded):
+    # Create the dictionary
+    my_sharded.update({index: index for index in range(20)})
+
+    # Switch to a new layout, and copy some of the keys without deleting them from the previous buckets
+    my_sharded._connection.hset(my_sharded._key, mapping={"buckets": 3, "previous": 4})
+    my_sharded.refresh()
+    for index in range(5):
+        encoded_key = my_sharded._encode(index)
+        my_sharded._bucket_of(3, encoded_key)[index] = index
+
+    # Make sure the copied keys are counted once
+    assert len(my_sharded) == 20
+
+    # Make sure the migration can be completed
+    my_sharded.reshard(3)
+    assert len(my_sharded) == 20
+    assert my_sharded == {index: index for index in range(20)}
+
+
+def test_sharded_reshard_during_writes(my_sharded):
+    # Keep writing while resharding
+    stop = threading.Event()
+
+    def writer():
+        # Create a separate handle
+        handle = ShardedDictionary(my_sharded._connection, my_sharded._key)
+
+        # Overwrite the keys with increasing values
+        counter = 0
+        while not stop.is_set():
+            counter += 1
+            handle[counter % 50] = [counter]
+
+    # Create the dictionary
+    my_sharded.update({index: [0] for index in range(50)})
+
+    # Reshard a few times while writing
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for buckets in (9, 2, 5):
+            my_sharded.reshard(buckets, count=5)
+    finally:
+        stop.set()
+        thread.join()
+
+    # Make sure no key was lost or duplicated
+    assert my_sharded._layout == (5, 0)
+    assert len(my_sharded) == 50
+    assert sorted(my_sharded) == list(range(50))
+
+    # Make sure no nested value was leaked
+    nested = sum(len(my_sharded._connection.keys(f"{{{bucket._key}}}:*")) for bucket in my_sharded._buckets())
+    assert nested == 50
@@ -102,3 +102,49 @@ def test_dictionary_multiprocess_kill_during_write(my_dictionary):
     # Raise all of the exceptions
     for e in exceptions:
         raise e
+
+
+def test_dictionary_multiprocess_increments(my_dictionary):
+    # Create the counters
+    my_dictionary.update({"count": 0, "counter": {}})
+
+    def stress():
+        for _ in range(100):
+            my_dictionary.increment("count")
+            my_dictionary.counter.increment("hits")
+
+    # Create many stress processes
+    processes = [multiprocessing.Process(target=stress) for _ in range(10)]
+
+    # Execute all processes
+    for p in processes:
+        p.start()
+
+    # Wait for all processes
+    for p in processes:
+        p.join()
+
+    # Make sure no increment was lost
+    assert my_dictionary.count == 1000
+    assert my_dictionary.counter.hits == 1000
+
+
+def test_dictionary_multiprocess_replacements(my_dictionary):
+    def stress():
+        for index in range(50):
+            my_dictionary["nested"] = {"index": index, "values": [index, {"deep": index}]}
+
+    # Create many stress processes
+    processes = [multiprocessing.Process(target=stress) for _ in range(10)]
+
+    # Execute all processes
+    for p in processes:
+        p.start()
+
+    # Wait for all processes
+    for p in processes:
+        p.join()
+
+    # Make sure no replaced subtree was leaked
+    my_dictionary.clear()
+    assert not my_dictionary._connection.keys(f"*{my_dictionary._key}*")
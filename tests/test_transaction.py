@@ -0,0 +1,177 @@
+import redis
+import pytest
+import threading
+
+from rednest import Transaction, TRANSACTION_STATS
+
+from test_utilities import my_dictionary, dictionary_type
+
+
+def test_transaction_commit(my_dictionary):
+    # Create a nested value
+    my_dictionary.profile = {"tags": ["a"], "visits": 1}
+
+    def add_tag(profile):
+        # Buffer writes based on the current values
+        profile.tags.append("b")
+        profile.visits = profile.visits + 1
+
+        # Make sure the writes are buffered
+        assert profile.visits == 1
+
+        # Return a result
+        return profile.visits
+
+    # Run the transaction
+    commits = TRANSACTION_STATS.commits
+    assert my_dictionary.profile.transaction(add_tag) == 1
+
+    # Make sure the writes were committed
+    assert my_dictionary.profile == {"tags": ["a", "b"], "visits": 2}
+    assert TRANSACTION_STATS.commits == commits + 1
+
+
+def test_transaction_retry(my_dictionary):
+    # Create a nested value
+    my_dictionary.profile = {"tags": ["a"]}
+
+    # Create another handle, which conflicts with the transaction once
+    other = dictionary_type(my_dictionary._connection, my_dictionary._key)
+    attempts = []
+
+    def add_tag(profile):
+        # Read the tags, which watches them
+        tags = profile.tags
+        tags.append(len(tags))
+
+        # Replace the tags concurrently on the first attempt
+        if not attempts:
+            other.profile.tags = ["x", "y"]
+        attempts.append(True)
+
+    # Run the transaction
+    retries = TRANSACTION_STATS.retries
+    my_dictionary.profile.transaction(add_tag)
+
+    # Make sure the transaction was retried against the new value
+    assert len(attempts) == 2
+    assert my_dictionary.profile.tags == ["x", "y", 2]
+    assert TRANSACTION_STATS.retries == retries + 1
+
+
+def test_transaction_materialized_subtree(my_dictionary, monkeypatch):
+    # Create a nested value
+    my_dictionary.profile = {"tags": ["a"], "address": {"city": "x"}}
+
+    # Create another handle, which changes a descendant after it was read but before it was watched, once
+    other = dictionary_type(my_dictionary._connection, my_dictionary._key)
+    original_watch, changes = Transaction.watch, []
+
+    def racing_watch(self, *keys):
+        # Only the descendants of copies are watched together
+        if len(keys) > 1 and not changes:
+            other.profile.address.city = "y"
+            changes.append(True)
+        original_watch(self, *keys)
+
+    monkeypatch.setattr(Transaction, "watch", racing_watch)
+
+    def copy_city(profile):
+        # Copy the entire profile, then write based on the copy
+        attempts.append(True)
+        profile.city = profile.copy()["address"]["city"]
+
+    # Run the transaction
+    attempts = []
+    my_dictionary.profile.transaction(copy_city)
+
+    # Make sure the transaction was retried against the changed descendant
+    assert changes
+    assert len(attempts) == 2
+    assert my_dictionary.profile.city == "y"
+
+
+def test_transaction_replaced_subtree(my_dictionary):
+    # Create a nested value and keep handles to it
+    my_dictionary.profile = {"tags": ["a"]}
+    profile, tags = my_dictionary.profile, my_dictionary.profile.tags
+
+    def add_tag(profile):
+        # Append to the tags if they still exist
+        if "tags" in profile:
+            profile.tags.append("b")
+
+        # Replace the entire profile concurrently
+        if my_dictionary.profile is not None:
+            my_dictionary.profile = None
+
+    # Run the transaction
+    my_dictionary.profile.transaction(add_tag)
+
+    # Make sure the deleted subtree was not resurrected
+    assert my_dictionary.profile is None
+    assert not my_dictionary._connection.exists(profile._key, tags._key)
+
+
+def test_transaction_aborts(my_dictionary):
+    # Create a value
+    my_dictionary.count = 0
+
+    def conflict(dictionary):
+        # Read the value and change it concurrently on every attempt
+        dictionary.count = dictionary.count + 1
+        dictionary._connection.hset(dictionary._key, "'count'", ":100")
+
+    # Make sure the transaction gives up
+    aborts = TRANSACTION_STATS.aborts
+    with pytest.raises(redis.WatchError):
+        my_dictionary.transaction(conflict, retries=2)
+
+    # Make sure the abort was counted and nothing was written
+    assert TRANSACTION_STATS.aborts == aborts + 1
+    assert my_dictionary.count == 100
+
+
+def test_transaction_exception(my_dictionary):
+    # Create a value
+    my_dictionary.count = 1
+
+    def fail(dictionary):
+        # Buffer a write, then fail
+        dictionary.count = 2
+        raise ValueError()
+
+    # Make sure the writes were discarded
+    with pytest.raises(ValueError):
+        my_dictionary.transaction(fail)
+    assert my_dictionary.count == 1
+
+    # Make sure unbuffered writes are refused
+    with pytest.raises(RuntimeError):
+        my_dictionary.transaction(lambda dictionary: dictionary.setdefault("other", 1))
+    assert "other" not in my_dictionary
+
+
+def test_transaction_parallel(my_dictionary):
+    # Create independent counters
+    my_dictionary.update({"a": {"count": 0}, "b": {"count": 0}})
+
+    def increment(subtree):
+        # Increment the counter using a read-modify-write
+        subtree.count = subtree.count + 1
+
+    def stress(name):
+        # Create a handle per thread
+        handle = dictionary_type(my_dictionary._connection, my_dictionary._key)[name]
+        for _ in range(50):
+            handle.transaction(increment, retries=1000)
+
+    # Increment both counters from many threads
+    threads = [threading.Thread(target=stress, args=(name,)) for name in "ab" * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Make sure no increment was lost
+    assert my_dictionary == {"a": {"count": 200}, "b": {"count": 200}}
@@ -0,0 +1,147 @@
+import io
+import os
+import collections
+import redis
+import pytest
+
+from rednest import JSONCodec, walk, dump, load
+
+from test_utilities import my_dictionary, my_list, my_codec, dictionary_type
+
+# Tree with every kind of container and leaf
+TREE = {"a": 1, "b": [1, "2", None, [], {"c": (1, 2)}], "d": {}, 4: {"e": b"Hello", "f": [[True]]}}
+
+
+def test_walk(my_dictionary):
+    # Create the tree
+    my_dictionary.update(TREE)
+
+    # Walk the tree
+    leaves = dict(walk(my_dictionary, count=2))
+
+    # Make sure all of the leaves and the empty containers were walked
+    assert leaves == {
+        ("a",): 1,
+        ("b", 0): 1,
+        ("b", 1): "2",
+        ("b", 2): None,
+        ("b", 3): [],
+        ("b", 4, "c"): (1, 2),
+        ("d",): {},
+        (4, "e"): b"Hello",
+        (4, "f", 0, 0): True,
+    }
+
+
+def test_dump_load(my_dictionary):
+    # Create the tree
+    my_dictionary.update(TREE)
+
+    # Dump the tree
+    fp = io.StringIO()
+    stats = dump(my_dictionary, fp, count=2)
+
+    # Make sure the statistics were reported
+    assert stats.items == 14
+    assert stats.bytes == len(fp.getvalue()) - len(fp.getvalue().splitlines()[0]) - 1
+    assert stats.rate > 0
+
+    # Load the tree to another key, in small batches
+    fp.seek(0)
+    loaded, stats = load(fp, my_dictionary._connection, os.urandom(4).hex(), count=2)
+
+    # Make sure the trees are equal
+    assert stats.items == 14
+    assert loaded.copy() == my_dictionary.copy() == TREE
+
+    # Make sure the loaded tree can be deleted entirely
+    loaded.clear()
+    assert not loaded._connection.keys(f"*{loaded._key}*")
+
+
+def test_counters(my_dictionary, my_codec):
+    # Create a tree with counters
+    my_dictionary = dictionary_type(my_dictionary._connection, my_dictionary._key, codec=my_codec)
+    my_dictionary.update({"c": collections.Counter("aab"), "d": {"e": collections.Counter({"x": 1.5})}, "f": collections.Counter()})
+
+    # Make sure the counts are walked
+    assert dict(walk(my_dictionary)) == {("c", "a"): 2, ("c", "b"): 1, ("d", "e", "x"): 1.5, ("f",): collections.Counter()}
+
+    # Dump and load the tree
+    fp = io.StringIO()
+    dump(my_dictionary, fp, count=1)
+    fp.seek(0)
+    loaded, _ = load(fp, my_dictionary._connection, os.urandom(4).hex(), codec=my_codec, count=1)
+
+    # Make sure the counters were loaded as counters
+    assert loaded.copy() == my_dictionary.copy()
+    assert isinstance(loaded.copy()["d"]["e"], collections.Counter)
+
+    # Make sure the loaded tree can be deleted entirely
+    loaded.clear()
+    assert not loaded._connection.keys(f"*{loaded._key}*")
+
+
+def test_load_bounded(my_dictionary, monkeypatch):
+    # Create many small containers, and dump them
+    my_dictionary.update({index: list(range(9)) for index in range(30)})
+    fp = io.StringIO()
+    dump(my_dictionary, fp)
+
+    # Record the number of entries written by every pipeline
+    sizes = []
+    execute = redis.client.Pipeline.execute
+
+    def recording_execute(self, *args, **kwargs):
+        sizes.append(sum(len(command[0]) - 2 for command in self.command_stack))
+        return execute(self, *args, **kwargs)
+
+    # Load the dictionary in small batches
+    monkeypatch.setattr(redis.client.Pipeline, "execute", recording_execute)
+    fp.seek(0)
+    loaded, _ = load(fp, my_dictionary._connection, os.urandom(4).hex(), count=10)
+    monkeypatch.undo()
+
+    # Make sure the pipelines were bounded by the number of entries rather than by the number of commands
+    assert loaded == my_dictionary
+    assert max(sizes) < 2 * 10 * 2
+    loaded.clear()
+
+
+def test_load_bytes(my_dictionary):
+    # Create a dump with non ascii characters
+    lines = ['{"format": "rednest", "version": 1, "type": "hash", "codec": "ReprCodec"}\n', '{"path": ["\'a\'"], "value": "\'\u05e9\u05dc\u05d5\u05dd\'"}\n']
+
+    # Make sure the bytes are counted rather than the characters
+    loaded, stats = load(lines, my_dictionary._connection, my_dictionary._key)
+    assert loaded == {"a": "\u05e9\u05dc\u05d5\u05dd"}
+    assert stats.bytes == len(lines[1].encode()) > len(lines[1])
+
+
+def test_load_replaces(my_list):
+    # Create a list and dump it
+    my_list.extend([{"a": 1}, [2], 3])
+    fp = io.StringIO()
+    dump(my_list, fp)
+
+    # Load the list over an existing value
+    my_list.clear()
+    my_list.append({"b": 2})
+    fp.seek(0)
+    loaded, _ = load(fp, my_list._connection, my_list._key)
+
+    # Make sure the previous value was replaced
+    assert loaded == [{"a": 1}, [2], 3]
+    assert len(my_list._connection.keys(f"*{my_list._key}*")) == 3
+
+
+def test_load_codec_mismatch(my_dictionary):
+    # Dump a dictionary using the default codec
+    my_dictionary.a = 1
+    fp = io.StringIO()
+    dump(my_dictionary, fp)
+
+    # Make sure loading using another codec fails
+    fp.seek(0)
+    with pytest.raises(ValueError):
+        load(fp, my_dictionary._connection, os.urandom(4).hex(), codec=JSONCodec())
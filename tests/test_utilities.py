@@ -3,11 +3,14 @@ import redis
 import pytest
 
 # Rednest testing types
-from rednest import List as list_type, Dictionary as dictionary_type
+from rednest import List as list_type, Dictionary as dictionary_type, ReprCodec, JSONCodec, PickleCodec, TaggedCodec
 
 # All supported test connections
 REDIS_CONNECTIONS = [redis.Redis(), redis.Redis(decode_responses=True)]
 
+# All supported test codecs
+CODECS = [ReprCodec(), JSONCodec(), PickleCodec(), TaggedCodec()]
+
 
 @pytest.fixture(params=REDIS_CONNECTIONS)
 def my_redis(request):
@@ -30,3 +33,8 @@ def my_list(request):
 
     # Create a random my_dictionary
     return list_type(request.param, rand_name)
+
+
+@pytest.fixture(params=CODECS)
+def my_codec(request):
+    return request.param